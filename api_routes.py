@@ -1,133 +1,210 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
-from database import get_db, User, RegistrationAttempt, SystemLog, log_system_event
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Request, Query, WebSocket
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from champion_stats import champion_stats
+from config import settings
+from database import get_async_read_db, AsyncReadSessionLocal, User, RegistrationAttempt, SystemLog
+from export import Export, ExportError, FORMATS, aiter_export
+from fast_json import FastJSONResponse, dumps_lines, rows_to_dicts
+from live_feed import LiveFeedFullError, live_feed, sse_events
+from log_search import InvalidCursorError, LogCursor, system_logs_query
+from registration_stats import get_registration_summary
+from metrics import process_stats
+from profiling import dump_ring
+from response_cache import response_cache
+from retention import ARCHIVED_TABLES, archive_days, read_archive
+from sessions import SessionRequiredError, require_admin, require_session, session_manager, token_from_request
+from username_index import username_index
+import log_writer
+from typing import List, Dict, Any, AsyncIterator, Optional
+import asyncio
 import random
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
-api_router = APIRouter(prefix="/api", tags=["API"])
+# Все /api/* требуют сессию; публичны только маршруты, нужные до входа
+api_router = APIRouter(
+    prefix="/api", tags=["API"], dependencies=[Depends(require_session)], default_response_class=FastJSONResponse
+)
+public_api_router = APIRouter(prefix="/api", tags=["API"], default_response_class=FastJSONResponse)
 
 
 @api_router.get("/stats")
-async def get_fake_stats():
+@response_cache.cached(ttl=30)
+async def get_stats():
     """
-    Получение 'статистики' - неработоспособный функционал
+    Сводка по загруженным матчам и лучшие чемпионы по доле побед
     """
-    fake_responses = [
-        {
-            "message": "Функционал недоступен из-за технических работ или ваших собственных сомнений.",
-            "error": "В нашем мире работающее ПО - плохая примета",
-            "suggestion": "Попробуйте помедитировать или выпить чай",
-            "status": "broken_by_design"
-        },
-        {
+    summary = champion_stats.summary()
+    if not summary["matches"]:
+        return {
             "message": "Статистика временно эмигрировала в параллельную вселенную",
-            "error": "404: Данные не найдены в этой реальности",
-            "suggestion": "Попробуйте поискать в другом измерении",
-            "status": "interdimensional_error"
-        },
-        {
-            "message": "Сервер решил взять отпуск",
-            "error": "500: Внутренняя ошибка сервера (он устал)",
-            "suggestion": "Дайте серверу отдохнуть",
-            "status": "server_on_vacation"
+            "error": f"Ни одного матча в {settings.MATCH_DATA_DIR} - играть пока некому",
+            "suggestion": "Положите выгрузки матчей (*.jsonl, *.csv) в каталог и подождите",
+            "status": "no_matches",
+            "summary": summary
         }
-    ]
 
-    return random.choice(fake_responses)
+    top = champion_stats.query(sort="win_rate", min_games=settings.CHAMPION_STATS_MIN_GAMES, limit=5)
+    return {
+        "message": "Статистика работает. Сами удивлены.",
+        "status": "ok",
+        "summary": summary,
+        "top_win_rate": top["champions"]
+    }
+
+
+USER_PUBLIC_COLUMNS = (
+    User.id,
+    User.username,
+    User.race_class,
+    User.registration_date,
+    User.failed_attempts,
+    User.is_active,
+    User.last_login,
+)
+
+
+def users_page_query(limit: Optional[int] = None, after: Optional[int] = None):
+    """Выборка пользователей по курсору id > after"""
+    query = select(*USER_PUBLIC_COLUMNS).order_by(User.id)
+    if after is not None:
+        query = query.where(User.id > after)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+RECENT_ATTEMPT_COLUMNS = (
+    RegistrationAttempt.username_attempt,
+    RegistrationAttempt.phone_attempt,
+    RegistrationAttempt.attempt_date,
+    RegistrationAttempt.success,
+    RegistrationAttempt.error_message,
+)
+
+
+def recent_attempts_query(limit: int = 10):
+    """Последние попытки регистрации"""
+    return select(*RECENT_ATTEMPT_COLUMNS).order_by(RegistrationAttempt.attempt_date.desc()).limit(limit)
+
+
+async def iter_users_ndjson(after: Optional[int] = None) -> AsyncIterator[bytes]:
+    """
+    Построчная выгрузка пользователей в NDJSON через серверный курсор.
+    Сессия открывается внутри генератора, чтобы жить столько же, сколько ответ.
+    """
+    query = users_page_query(after=after)
+
+    async with AsyncReadSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=settings.STREAM_CHUNK_SIZE))
+        async for partition in result.partitions():
+            yield dumps_lines(rows_to_dicts(partition))
 
 
 @api_router.get("/users", response_model=List[Dict[str, Any]])
-async def get_users(db: Session = Depends(get_db)):
+async def get_users(
+        limit: int = Query(settings.API_PAGE_SIZE, ge=1, le=settings.API_MAX_PAGE_SIZE),
+        after: Optional[int] = Query(None, description="id последнего пользователя предыдущей страницы"),
+        stream: bool = Query(False, description="Отдать всю таблицу потоком в NDJSON"),
+        db: AsyncSession = Depends(get_async_read_db)
+):
     """
-    Получение списка зарегистрированных пользователей
+    Получение списка зарегистрированных пользователей.
+    Постраничная выдача по курсору (id > after); следующий курсор в заголовке X-Next-After.
     """
-    users = db.query(User).all()
-    return [
-        {
-            "id": user.id,
-            "username": user.username,
-            "race_class": user.race_class,
-            "registration_date": user.registration_date.isoformat(),
-            "failed_attempts": user.failed_attempts,
-            "is_active": user.is_active,
-            "last_login": user.last_login.isoformat() if user.last_login else None
-        }
-        for user in users
-    ]
+    if stream:
+        return StreamingResponse(iter_users_ndjson(after), media_type="application/x-ndjson")
+
+    result = await db.execute(users_page_query(limit, after))
+    users = result.all()
+
+    headers = {"X-Next-After": str(users[-1].id)} if len(users) == limit else None
+    return FastJSONResponse(rows_to_dicts(users), headers=headers)
 
 
 @api_router.get("/registration-attempts")
-async def get_registration_attempts(db: Session = Depends(get_db)):
+async def get_registration_attempts(
+        top_n: int = Query(10, ge=1, le=100),
+        db: AsyncSession = Depends(get_async_read_db)
+):
     """
-    Получение статистики попыток регистрации
+    Получение статистики попыток регистрации.
+    Итоги и окна 1 мин / 1 ч / 24 ч берутся из поминутных счетчиков (точность - минута).
     """
-    attempts = db.query(RegistrationAttempt).order_by(RegistrationAttempt.attempt_date.desc()).limit(50).all()
+    summary = await get_registration_summary(db, top_n=top_n)
 
-    return {
-        "total_attempts": len(attempts),
-        "successful_attempts": len([a for a in attempts if a.success]),
-        "failed_attempts": len([a for a in attempts if not a.success]),
-        "recent_attempts": [
-            {
-                "username_attempt": attempt.username_attempt,
-                "phone_attempt": attempt.phone_attempt,
-                "attempt_date": attempt.attempt_date.isoformat(),
-                "success": attempt.success,
-                "error_message": attempt.error_message
-            }
-            for attempt in attempts[:10]
-        ]
-    }
+    result = await db.execute(recent_attempts_query(10))
+    attempts = result.all()
+
+    return FastJSONResponse({
+        "total_attempts": summary["totals"]["total"],
+        "successful_attempts": summary["totals"]["successful"],
+        "failed_attempts": summary["totals"]["failed"],
+        "windows": summary["windows"],
+        "top_ips": summary["top_ips"],
+        "recent_attempts": rows_to_dicts(attempts)
+    })
 
 
 @api_router.get("/system-logs")
-async def get_system_logs(db: Session = Depends(get_db)):
+async def get_system_logs(
+        event_type: Optional[str] = None,
+        user_id: Optional[int] = None,
+        ip_address: Optional[str] = None,
+        since: Optional[datetime] = Query(None, description="Не раньше (UTC)"),
+        until: Optional[datetime] = Query(None, description="Раньше чем (UTC)"),
+        q: Optional[str] = Query(None, max_length=200, description="Все слова в описании; слово* - префикс"),
+        before: Optional[str] = Query(None, description="Курсор из X-Next-Before предыдущей страницы"),
+        limit: int = Query(100, ge=1, le=settings.API_MAX_PAGE_SIZE),
+        db: AsyncSession = Depends(get_async_read_db)
+):
     """
-    Получение системных логов
+    Получение системных логов, от новых к старым, с фильтрами и полнотекстовым поиском.
+    Постраничная выдача по курсору (timestamp, id); следующий курсор в заголовке X-Next-Before.
     """
-    logs = db.query(SystemLog).order_by(SystemLog.timestamp.desc()).limit(100).all()
+    try:
+        cursor = LogCursor.decode(before) if before else None
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Курсор испорчен. Берите его из X-Next-Before, а не из головы.")
 
-    return [
-        {
-            "id": log.id,
-            "event_type": log.event_type,
-            "user_id": log.user_id,
-            "description": log.description,
-            "timestamp": log.timestamp.isoformat(),
-            "ip_address": log.ip_address
-        }
-        for log in logs
-    ]
+    query = system_logs_query(
+        db.bind.dialect.name, limit,
+        event_type=event_type, user_id=user_id, ip_address=ip_address,
+        since=since, until=until, search=q, before=cursor
+    )
+    result = await db.execute(query)
+    logs = result.all()
+
+    headers = {"X-Next-Before": LogCursor(logs[-1].timestamp, logs[-1].id).encode()} if len(logs) == limit else None
+    return FastJSONResponse(rows_to_dicts(logs), headers=headers)
 
 
 @api_router.get("/fake-champion-stats")
-async def get_fake_champion_stats():
+@response_cache.cached(ttl=60)
+async def get_champion_stats(
+        patch: Optional[str] = Query(None, description="Патч, например 14.3"),
+        role: Optional[str] = Query(None, description="Роль: top, jungle, mid, bottom, support"),
+        since: Optional[date] = Query(None, description="Первый день окна (UTC)"),
+        until: Optional[date] = Query(None, description="Последний день окна (UTC)"),
+        min_games: int = Query(0, ge=0),
+        sort: str = Query("games", pattern="^(games|win_rate|pick_rate|ban_rate|kda)$"),
+        limit: int = Query(20, ge=1, le=500)
+):
     """
-    Фейковая статистика чемпионов
+    Доля побед, пиков, банов и средний KDA по чемпионам из предрасчитанных агрегатов.
+    Путь остался прежним, хотя статистика больше не выдумана.
     """
-    champions = [
-        "Yasuo", "Zed", "Lee Sin", "Thresh", "Jinx", "Ahri", "Garen", "Darius",
-        "Katarina", "Riven", "Vayne", "Lucian", "Ezreal", "Lux", "Morgana"
-    ]
-
-    fake_stats = []
-    for champion in random.sample(champions, 5):
-        fake_stats.append({
-            "champion": champion,
-            "win_rate": f"{random.randint(30, 70)}%",
-            "pick_rate": f"{random.randint(5, 25)}%",
-            "ban_rate": f"{random.randint(0, 50)}%",
-            "average_kda": f"{random.randint(1, 5)}.{random.randint(0, 9)}/{random.randint(3, 8)}.{random.randint(0, 9)}/{random.randint(5, 15)}.{random.randint(0, 9)}",
-            "note": "Данные сгенерированы случайно и не отражают реальную статистику"
-        })
-
+    result = champion_stats.query(
+        patch=patch, role=role, since=since, until=until,
+        min_games=min_games, sort=sort, limit=limit
+    )
     return {
-        "message": "Внимание! Эта статистика полностью выдумана",
-        "disclaimer": "В нашем мире точные данные - плохая примета",
-        "champions": fake_stats,
-        "last_updated": "Никогда",
-        "reliability": "0%"
+        "filters": {"patch": patch, "role": role, "since": since, "until": until},
+        "matches": result["matches"],
+        "champions": result["champions"],
+        "last_updated": champion_stats.summary()["last_updated"] or "Никогда"
     }
 
 
@@ -135,14 +212,13 @@ async def get_fake_champion_stats():
 async def submit_feedback(
         feedback: str,
         rating: int,
-        request: Request,
-        db: Session = Depends(get_db)
+        request: Request
 ):
     """
     Отправка отзыва (который никуда не сохраняется)
     """
-    # Логируем "отзыв"
-    log_system_event(db, {
+    # Логируем "отзыв" через буфер, без записи в БД на пути запроса
+    log_writer.log_system_event({
         "event_type": "feedback",
         "description": f"Получен отзыв: '{feedback}' с рейтингом {rating}",
         "ip_address": request.client.host
@@ -164,10 +240,16 @@ async def submit_feedback(
 
 
 @api_router.get("/server-status")
-async def get_server_status():
+@response_cache.cached(ttl=5)
+async def get_server_status(
+        real: bool = Query(False, description="Настоящие CPU, память и время работы процесса")
+):
     """
-    Статус сервера (всегда проблемный)
+    Статус сервера (всегда проблемный). С real=true - честные цифры процесса
     """
+    if real:
+        return {"status": "Работает (как ни странно)", "process": process_stats()}
+
     statuses = [
         {
             "status": "Работает неправильно",
@@ -193,6 +275,7 @@ async def get_server_status():
 
 
 @api_router.get("/random-quote")
+@response_cache.cached(ttl=10)
 async def get_random_quote():
     """
     Случайная 'мудрая' цитата
@@ -212,4 +295,225 @@ async def get_random_quote():
         "author": "Неизвестный мудрец из IT",
         "category": "Программистская мудрость",
         "reliability": "Сомнительная"
-    }
\ No newline at end of file
+    }
+
+
+@api_router.get("/cache-stats")
+async def get_cache_stats():
+    """
+    Попадания и промахи кэша ответов - для подбора TTL
+    """
+    return response_cache.stats()
+
+
+@public_api_router.get("/username-available")
+async def check_username_available(
+        username: str = Query(..., max_length=50),
+        db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Свободно ли имя пользователя. Большинство свободных имен отсекает фильтр Блума
+    без запроса к базе; ответ носит рекомендательный характер - окончательно
+    имя проверяется при регистрации.
+    """
+    if len(username) < 3:
+        return {"username": username, "available": False, "reason": "too_short", "source": "validation"}
+
+    taken, source = await username_index.is_taken(db, username)
+    return {
+        "username": username,
+        "available": not taken,
+        "reason": "taken" if taken else None,
+        "source": source,
+    }
+
+
+@api_router.get("/session-stats")
+async def get_session_stats():
+    """
+    Кэш токенов сессий и размер списка отзыва
+    """
+    return session_manager.stats()
+
+
+@api_router.get("/username-index-stats")
+async def get_username_index_stats():
+    """
+    Состояние индекса имен: размер фильтра и сколько проверок обошлось без базы
+    """
+    return username_index.stats()
+
+
+@api_router.get("/archive")
+async def get_archive_index():
+    """
+    Какие дни уже уехали из базы в архив и сколько места они занимают
+    """
+    return {
+        "retention_days": {
+            "system_logs": settings.RETENTION_SYSTEM_LOG_DAYS,
+            "registration_attempts": settings.RETENTION_REGISTRATION_ATTEMPT_DAYS,
+        },
+        "tables": {table: await run_in_threadpool(archive_days, table) for table in ARCHIVED_TABLES},
+    }
+
+
+@api_router.get("/archive/{table}")
+async def get_archived_rows(
+        table: str,
+        since: date = Query(..., description="Первый день (UTC)"),
+        until: Optional[date] = Query(None, description="Последний день (UTC), по умолчанию since"),
+        event_type: Optional[str] = Query(None, description="Только для system_logs"),
+        user_id: Optional[int] = Query(None, description="Только для system_logs"),
+        username: Optional[str] = Query(None, description="Только для registration_attempts"),
+        ip_address: Optional[str] = None,
+        limit: int = Query(1000, ge=1, le=10000)
+):
+    """
+    Строки из архива для аудита. Архив не индексирован: фильтры проверяются
+    перебором, поэтому окно ограничено годом.
+    """
+    if table not in ARCHIVED_TABLES:
+        raise HTTPException(status_code=404, detail=f"Архива {table} нет. Есть: {', '.join(ARCHIVED_TABLES)}")
+    until = until or since
+    if until < since or (until - since).days > 366:
+        raise HTTPException(status_code=400, detail="Окно архива - от since до until, не больше года")
+
+    filters = {"ip_address": ip_address}
+    if table == SystemLog.__tablename__:
+        filters.update(event_type=event_type, user_id=None if user_id is None else str(user_id))
+    else:
+        filters.update(username_attempt=username)
+
+    rows = await run_in_threadpool(lambda: list(read_archive(table, since, until, filters, limit)))
+    return {"table": table, "since": since, "until": until, "count": len(rows), "rows": rows}
+
+
+def _subscribe_live_feed():
+    try:
+        return live_feed.subscribe()
+    except LiveFeedFullError:
+        raise HTTPException(status_code=503, detail="Зрителей слишком много. Ничего интересного вы не пропускаете.",
+                            headers={"Retry-After": "30"})
+
+
+@api_router.get("/live")
+async def live_events():
+    """
+    Server-Sent Events: новые системные логи (event: logs) и статус сервера
+    (event: status) из общей для всех клиентов фоновой выборки
+    """
+    subscriber = _subscribe_live_feed()
+    return StreamingResponse(
+        sse_events(subscriber),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Кадры уходят сразу: без буферизации nginx и без GZipMiddleware, который копит поток
+            "X-Accel-Buffering": "no",
+            "Content-Encoding": "identity",
+        }
+    )
+
+
+@public_api_router.websocket("/live/ws")
+async def live_websocket(websocket: WebSocket):
+    """
+    Та же лента через WebSocket: сообщения {"event": ..., "data": ...}. Сессия
+    проверяется здесь, а не зависимостью роутера - ответить 401 в WebSocket нельзя
+    """
+    token = token_from_request(websocket)
+    try:
+        if not token:
+            raise SessionRequiredError("missing")
+        session_manager.verify(token)
+        subscriber = live_feed.subscribe()
+    except (SessionRequiredError, LiveFeedFullError):
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+
+    async def forward():
+        while True:
+            frame = await subscriber.queue.get()
+            if frame is None:
+                # Клиент не успевал читать - отключаем, пусть переподключится
+                await websocket.close(code=1013)
+                return
+            await websocket.send_text(frame.message)
+
+    async def wait_for_disconnect():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    tasks = [asyncio.create_task(forward()), asyncio.create_task(wait_for_disconnect())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            # Ошибка отправки в уже закрытое соединение - обычное отключение клиента
+            task.exception()
+    finally:
+        for task in tasks:
+            task.cancel()
+        live_feed.unsubscribe(subscriber)
+
+
+@api_router.get("/live-stats")
+async def get_live_stats():
+    """
+    Подписчики живой ленты, тики производителя и отключенные медленные клиенты
+    """
+    return live_feed.stats()
+
+
+@api_router.get("/export/{table}", dependencies=[Depends(require_admin)])
+async def export_table(
+        table: str,
+        format: str = Query("csv", pattern=f"^({'|'.join(FORMATS)})$"),
+        gzip: bool = Query(False, description="Сжать csv/jsonl на лету"),
+        since_id: Optional[int] = Query(None, ge=0, description="Только строки с id больше этого"),
+        since: Optional[datetime] = Query(None, description="Только строки не раньше (UTC)")
+):
+    """
+    Полная выгрузка таблицы потоком, кусками по первичному ключу, без роста памяти
+    (только для администраторов; без паролей и телефонов).
+    Для инкрементальной выгрузки передайте since_id = id последней полученной строки
+    """
+    try:
+        export = Export(table, format, gzip, since_id, since)
+    except ExportError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    return StreamingResponse(
+        aiter_export(export),
+        media_type=export.media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{export.filename}"',
+            # Сжатие решает параметр gzip, GZipMiddleware поток не трогает
+            "Content-Encoding": "identity",
+        }
+    )
+
+
+@api_router.get("/profiles", dependencies=[Depends(require_admin)])
+async def get_profiles():
+    """
+    Отчеты профилировщика (PROFILING_ENABLED): явно профилированные и медленные запросы, новые первыми
+    """
+    return {
+        "enabled": settings.PROFILING_ENABLED,
+        "slow_request_ms": settings.PROFILING_SLOW_REQUEST_MS,
+        "profiles": await run_in_threadpool(dump_ring.summaries),
+    }
+
+
+@api_router.get("/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_profile(profile_id: str):
+    """
+    Полный отчет: SQL-запросы с длительностями и свернутые стеки (формат flamegraph.pl)
+    """
+    report = await run_in_threadpool(dump_ring.read, profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Такого отчета нет. Возможно, его вытеснили более медленные.")
+    return report
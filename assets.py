@@ -0,0 +1,153 @@
+"""
+Статические файлы: сборка с хешем содержимого в имени и раздача предсжатых версий.
+
+Исходники лежат в static/src. Сборка копирует их в static/dist с хешем в имени
+(base.css -> base.3f2a9c1d0e.css), рядом кладет .gz и .br (если установлен
+brotli) и пишет manifest.json. Такие файлы можно кэшировать в браузере навсегда.
+
+Запуск:
+    python assets.py
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+from functools import lru_cache
+from typing import Dict, Optional
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = "static"
+SRC_DIR = os.path.join(STATIC_DIR, "src")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_PATH = os.path.join(DIST_DIR, "manifest.json")
+
+STATIC_URL = "/static"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".json", ".wav", ".txt", ".html"}
+
+# Сжатая версия сохраняется, только если она хотя бы на 10% меньше исходника
+MIN_COMPRESSION_GAIN = 0.9
+
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(data)
+
+
+def build_assets(src_dir: str = SRC_DIR, dist_dir: str = DIST_DIR) -> Dict[str, str]:
+    """Собрать static/dist и вернуть манифест {исходный путь: путь с хешем}"""
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+
+    manifest = {}
+    for root, _, files in os.walk(src_dir):
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            logical = os.path.relpath(source, src_dir).replace(os.sep, "/")
+
+            with open(source, "rb") as file:
+                data = file.read()
+
+            stem, extension = os.path.splitext(logical)
+            digest = hashlib.sha256(data).hexdigest()[:10]
+            hashed = f"{stem}.{digest}{extension}"
+            target = os.path.join(dist_dir, hashed)
+            _write(target, data)
+
+            if extension in COMPRESSIBLE_EXTENSIONS:
+                compressed = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+                if brotli is not None:
+                    compressed[".br"] = brotli.compress(data, quality=11)
+                for suffix, payload in compressed.items():
+                    if len(payload) < len(data) * MIN_COMPRESSION_GAIN:
+                        _write(target + suffix, payload)
+
+            manifest[logical] = hashed
+
+    _write(os.path.join(dist_dir, "manifest.json"), json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+    load_manifest.cache_clear()
+    return manifest
+
+
+@lru_cache(maxsize=None)
+def load_manifest() -> Dict[str, str]:
+    """Манифест последней сборки (пустой, если сборки не было)"""
+    try:
+        with open(MANIFEST_PATH, encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def asset_url(path: str) -> str:
+    """URL статического файла: собранная версия с хешем, если она есть, иначе исходник"""
+    hashed = load_manifest().get(path)
+    if hashed:
+        return f"{STATIC_URL}/dist/{hashed}"
+    return f"{STATIC_URL}/src/{path}"
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles, который отдает готовые .br/.gz, если клиент их принимает,
+    и помечает собранные файлы из dist/ как immutable.
+    """
+
+    def _accepted_encodings(self, scope: Scope):
+        accept = Headers(scope=scope).get("accept-encoding", "")
+        accepted = {part.split(";")[0].strip() for part in accept.split(",")}
+        return [(encoding, suffix) for encoding, suffix in ENCODINGS if encoding in accepted]
+
+    async def _precompressed_response(self, path: str, scope: Scope) -> Optional[Response]:
+        for encoding, suffix in self._accepted_encodings(scope):
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result is None:
+                continue
+
+            response = FileResponse(
+                full_path,
+                stat_result=stat_result,
+                method=scope["method"],
+                media_type=mimetypes.guess_type(path)[0] or "application/octet-stream",
+                headers={"Content-Encoding": encoding}
+            )
+            if self.is_not_modified(response.headers, Headers(scope=scope)):
+                return NotModifiedResponse(response.headers)
+            return response
+        return None
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        immutable = path.startswith("dist/")
+
+        response = None
+        if immutable and scope["method"] in ("GET", "HEAD"):
+            response = await self._precompressed_response(path, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
+
+        if immutable:
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+            response.headers.add_vary_header("Accept-Encoding")
+        return response
+
+
+if __name__ == "__main__":
+    built = build_assets()
+    print(f"✅ Собрано файлов: {len(built)} -> {DIST_DIR}")
@@ -0,0 +1,688 @@
+"""
+Нагрузочные и микро-бенчмарки LoL Stats Service.
+
+Бенчмарк работает с отдельной базой SQLite (по умолчанию ./benchmark.db),
+которую заполняет команда seed. Приложение нагружается в том же процессе
+(httpx + ASGITransport) и/или через настоящий uvicorn. Для каждого маршрута
+считаются пропускная способность и задержки p50/p95/p99; результат пишется
+в JSON, который можно сравнить с сохраненным базовым прогоном.
+
+Запуск:
+    python benchmark.py seed --users 10000 --attempts 100000 --logs 100000
+    python benchmark.py run --mode both --concurrency 32 --requests 2000 --output bench.json
+    python benchmark.py micro --output micro.json
+    python benchmark.py compare benchmark_baseline.json bench.json --tolerance 0.15
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import secrets
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+BENCHMARK_DATABASE = "./benchmark.db"
+SEED_PASSWORD = "benchmark-password"
+SEED_USERNAME = "bench_user_{}"
+RACES = ["Эльф-программист", "Орк-аналитик", "Гном-тестировщик", "Человек-менеджер", "Дракон-DevOps"]
+EVENT_TYPES = ["feedback", "registration", "login", "server_mood_swing"]
+
+
+def configure_environment(database_path: str):
+    """
+    Настройки приложения читаются при импорте config, поэтому окружение
+    выставляется до первого импорта модулей приложения. DATABASE_URL
+    перезаписывается всегда: seed очищает таблицы, и рабочая база не должна
+    попасть под него случайно. Ограничение частоты отключается: весь трафик
+    бенчмарка идет с одного IP. Без своего SECRET_KEY сервер не стартует,
+    поэтому бенчмарк задает одноразовый - общий для себя и воркеров uvicorn.
+    """
+    os.environ["DATABASE_URL"] = f"sqlite:///{database_path}"
+    os.environ["RATE_LIMIT_ENABLED"] = "False"
+    os.environ.setdefault("SECRET_KEY", secrets.token_hex(32))
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """Перцентиль по методу ближайшего ранга"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(fraction * len(sorted_values) + 0.999999))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def latency_summary(latencies: List[float], scale: float) -> Dict[str, float]:
+    values = sorted(latencies)
+    return {
+        "mean": round(sum(values) / len(values) * scale, 3) if values else 0.0,
+        "p50": round(percentile(values, 0.50) * scale, 3),
+        "p95": round(percentile(values, 0.95) * scale, 3),
+        "p99": round(percentile(values, 0.99) * scale, 3),
+        "max": round(values[-1] * scale, 3) if values else 0.0,
+    }
+
+
+# --- Наполнение базы ---------------------------------------------------------
+
+def _insert_batches(connection, table, rows, batch_size: int):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            connection.execute(table.insert(), batch)
+            batch = []
+    if batch:
+        connection.execute(table.insert(), batch)
+
+
+def seed(users: int, attempts: int, logs: int, batch_size: int = 5000, days: int = 7) -> Dict[str, int]:
+    """Пересоздать данные бенчмарка: пользователи, попытки регистрации, системные логи"""
+    from sqlalchemy import delete
+
+    from database import engine, RegistrationAttempt, SystemLog, User
+    from hashing import get_password_hash
+    from migrations import upgrade
+    from registration_stats import rebuild_counters, rebuild_totals
+
+    upgrade(engine)
+
+    # Один хеш на всех: bcrypt для каждого из сотен тысяч пользователей занял бы часы
+    password_hash = get_password_hash(SEED_PASSWORD)
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    span = days * 24 * 3600
+
+    def moment():
+        return now - timedelta(seconds=rng.uniform(0, span))
+
+    def ip():
+        return f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+
+    with engine.begin() as connection:
+        for model in (SystemLog, RegistrationAttempt, User):
+            connection.execute(delete(model))
+
+        _insert_batches(connection, User.__table__, (
+            {
+                "username": SEED_USERNAME.format(i),
+                "phone_number": f"+7{i:010d}"[:12],
+                "password_hash": password_hash,
+                "race_class": rng.choice(RACES),
+                "registration_date": moment(),
+                "is_active": True,
+                "failed_attempts": 0,
+            }
+            for i in range(users)
+        ), batch_size)
+
+        _insert_batches(connection, RegistrationAttempt.__table__, (
+            {
+                "username_attempt": f"attempt_{i}",
+                "phone_attempt": f"+7{i:010d}"[:12],
+                "ip_address": ip(),
+                "attempt_date": moment(),
+                "success": rng.random() < 0.3,
+                "error_message": None,
+            }
+            for i in range(attempts)
+        ), batch_size)
+
+        _insert_batches(connection, SystemLog.__table__, (
+            {
+                "event_type": rng.choice(EVENT_TYPES),
+                "description": f"Событие бенчмарка #{i}",
+                "timestamp": moment(),
+                "ip_address": ip(),
+            }
+            for i in range(logs)
+        ), batch_size)
+
+        rebuild_counters(connection)
+        rebuild_totals(connection)
+
+    return {"users": users, "attempts": attempts, "logs": logs}
+
+
+def dataset_size() -> Dict[str, int]:
+    """
+    Размер базы. seeded_users - только пользователи из seed (bench_user_0..N-1):
+    прошлые прогоны дописывают в users своих зарегистрированных, а входить
+    сценарий может лишь под засеянными именами с известным паролем.
+    """
+    from sqlalchemy import func, select
+
+    from database import engine, RegistrationAttempt, SystemLog, User
+
+    with engine.connect() as connection:
+        sizes = {
+            name: connection.execute(select(func.count()).select_from(model)).scalar_one()
+            for name, model in (("users", User), ("attempts", RegistrationAttempt), ("logs", SystemLog))
+        }
+        sizes["seeded_users"] = connection.execute(
+            select(func.count()).where(User.username.startswith(SEED_USERNAME.format(""), autoescape=True))
+        ).scalar_one()
+        return sizes
+
+
+# --- Нагрузка на маршруты ----------------------------------------------------
+
+class Scenario(NamedTuple):
+    name: str
+    method: str
+    path: str
+    build: Callable[[int], dict]
+    ok_statuses: frozenset
+
+
+def build_scenarios(users: int, run_id: str) -> List[Scenario]:
+    """Сценарии по маршрутам; build(i) возвращает аргументы i-го запроса; users - засеянные пользователи"""
+    rng = random.Random(7)
+
+    def register(i):
+        return {"data": {
+            "username": f"bench_{run_id}_{i}",
+            "phone_number": "+79991234567",
+            "password": SEED_PASSWORD,
+            "confirm_password": SEED_PASSWORD,
+            "race_class": RACES[i % len(RACES)],
+            "absurd_answer": "42",
+            "captcha_answer": "42",
+        }}
+
+    def login(i):
+        return {"data": {"username": SEED_USERNAME.format(rng.randrange(max(1, users))), "password": SEED_PASSWORD}}
+
+    def users_page(i):
+        return {"params": {"after": rng.randrange(max(1, users))}}
+
+    def nothing(i):
+        return {}
+
+    ok = frozenset({200})
+    return [
+        Scenario("GET /", "GET", "/", nothing, ok),
+        Scenario("GET /api/users", "GET", "/api/users", nothing, ok),
+        Scenario("GET /api/users?after", "GET", "/api/users", users_page, ok),
+        Scenario("GET /api/registration-attempts", "GET", "/api/registration-attempts", nothing, ok),
+        Scenario("GET /api/system-logs", "GET", "/api/system-logs", nothing, ok),
+        Scenario("GET /api/stats", "GET", "/api/stats", nothing, ok),
+        # 400 - штатный ответ: регистрация отказывает случайно по задумке
+        Scenario("POST /register", "POST", "/register", register, frozenset({303, 400})),
+        Scenario("POST /login", "POST", "/login", login, frozenset({303})),
+    ]
+
+
+def session_headers() -> Dict[str, str]:
+    """/api/* требует сессию; токен подписан тем же SECRET_KEY, что и у сервера"""
+    from sessions import encode_token
+
+    return {"Authorization": f"Bearer {encode_token(0, SEED_USERNAME.format(0))}"}
+
+
+async def drive(client, scenario: Scenario, total: int, concurrency: int, warmup: int) -> dict:
+    """Выполнить total запросов сценария с concurrency параллельными клиентами"""
+    import httpx
+
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    counter = itertools.count(-warmup)
+
+    async def worker():
+        while True:
+            i = next(counter)
+            if i >= total:
+                return
+            request = scenario.build(i + warmup)
+            started = time.perf_counter()
+            try:
+                response = await client.request(scenario.method, scenario.path, **request)
+                status = str(response.status_code)
+            except httpx.HTTPError as exc:
+                status = type(exc).__name__
+            elapsed = time.perf_counter() - started
+            if i >= 0:
+                latencies.append(elapsed)
+                statuses[status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+
+    ok = {str(status) for status in scenario.ok_statuses}
+    return {
+        "requests": len(latencies),
+        "errors": sum(count for status, count in statuses.items() if status not in ok),
+        "statuses": dict(sorted(statuses.items())),
+        "throughput_rps": round(len(latencies) / duration, 2) if duration else 0.0,
+        "latency_ms": latency_summary(latencies, 1000),
+    }
+
+
+async def drive_all(client, scenarios: List[Scenario], args) -> Dict[str, dict]:
+    results = {}
+    for scenario in scenarios:
+        if args.only and not any(part in scenario.name for part in args.only):
+            continue
+        results[scenario.name] = await drive(client, scenario, args.requests, args.concurrency, args.warmup)
+        stats = results[scenario.name]
+        print(f"  {scenario.name:<36} {stats['throughput_rps']:>9.1f} rps  "
+              f"p50 {stats['latency_ms']['p50']:>8.2f} ms  p99 {stats['latency_ms']['p99']:>8.2f} ms  "
+              f"ошибок {stats['errors']}")
+    return results
+
+
+async def run_inprocess(scenarios: List[Scenario], args) -> Dict[str, dict]:
+    """Приложение в том же процессе: измеряется сам код без сети и HTTP-сервера"""
+    import httpx
+
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60,
+                                     headers=session_headers()) as client:
+            return await drive_all(client, scenarios, args)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_for_server(client, process, timeout: float):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn завершился с кодом {process.returncode}")
+        try:
+            await client.get("/api/server-status")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn не поднялся за отведенное время")
+
+
+async def run_uvicorn(scenarios: List[Scenario], args) -> Dict[str, dict]:
+    """Настоящий uvicorn в отдельном процессе и конкурентный HTTP-клиент"""
+    import httpx
+
+    port = args.port or _free_port()
+    process = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+    ], env=os.environ.copy())
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60,
+                                     headers=session_headers()) as client:
+            await _wait_for_server(client, process, timeout=60)
+            return await drive_all(client, scenarios, args)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+# --- Микро-бенчмарки ---------------------------------------------------------
+
+def timed(func: Callable[[], object], iterations: int) -> dict:
+    """Время одного вызова func по iterations повторам"""
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - started)
+    total = sum(latencies)
+    return {
+        "iterations": iterations,
+        "ops_per_sec": round(iterations / total, 2) if total else 0.0,
+        "latency_us": latency_summary(latencies, 1_000_000),
+    }
+
+
+async def _hash_pool_throughput(count: int) -> dict:
+    from hashing import password_hasher
+
+    batch = max(1, min(count, password_hasher.max_pending))
+    started = time.perf_counter()
+    done = 0
+    while done < count:
+        size = min(batch, count - done)
+        await asyncio.gather(*(password_hasher.hash(SEED_PASSWORD) for _ in range(size)))
+        done += size
+    duration = time.perf_counter() - started
+    password_hasher.shutdown()
+    return {"iterations": count, "workers": password_hasher.workers, "ops_per_sec": round(count / duration, 2)}
+
+
+def run_micro(args) -> Dict[str, dict]:
+    """Хеширование паролей, сериализация ответов API, метрики и сессии"""
+    from hashing import get_password_hash, verify_password
+
+    results = {}
+    hashed = get_password_hash(SEED_PASSWORD)
+    results["hashing.get_password_hash"] = timed(lambda: get_password_hash(SEED_PASSWORD), args.hash_iterations)
+    results["hashing.verify_password"] = timed(lambda: verify_password(SEED_PASSWORD, hashed), args.hash_iterations)
+    results["hashing.pool_throughput"] = asyncio.run(_hash_pool_throughput(args.hash_iterations * 4))
+
+    n = args.serialization_iterations
+    results.update(run_serialization_micro(args.large_page_size, max(1, n // 10)))
+    results.update(run_metrics_micro(n))
+    results.update(run_session_micro(n))
+
+    for name, stats in results.items():
+        print(f"  {name:<40} {stats['ops_per_sec']:>12.1f} ops/s")
+    overhead = (results["metrics.asgi_with_middleware"]["latency_us"]["mean"]
+                - results["metrics.asgi_without_middleware"]["latency_us"]["mean"])
+    print(f"  Накладные расходы MetricsMiddleware: {overhead:.2f} мкс на запрос")
+    overhead = (results["profiling.asgi_untriggered"]["latency_us"]["mean"]
+                - results["metrics.asgi_without_middleware"]["latency_us"]["mean"])
+    print(f"  Накладные расходы ProfilingMiddleware без профиля: {overhead:.2f} мкс на запрос")
+    for table in ("users", "system_logs"):
+        legacy = results[f"serialization.{table}_orm_jsonable"]["latency_us"]["mean"]
+        fast = results[f"serialization.{table}_columns_fast_json"]["latency_us"]["mean"]
+        rows = results[f"serialization.{table}_columns_fast_json"]["rows"]
+        print(f"  {table}: {legacy / rows:.2f} -> {fast / rows:.2f} мкс на строку ({legacy / fast:.1f}x)")
+    return results
+
+
+def run_serialization_micro(page_size: int, iterations: int) -> Dict[str, dict]:
+    """
+    Большая страница /api/users и /api/system-logs от запроса до байтов ответа:
+    как было (ORM-объекты, isoformat, jsonable_encoder, json.dumps) и как есть
+    (выборка колонок, fast_json). Отдельно - только кодирование готовой страницы.
+    """
+    from fastapi.encoders import jsonable_encoder
+    from sqlalchemy import select
+
+    from api_routes import users_page_query
+    from database import SessionLocal, SystemLog, User
+    from fast_json import dumps, rows_to_dicts
+    from log_search import system_logs_query
+
+    def legacy_user(user):
+        return {
+            "id": user.id,
+            "username": user.username,
+            "race_class": user.race_class,
+            "registration_date": user.registration_date.isoformat(),
+            "failed_attempts": user.failed_attempts,
+            "is_active": user.is_active,
+            "last_login": user.last_login.isoformat() if user.last_login else None
+        }
+
+    def legacy_log(log):
+        return {
+            "id": log.id,
+            "event_type": log.event_type,
+            "user_id": log.user_id,
+            "description": log.description,
+            "timestamp": log.timestamp.isoformat(),
+            "ip_address": log.ip_address
+        }
+
+    def legacy_json(page) -> bytes:
+        return json.dumps(jsonable_encoder(page), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    results = {}
+    with SessionLocal() as db:
+        def legacy_users():
+            db.expunge_all()
+            users = db.execute(select(User).order_by(User.id).limit(page_size)).scalars().all()
+            return legacy_json([legacy_user(user) for user in users])
+
+        def legacy_logs():
+            db.expunge_all()
+            logs = db.execute(
+                select(SystemLog).order_by(SystemLog.timestamp.desc(), SystemLog.id.desc()).limit(page_size)
+            ).scalars().all()
+            return legacy_json([legacy_log(log) for log in logs])
+
+        cases = {
+            "users_orm_jsonable": legacy_users,
+            "users_columns_fast_json": lambda: dumps(rows_to_dicts(db.execute(users_page_query(page_size)).all())),
+            "system_logs_orm_jsonable": legacy_logs,
+            "system_logs_columns_fast_json": lambda: dumps(rows_to_dicts(
+                db.execute(system_logs_query(db.bind.dialect.name, page_size)).all()
+            )),
+        }
+        assert json.loads(legacy_logs()) == json.loads(cases["system_logs_columns_fast_json"]())
+        rows = len(json.loads(legacy_logs()))
+        for name, case in cases.items():
+            results[f"serialization.{name}"] = {**timed(case, iterations), "rows": rows}
+
+        page = rows_to_dicts(db.execute(system_logs_query(db.bind.dialect.name, page_size)).all())
+    results["serialization.jsonable_encoder_page"] = timed(lambda: legacy_json(page), iterations)
+    results["serialization.fast_json_page"] = timed(lambda: dumps(page), iterations)
+    return results
+
+
+def run_metrics_micro(iterations: int) -> Dict[str, dict]:
+    """Цена инструментирования: ASGI-запрос с MetricsMiddleware, ProfilingMiddleware и без них, сбор /metrics"""
+    from metrics import MetricsMiddleware, render
+    from profiling import ProfilingMiddleware
+
+    async def plain_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    instrumented = MetricsMiddleware(plain_app)
+    profiled = ProfilingMiddleware(plain_app)
+    scope = {"type": "http", "method": "GET", "path": "/benchmark", "root_path": "", "headers": [], "query_string": b""}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    def call(app):
+        def request():
+            coroutine = app(dict(scope), receive, send)
+            try:
+                coroutine.send(None)
+            except StopIteration:
+                pass
+        return request
+
+    return {
+        "metrics.asgi_without_middleware": timed(call(plain_app), iterations * 20),
+        "metrics.asgi_with_middleware": timed(call(instrumented), iterations * 20),
+        "profiling.asgi_untriggered": timed(call(profiled), iterations * 20),
+        "metrics.render": timed(render, iterations),
+    }
+
+
+def run_session_micro(iterations: int) -> Dict[str, dict]:
+    """Проверка токена сессии: разбор с проверкой подписи и попадание в кэш"""
+    from sessions import SessionManager, decode_token, encode_token
+
+    token = encode_token(0, SEED_USERNAME.format(0))
+    manager = SessionManager(cache_size=16)
+    return {
+        "sessions.decode_token": timed(lambda: decode_token(token), iterations * 20),
+        "sessions.verify_cached": timed(lambda: manager.verify(token), iterations * 20),
+    }
+
+
+# --- Отчет и сравнение -------------------------------------------------------
+
+def metadata(args) -> dict:
+    from config import settings
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "database_url": settings.DATABASE_URL,
+        "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+        "dataset": dataset_size(),
+        "parameters": {key: value for key, value in vars(args).items() if key != "handler"},
+    }
+
+
+def write_report(report: dict, path: Optional[str]):
+    text = json.dumps(report, ensure_ascii=False, indent=2, sort_keys=True)
+    if path:
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+        print(f"✅ Результаты записаны в {path}")
+    else:
+        print(text)
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> List[str]:
+    """
+    Регрессии относительно базового прогона: рост p95 или падение
+    пропускной способности больше чем на tolerance (доля).
+    """
+    regressions = []
+
+    for mode, endpoints in current.get("load", {}).items():
+        for name, stats in endpoints.items():
+            base = baseline.get("load", {}).get(mode, {}).get(name)
+            if not base:
+                continue
+            p95, base_p95 = stats["latency_ms"]["p95"], base["latency_ms"]["p95"]
+            if base_p95 and p95 > base_p95 * (1 + tolerance):
+                regressions.append(f"{mode} {name}: p95 {base_p95} -> {p95} ms")
+            rps, base_rps = stats["throughput_rps"], base["throughput_rps"]
+            if base_rps and rps < base_rps * (1 - tolerance):
+                regressions.append(f"{mode} {name}: {base_rps} -> {rps} rps")
+            if stats["errors"] > base["errors"]:
+                regressions.append(f"{mode} {name}: ошибок {base['errors']} -> {stats['errors']}")
+
+    for name, stats in current.get("micro", {}).items():
+        base = baseline.get("micro", {}).get(name)
+        if base and base["ops_per_sec"] and stats["ops_per_sec"] < base["ops_per_sec"] * (1 - tolerance):
+            regressions.append(f"micro {name}: {base['ops_per_sec']} -> {stats['ops_per_sec']} ops/s")
+
+    return regressions
+
+
+# --- Командная строка --------------------------------------------------------
+
+def command_seed(args) -> int:
+    counts = seed(args.users, args.attempts, args.logs, batch_size=args.batch_size, days=args.days)
+    print(f"✅ База бенчмарка заполнена: {counts}")
+    return 0
+
+
+def command_run(args) -> int:
+    seeded_users = dataset_size()["seeded_users"]
+    if not seeded_users:
+        print("❌ База бенчмарка пуста, сначала выполните: python benchmark.py seed")
+        return 2
+
+    scenarios = build_scenarios(seeded_users, run_id=str(int(time.time())))
+    report = {"meta": metadata(args), "load": {}}
+
+    if args.mode in ("inprocess", "both"):
+        print("⏱  В процессе (ASGITransport):")
+        report["load"]["inprocess"] = asyncio.run(run_inprocess(scenarios, args))
+    if args.mode in ("uvicorn", "both"):
+        print(f"⏱  uvicorn, воркеров: {args.workers}:")
+        report["load"]["uvicorn"] = asyncio.run(run_uvicorn(scenarios, args))
+    if not args.skip_micro:
+        print("⏱  Микро-бенчмарки:")
+        report["micro"] = run_micro(args)
+
+    write_report(report, args.output)
+    return 0
+
+
+def command_micro(args) -> int:
+    write_report({"meta": metadata(args), "micro": run_micro(args)}, args.output)
+    return 0
+
+
+def command_compare(args) -> int:
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    with open(args.current, encoding="utf-8") as file:
+        current = json.load(file)
+
+    regressions = compare(baseline, current, args.tolerance)
+    for line in regressions:
+        print(f"❌ {line}")
+    if not regressions:
+        print(f"✅ Регрессий больше {args.tolerance:.0%} не найдено")
+    return 1 if regressions else 0
+
+
+def _add_micro_arguments(parser):
+    parser.add_argument("--hash-iterations", type=int, default=20)
+    parser.add_argument("--serialization-iterations", type=int, default=500)
+    parser.add_argument("--large-page-size", type=int, default=1000, help="строк в странице для сериализации")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Бенчмарки LoL Stats Service")
+    parser.add_argument("--database", default=BENCHMARK_DATABASE, help="файл SQLite для бенчмарка")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="заполнить базу бенчмарка")
+    seed_parser.add_argument("--users", type=int, default=10_000)
+    seed_parser.add_argument("--attempts", type=int, default=100_000)
+    seed_parser.add_argument("--logs", type=int, default=100_000)
+    seed_parser.add_argument("--days", type=int, default=7, help="за сколько дней разбросать даты")
+    seed_parser.add_argument("--batch-size", type=int, default=5000)
+    seed_parser.set_defaults(handler=command_seed)
+
+    run_parser = commands.add_parser("run", help="нагрузить маршруты")
+    run_parser.add_argument("--mode", choices=("inprocess", "uvicorn", "both"), default="inprocess")
+    run_parser.add_argument("--concurrency", type=int, default=16)
+    run_parser.add_argument("--requests", type=int, default=500, help="запросов на маршрут")
+    run_parser.add_argument("--warmup", type=int, default=20, help="запросов на прогрев без учета")
+    run_parser.add_argument("--workers", type=int, default=1, help="воркеров uvicorn")
+    run_parser.add_argument("--port", type=int, default=0)
+    run_parser.add_argument("--only", nargs="*", help="только маршруты, содержащие эти подстроки")
+    run_parser.add_argument("--skip-micro", action="store_true")
+    run_parser.add_argument("--output", help="файл для JSON-отчета (по умолчанию stdout)")
+    _add_micro_arguments(run_parser)
+    run_parser.set_defaults(handler=command_run)
+
+    micro_parser = commands.add_parser("micro", help="микро-бенчмарки хеширования и сериализации")
+    micro_parser.add_argument("--output")
+    _add_micro_arguments(micro_parser)
+    micro_parser.set_defaults(handler=command_micro)
+
+    compare_parser = commands.add_parser("compare", help="сравнить прогон с базовым")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--tolerance", type=float, default=0.15)
+    compare_parser.set_defaults(handler=command_compare)
+
+    return parser
+
+
+def main(argv: List[str]) -> int:
+    args = build_parser().parse_args(argv[1:])
+    configure_environment(args.database)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
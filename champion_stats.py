@@ -0,0 +1,583 @@
+"""
+Статистика чемпионов по выгрузкам матчей (JSON Lines / CSV).
+
+Файлы матчей читаются пачками в столбцы NumPy, после чего агрегаты
+(игры, победы, убийства, смерти, помощь, баны) добавляются в куб
+(день UTC, патч) -> массив [показатель, роль, чемпион]. Сырые матчи после
+агрегации не хранятся: память зависит от числа дней и патчей, а не матчей,
+и запрос с фильтром по патчу, роли и окну дат складывает лишь несколько
+сотен маленьких массивов.
+
+Новые файлы и дописанные хвосты старых подхватываются инкрементально:
+для каждого файла запоминается прочитанное смещение.
+
+При нескольких воркерах файлы читает один из них - владелец блокировки
+<снимок>.lock; он же пишет снимок. Остальные только перечитывают снимок,
+когда тот меняется. Упавшего владельца заменяет тот воркер, который первым
+возьмет блокировку. Без fcntl (Windows) или без снимка каждый воркер читает
+файлы сам.
+
+Форматы:
+    *.jsonl - по матчу в строке:
+        {"match_id": "...", "timestamp": 1700000000, "patch": "14.3",
+         "participants": [{"champion": "Ahri", "role": "mid", "win": true,
+                           "kills": 5, "deaths": 2, "assists": 7}, ...],
+         "bans": ["Yasuo", "Zed"]}
+    *.csv - по участнику в строке, колонки
+        match_id,timestamp,patch,champion,role,win,kills,deaths,assists[,bans]
+        (bans - чемпионы через ';', берутся из первой строки матча)
+
+timestamp - unix-время в секундах или миллисекундах либо ISO 8601.
+
+Запуск:
+    python champion_stats.py [каталог]   - загрузить файлы и вывести топ чемпионов
+"""
+
+import asyncio
+import csv
+import io
+import json
+import os
+import sys
+import threading
+import time
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+import log_writer
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SECONDS_PER_DAY = 86400
+
+# Порядок показателей в кубе
+GAMES, WINS, KILLS, DEATHS, ASSISTS = range(5)
+STAT_COUNT = 5
+
+SORT_FIELDS = ("games", "win_rate", "pick_rate", "ban_rate", "kda")
+
+MATCH_FILE_EXTENSIONS = (".jsonl", ".csv")
+
+
+def parse_timestamp(value) -> int:
+    """Unix-время в секундах из секунд, миллисекунд или ISO 8601"""
+    if isinstance(value, (int, float)):
+        return int(value / 1000 if value > 1e11 else value)
+    text = str(value).strip()
+    try:
+        number = float(text)
+    except ValueError:
+        moment = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return int(moment.timestamp())
+    return int(number / 1000 if number > 1e11 else number)
+
+
+def _parse_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "win", "victory")
+    return bool(value)
+
+
+class Dictionary:
+    """Кодирование строк в плотные целые коды"""
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+        for value in values:
+            self.encode(value)
+
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+
+class MatchBatch:
+    """Пачка разобранных матчей в виде столбцов (списки, затем массивы NumPy)"""
+
+    def __init__(self):
+        self.match_time: List[int] = []
+        self.match_patch: List[str] = []
+        self.time: List[int] = []
+        self.patch: List[str] = []
+        self.role: List[str] = []
+        self.champion: List[str] = []
+        self.stats: List[List[int]] = []
+        self.ban_time: List[int] = []
+        self.ban_patch: List[str] = []
+        self.ban_champion: List[str] = []
+        self.skipped = 0
+
+    def add_match(self, timestamp: int, patch: str, bans: Iterable[str]):
+        self.match_time.append(timestamp)
+        self.match_patch.append(patch)
+        for champion in bans:
+            if champion:
+                self.ban_time.append(timestamp)
+                self.ban_patch.append(patch)
+                self.ban_champion.append(champion)
+
+    @staticmethod
+    def participant_row(participant: dict) -> Tuple[str, str, List[int]]:
+        """(роль, чемпион, показатели) участника; ошибки формата всплывают до записи в пачку"""
+        return (
+            str(participant.get("role") or "unknown").lower(),
+            str(participant["champion"]),
+            [
+                1,
+                1 if _parse_bool(participant.get("win")) else 0,
+                int(participant.get("kills") or 0),
+                int(participant.get("deaths") or 0),
+                int(participant.get("assists") or 0),
+            ],
+        )
+
+    def add_participant(self, timestamp: int, patch: str, participant: Tuple[str, str, List[int]]):
+        role, champion, stats = participant
+        self.time.append(timestamp)
+        self.patch.append(patch)
+        self.role.append(role)
+        self.champion.append(champion)
+        self.stats.append(stats)
+
+    def __len__(self):
+        return len(self.match_time)
+
+
+def parse_jsonl(lines: Iterable[str], batch: MatchBatch):
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            match = json.loads(line)
+            timestamp = parse_timestamp(match["timestamp"])
+            patch = str(match.get("patch") or "unknown")
+            participants = [MatchBatch.participant_row(participant) for participant in match.get("participants") or ()]
+        except (KeyError, TypeError, ValueError):
+            batch.skipped += 1
+            continue
+        batch.add_match(timestamp, patch, match.get("bans") or ())
+        for participant in participants:
+            batch.add_participant(timestamp, patch, participant)
+
+
+def parse_csv(lines: Iterable[str], header: List[str], batch: MatchBatch,
+              last_match_id: Optional[str]) -> Optional[str]:
+    """Строки одного матча идут подряд; возвращает match_id последней строки"""
+    for row in csv.DictReader(lines, fieldnames=header):
+        try:
+            timestamp = parse_timestamp(row["timestamp"])
+            patch = row.get("patch") or "unknown"
+            participant = MatchBatch.participant_row(row)
+        except (KeyError, TypeError, ValueError):
+            batch.skipped += 1
+            continue
+        if row.get("match_id") != last_match_id:
+            batch.add_match(timestamp, patch, (row.get("bans") or "").split(";"))
+            last_match_id = row.get("match_id")
+        batch.add_participant(timestamp, patch, participant)
+    return last_match_id
+
+
+def _grow(array: np.ndarray, roles: int, champions: int) -> np.ndarray:
+    """Дополнить нулями массив [..., роль, чемпион] до нового числа ролей и чемпионов"""
+    pad_roles = roles - array.shape[-2]
+    pad_champions = champions - array.shape[-1]
+    if pad_roles <= 0 and pad_champions <= 0:
+        return array
+    padding = [(0, 0)] * (array.ndim - 2) + [(0, max(0, pad_roles)), (0, max(0, pad_champions))]
+    return np.pad(array, padding)
+
+
+class ChampionStatsStore:
+    """
+    Куб агрегатов по (день, патч). Добавление пачки и запросы защищены
+    блокировкой: файлы читаются в фоновом потоке, запросы идут из event loop.
+    """
+
+    def __init__(self):
+        self.champions = Dictionary()
+        self.roles = Dictionary()
+        self.patches = Dictionary()
+        # (день, код патча) -> [показатель, роль, чемпион]
+        self.cells: Dict[Tuple[int, int], np.ndarray] = {}
+        # (день, код патча) -> [роль=1, чемпион], чтобы баны росли вместе с чемпионами
+        self.bans: Dict[Tuple[int, int], np.ndarray] = {}
+        self.matches: Dict[Tuple[int, int], int] = {}
+        self.offsets: Dict[str, int] = {}
+        self.csv_headers: Dict[str, List[str]] = {}
+        self.csv_last_match: Dict[str, Optional[str]] = {}
+        self.last_updated: Optional[float] = None
+        self.skipped = 0
+        self.version = 0
+        self._lock = threading.Lock()
+
+    # --- Загрузка ------------------------------------------------------------
+
+    def add_batch(self, batch: MatchBatch):
+        """Векторно агрегировать пачку и прибавить к кубу"""
+        self.skipped += batch.skipped
+        if not len(batch) and not batch.time:
+            return
+
+        with self._lock:
+            participant_patch = np.fromiter((self.patches.encode(p) for p in batch.patch), np.int64, len(batch.patch))
+            role = np.fromiter((self.roles.encode(r) for r in batch.role), np.int64, len(batch.role))
+            champion = np.fromiter((self.champions.encode(c) for c in batch.champion), np.int64, len(batch.champion))
+            match_patch = np.fromiter((self.patches.encode(p) for p in batch.match_patch), np.int64, len(batch))
+            ban_patch = np.fromiter((self.patches.encode(p) for p in batch.ban_patch), np.int64, len(batch.ban_patch))
+            ban_champion = np.fromiter((self.champions.encode(c) for c in batch.ban_champion), np.int64,
+                                       len(batch.ban_champion))
+            roles, champions = len(self.roles), len(self.champions)
+
+            if batch.time:
+                keys, inverse = self._bucket_keys(np.asarray(batch.time, dtype=np.int64), participant_patch)
+                flat = (inverse * roles + role) * champions + champion
+                size = len(keys) * roles * champions
+                stats = np.asarray(batch.stats, dtype=np.int64)
+                cube = np.stack([
+                    np.bincount(flat, weights=stats[:, stat], minlength=size) for stat in range(STAT_COUNT)
+                ]).astype(np.int64).reshape(STAT_COUNT, len(keys), roles, champions)
+                for index, key in enumerate(keys):
+                    current = self.cells.get(key)
+                    cell = cube[:, index]
+                    self.cells[key] = cell if current is None else _grow(current, roles, champions) + cell
+
+            if len(batch):
+                keys, inverse = self._bucket_keys(np.asarray(batch.match_time, dtype=np.int64), match_patch)
+                for key, count in zip(keys, np.bincount(inverse, minlength=len(keys))):
+                    self.matches[key] = self.matches.get(key, 0) + int(count)
+
+            if batch.ban_time:
+                keys, inverse = self._bucket_keys(np.asarray(batch.ban_time, dtype=np.int64), ban_patch)
+                counts = np.bincount(inverse * champions + ban_champion, minlength=len(keys) * champions)
+                counts = counts.astype(np.int64).reshape(len(keys), 1, champions)
+                for index, key in enumerate(keys):
+                    current = self.bans.get(key)
+                    cell = counts[index]
+                    self.bans[key] = cell if current is None else _grow(current, 1, champions) + cell
+
+            self.last_updated = time.time()
+            self.version += 1
+
+    @staticmethod
+    def _bucket_keys(timestamps: np.ndarray, patches: np.ndarray):
+        days = timestamps // SECONDS_PER_DAY
+        unique, inverse = np.unique(np.stack([days, patches], axis=1), axis=0, return_inverse=True)
+        return [(int(day), int(patch)) for day, patch in unique], inverse.reshape(-1)
+
+    def ingest_file(self, path: str, batch_lines: int = 100_000) -> int:
+        """Дочитать файл с последнего смещения; возвращает число новых матчей"""
+        offset = self.offsets.get(path, 0)
+        if os.path.getsize(path) <= offset:
+            return 0
+
+        is_csv = path.endswith(".csv")
+        added = 0
+        with open(path, "rb") as file:
+            file.seek(offset)
+            while True:
+                chunk = file.readlines(batch_lines * 200)
+                if not chunk:
+                    break
+                # Недописанная последняя строка будет прочитана в следующий раз
+                if not chunk[-1].endswith(b"\n"):
+                    chunk.pop()
+                    if not chunk:
+                        break
+                lines = [line.decode("utf-8") for line in chunk]
+
+                batch = MatchBatch()
+                if is_csv:
+                    if path not in self.csv_headers:
+                        self.csv_headers[path] = next(csv.reader(io.StringIO(lines.pop(0))))
+                    self.csv_last_match[path] = parse_csv(
+                        lines, self.csv_headers[path], batch, self.csv_last_match.get(path)
+                    )
+                else:
+                    parse_jsonl(lines, batch)
+
+                self.add_batch(batch)
+                added += len(batch)
+                offset += sum(len(line) for line in chunk)
+                self.offsets[path] = offset
+        return added
+
+    def ingest_directory(self, directory: str) -> int:
+        """Подхватить новые файлы и новые строки в уже известных"""
+        if not os.path.isdir(directory):
+            return 0
+        added = 0
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(MATCH_FILE_EXTENSIONS):
+                added += self.ingest_file(os.path.join(directory, name))
+        return added
+
+    # --- Снимок на диске -----------------------------------------------------
+
+    def save(self, path: str):
+        """Сохранить куб и смещения файлов, чтобы не перечитывать все после рестарта"""
+        with self._lock:
+            roles, champions = len(self.roles), len(self.champions)
+            cell_keys = sorted(self.cells)
+            ban_keys = sorted(self.bans)
+            match_keys = sorted(self.matches)
+            meta = {
+                "champions": self.champions.values,
+                "roles": self.roles.values,
+                "patches": self.patches.values,
+                "offsets": self.offsets,
+                "csv_headers": self.csv_headers,
+                "csv_last_match": self.csv_last_match,
+                "last_updated": self.last_updated,
+            }
+            arrays = {
+                "cell_keys": np.asarray(cell_keys, dtype=np.int64).reshape(-1, 2),
+                "cells": np.stack([_grow(self.cells[key], roles, champions) for key in cell_keys])
+                if cell_keys else np.zeros((0, STAT_COUNT, roles, champions), dtype=np.int64),
+                "ban_keys": np.asarray(ban_keys, dtype=np.int64).reshape(-1, 2),
+                "bans": np.stack([_grow(self.bans[key], 1, champions) for key in ban_keys])
+                if ban_keys else np.zeros((0, 1, champions), dtype=np.int64),
+                "match_keys": np.asarray(match_keys, dtype=np.int64).reshape(-1, 2),
+                "matches": np.asarray([self.matches[key] for key in match_keys], dtype=np.int64),
+            }
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Свое имя у каждого процесса: два писателя не смешают байты в одном файле
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as file:
+            np.savez_compressed(file, meta=np.asarray(json.dumps(meta)), **arrays)
+        os.replace(temporary, path)
+
+    def load(self, path: str) -> bool:
+        """Загрузить снимок; False, если его нет"""
+        if not os.path.exists(path):
+            return False
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            with self._lock:
+                self.champions = Dictionary(meta["champions"])
+                self.roles = Dictionary(meta["roles"])
+                self.patches = Dictionary(meta["patches"])
+                self.offsets = meta["offsets"]
+                self.csv_headers = meta["csv_headers"]
+                self.csv_last_match = meta["csv_last_match"]
+                self.last_updated = meta["last_updated"]
+                self.cells = {tuple(map(int, key)): cell for key, cell in zip(data["cell_keys"], data["cells"])}
+                self.bans = {tuple(map(int, key)): cell for key, cell in zip(data["ban_keys"], data["bans"])}
+                self.matches = {tuple(map(int, key)): int(count)
+                                for key, count in zip(data["match_keys"], data["matches"])}
+                self.version += 1
+        return True
+
+    # --- Запросы -------------------------------------------------------------
+
+    def _select(self, patch: Optional[str], since: Optional[date], until: Optional[date]):
+        patch_code = self.patches.codes.get(patch) if patch is not None else None
+        first_day = (since - date(1970, 1, 1)).days if since else None
+        last_day = (until - date(1970, 1, 1)).days if until else None
+
+        def wanted(key):
+            day, code = key
+            if patch is not None and code != patch_code:
+                return False
+            if first_day is not None and day < first_day:
+                return False
+            return last_day is None or day <= last_day
+
+        return wanted
+
+    def query(self, patch: Optional[str] = None, role: Optional[str] = None,
+              since: Optional[date] = None, until: Optional[date] = None,
+              min_games: int = 0, sort: str = "games", limit: Optional[int] = None) -> dict:
+        """
+        Показатели по чемпионам. Окно since..until - по дням UTC включительно.
+        pick_rate и ban_rate считаются от числа матчей в выборке (без учета роли).
+        """
+        with self._lock:
+            roles, champions = len(self.roles), len(self.champions)
+            wanted = self._select(patch, since, until)
+
+            totals = np.zeros((STAT_COUNT, roles, champions), dtype=np.int64)
+            for key, cell in self.cells.items():
+                if wanted(key):
+                    totals += _grow(cell, roles, champions)
+            bans = np.zeros(champions, dtype=np.int64)
+            for key, cell in self.bans.items():
+                if wanted(key):
+                    bans += _grow(cell, 1, champions)[0]
+            matches = sum(count for key, count in self.matches.items() if wanted(key))
+            names = list(self.champions.values)
+            role_code = self.roles.codes.get(role.lower()) if role else None
+
+        if role:
+            stats = totals[:, role_code, :] if role_code is not None else np.zeros((STAT_COUNT, champions), np.int64)
+        else:
+            stats = totals.sum(axis=1)
+
+        games = stats[GAMES]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            per_game = np.where(games > 0, 1 / np.maximum(games, 1), 0.0)
+            table = {
+                "games": games,
+                "win_rate": stats[WINS] * per_game,
+                "pick_rate": games / matches if matches else np.zeros(champions),
+                "ban_rate": bans / matches if matches else np.zeros(champions),
+                "kda": (stats[KILLS] + stats[ASSISTS]) / np.maximum(stats[DEATHS], 1),
+                "kills": stats[KILLS] * per_game,
+                "deaths": stats[DEATHS] * per_game,
+                "assists": stats[ASSISTS] * per_game,
+            }
+
+        # Чемпион без игр попадает в выдачу, только если его банили и порог игр не задан
+        selected = np.flatnonzero((games >= max(min_games, 1)) | ((bans > 0) & (min_games <= 0)))
+        order = selected[np.argsort(-table[sort if sort in SORT_FIELDS else "games"][selected], kind="stable")]
+        if limit is not None:
+            order = order[:limit]
+
+        return {
+            "matches": int(matches),
+            "champions": [
+                {
+                    "champion": names[i],
+                    "games": int(games[i]),
+                    "win_rate": round(float(table["win_rate"][i]), 4),
+                    "pick_rate": round(float(table["pick_rate"][i]), 4),
+                    "ban_rate": round(float(table["ban_rate"][i]), 4),
+                    "average_kda": {
+                        "kills": round(float(table["kills"][i]), 2),
+                        "deaths": round(float(table["deaths"][i]), 2),
+                        "assists": round(float(table["assists"][i]), 2),
+                        "ratio": round(float(table["kda"][i]), 2),
+                    },
+                }
+                for i in order
+            ],
+        }
+
+    def summary(self) -> dict:
+        """Объем загруженных данных"""
+        with self._lock:
+            days = [day for day, _ in self.matches]
+            return {
+                "matches": sum(self.matches.values()),
+                "participants": int(sum(int(cell[GAMES].sum()) for cell in self.cells.values())),
+                "champions": len(self.champions),
+                "roles": list(self.roles.values),
+                "patches": list(self.patches.values),
+                "first_day": date.fromordinal(date(1970, 1, 1).toordinal() + min(days)).isoformat() if days else None,
+                "last_day": date.fromordinal(date(1970, 1, 1).toordinal() + max(days)).isoformat() if days else None,
+                "files": len(self.offsets),
+                "skipped_records": self.skipped,
+                "last_updated": datetime.utcfromtimestamp(self.last_updated).isoformat()
+                if self.last_updated else None,
+            }
+
+
+champion_stats = ChampionStatsStore()
+
+
+# Файл блокировки, пока этот процесс - владелец чтения файлов матчей
+_ingestion_lock = None
+# mtime_ns снимка, который сейчас в памяти (загружен или записан этим процессом)
+_snapshot_mtime: Optional[int] = None
+
+
+def _snapshot_stat_mtime() -> Optional[int]:
+    try:
+        return os.stat(settings.MATCH_STATS_SNAPSHOT).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def owns_ingestion() -> bool:
+    """Взять (или подтвердить) роль единственного читателя файлов матчей"""
+    global _ingestion_lock
+    if _ingestion_lock is not None or fcntl is None or not settings.MATCH_STATS_SNAPSHOT:
+        return True
+    os.makedirs(os.path.dirname(settings.MATCH_STATS_SNAPSHOT) or ".", exist_ok=True)
+    lock_file = open(settings.MATCH_STATS_SNAPSHOT + ".lock", "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return False
+    _ingestion_lock = lock_file
+    return True
+
+
+def reload_snapshot() -> bool:
+    """Перечитать снимок, если его записали после того, что сейчас в памяти"""
+    global _snapshot_mtime
+    if not settings.MATCH_STATS_SNAPSHOT:
+        return False
+    mtime = _snapshot_stat_mtime()
+    if mtime is None or mtime == _snapshot_mtime:
+        return False
+    champion_stats.load(settings.MATCH_STATS_SNAPSHOT)
+    _snapshot_mtime = mtime
+    return True
+
+
+def refresh_champion_stats() -> int:
+    """Дочитать каталог матчей и обновить снимок, если появились новые данные"""
+    global _snapshot_mtime
+    added = champion_stats.ingest_directory(settings.MATCH_DATA_DIR)
+    if added and settings.MATCH_STATS_SNAPSHOT:
+        champion_stats.save(settings.MATCH_STATS_SNAPSHOT)
+        _snapshot_mtime = _snapshot_stat_mtime()
+    return added
+
+
+def sync_champion_stats() -> int:
+    """
+    Один шаг фоновой задачи. Владелец сначала догоняет снимок (на случай, если
+    он только что сменил упавшего владельца), затем дочитывает файлы;
+    остальные воркеры только перечитывают снимок.
+    """
+    if owns_ingestion():
+        reload_snapshot()
+        return refresh_champion_stats()
+    reload_snapshot()
+    return 0
+
+
+async def watch_match_files_forever(interval_seconds: float):
+    """Фоновая задача: поднять снимок и затем периодически дочитывать каталог матчей"""
+    while True:
+        try:
+            await asyncio.to_thread(sync_champion_stats)
+        except Exception as exc:
+            # Битый снимок или недоступный каталог не должны останавливать задачу
+            log_writer.log_system_event({
+                "event_type": "champion_stats_error",
+                "description": f"Матчи не дочитаны: {exc}"
+            })
+        await asyncio.sleep(interval_seconds)
+
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else settings.MATCH_DATA_DIR
+    started = time.perf_counter()
+    loaded = champion_stats.ingest_directory(directory)
+    print(f"✅ Загружено матчей: {loaded} за {time.perf_counter() - started:.1f} с")
+    started = time.perf_counter()
+    top = champion_stats.query(sort="win_rate", min_games=10, limit=10)
+    print(f"⏱  Запрос: {(time.perf_counter() - started) * 1000:.2f} мс")
+    for row in top["champions"]:
+        print(f"   {row['champion']:<16} игр {row['games']:>8}  побед {row['win_rate']:.1%}  "
+              f"пиков {row['pick_rate']:.1%}  банов {row['ban_rate']:.1%}  KDA {row['average_kda']['ratio']}")
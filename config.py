@@ -5,6 +5,9 @@
 import os
 from typing import Optional
 
+# Ключ из примера: известен всем, поэтому вне DEBUG сервер с ним не стартует
+DEFAULT_SECRET_KEY = "your-secret-key-here"
+
 class Settings:
     """Настройки приложения"""
 
@@ -13,16 +16,121 @@ class Settings:
         "sqlite:///./lol_stats.db"
     )
 
+    # Производственный профиль SQLite: WAL, настроенные PRAGMA и отдельный пул читателей
+    SQLITE_PRODUCTION_MODE: bool = os.getenv("SQLITE_PRODUCTION_MODE", "False").lower() == "true"
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", 65536))
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    SQLITE_MMAP_SIZE_BYTES: int = int(os.getenv("SQLITE_MMAP_SIZE_BYTES", 268435456))
+    SQLITE_READ_POOL_SIZE: int = int(os.getenv("SQLITE_READ_POOL_SIZE", 8))
+
     HOST: str = os.getenv("HOST", "127.0.0.1")
     PORT: int = int(os.getenv("PORT", 8000))
-    DEBUG: bool = os.getenv("DEBUG", "True").lower() == "true"
-
-    SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
+    DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
+
+    # Каждый воркер - отдельный процесс со своим состоянием в памяти: корзины
+    # лимитов частоты, фильтр Блума имен, кэши ответов и токенов. Лимиты
+    # run_server делит на число воркеров (RATE_LIMIT_WORKERS), кэши
+    # расходятся до своих TTL, а имя, занятое в другом воркере, фильтр
+    # узнает не позже чем через USERNAME_INDEX_SYNC_SECONDS
+    WEB_WORKERS: int = int(os.getenv("WEB_WORKERS", os.cpu_count() or 1))
+    WEB_BACKLOG: int = int(os.getenv("WEB_BACKLOG", 2048))
+    WEB_KEEPALIVE_SECONDS: int = int(os.getenv("WEB_KEEPALIVE_SECONDS", 65))
+    WEB_LIMIT_CONCURRENCY: int = int(os.getenv("WEB_LIMIT_CONCURRENCY", 1000))
+    WEB_GRACEFUL_TIMEOUT_SECONDS: int = int(os.getenv("WEB_GRACEFUL_TIMEOUT_SECONDS", 30))
+    SKIP_DB_INIT: bool = os.getenv("SKIP_DB_INIT", "False").lower() == "true"
+
+    SECRET_KEY: str = os.getenv("SECRET_KEY", DEFAULT_SECRET_KEY)
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+    SESSION_COOKIE_NAME: str = os.getenv("SESSION_COOKIE_NAME", "session")
+    SESSION_COOKIE_SECURE: bool = os.getenv("SESSION_COOKIE_SECURE", "False").lower() == "true"
+    SESSION_TOKEN_CACHE_SIZE: int = int(os.getenv("SESSION_TOKEN_CACHE_SIZE", 10000))
+    SESSION_REVOCATION_SYNC_SECONDS: float = float(os.getenv("SESSION_REVOCATION_SYNC_SECONDS", 5))
+    ADMIN_USERNAMES: list = [name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()]
 
     REGISTRATION_TIME_LIMIT_MINUTES: int = 15
     MAX_FAILED_ATTEMPTS: int = 5
+    LOGIN_LOCKOUT_MINUTES: int = int(os.getenv("LOGIN_LOCKOUT_MINUTES", 15))
+
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", 12))
+    HASHING_WORKERS: int = int(os.getenv("HASHING_WORKERS", os.cpu_count() or 1))
+    HASHING_MAX_QUEUE: int = int(os.getenv("HASHING_MAX_QUEUE", 64))
+    HASHING_USE_PROCESSES: bool = os.getenv("HASHING_USE_PROCESSES", "False").lower() == "true"
+
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
+    RATE_LIMIT_IP_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_IP_PER_MINUTE", 30))
+    RATE_LIMIT_IP_BURST: int = int(os.getenv("RATE_LIMIT_IP_BURST", 10))
+    RATE_LIMIT_USERNAME_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_USERNAME_PER_MINUTE", 10))
+    RATE_LIMIT_USERNAME_BURST: int = int(os.getenv("RATE_LIMIT_USERNAME_BURST", 5))
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", 1_000_000))
+    RATE_LIMIT_SHARDS: int = int(os.getenv("RATE_LIMIT_SHARDS", 64))
+    # На сколько процессов делится лимит; run_server выставляет число воркеров
+    RATE_LIMIT_WORKERS: int = int(os.getenv("RATE_LIMIT_WORKERS", 1))
+
+    API_PAGE_SIZE: int = int(os.getenv("API_PAGE_SIZE", 100))
+    API_MAX_PAGE_SIZE: int = int(os.getenv("API_MAX_PAGE_SIZE", 1000))
+    STREAM_CHUNK_SIZE: int = int(os.getenv("STREAM_CHUNK_SIZE", 1000))
+    EXPORT_CHUNK_SIZE: int = int(os.getenv("EXPORT_CHUNK_SIZE", 5000))
+
+    LOG_BATCH_SIZE: int = int(os.getenv("LOG_BATCH_SIZE", 500))
+    LOG_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("LOG_FLUSH_INTERVAL_SECONDS", 1.0))
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+    LOG_QUEUE_POLICY: str = os.getenv("LOG_QUEUE_POLICY", "drop")  # drop | block (block - только вне event loop)
+    LOG_QUEUE_BLOCK_TIMEOUT_SECONDS: float = float(os.getenv("LOG_QUEUE_BLOCK_TIMEOUT_SECONDS", 0.05))
+
+    RESPONSE_CACHE_BACKEND: str = os.getenv("RESPONSE_CACHE_BACKEND", "memory")  # memory | sqlite
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1024))
+    RESPONSE_CACHE_SQLITE_PATH: str = os.getenv("RESPONSE_CACHE_SQLITE_PATH", "./response_cache.db")
+
+    USERNAME_BLOOM_CAPACITY: int = int(os.getenv("USERNAME_BLOOM_CAPACITY", 1_000_000))
+    USERNAME_BLOOM_ERROR_RATE: float = float(os.getenv("USERNAME_BLOOM_ERROR_RATE", 0.01))
+    USERNAME_TAKEN_CACHE_SIZE: int = int(os.getenv("USERNAME_TAKEN_CACHE_SIZE", 10000))
+    USERNAME_INDEX_SYNC_SECONDS: float = float(os.getenv("USERNAME_INDEX_SYNC_SECONDS", 5))
+
+    MATCH_DATA_DIR: str = os.getenv("MATCH_DATA_DIR", "./match_data")
+    MATCH_DATA_POLL_SECONDS: float = float(os.getenv("MATCH_DATA_POLL_SECONDS", 30))
+    MATCH_STATS_SNAPSHOT: str = os.getenv("MATCH_STATS_SNAPSHOT", "./match_stats.npz")
+    CHAMPION_STATS_MIN_GAMES: int = int(os.getenv("CHAMPION_STATS_MIN_GAMES", 100))
+
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+    # /metrics без входа, но только с этих адресов (сети через запятую): маршруты,
+    # счетчики и состояние пулов - не для всех. За прокси на том же хосте uvicorn
+    # берет адрес клиента из X-Forwarded-For
+    METRICS_ALLOWED_NETWORKS: list = [
+        network.strip() for network in os.getenv("METRICS_ALLOWED_NETWORKS", "127.0.0.1/32,::1/128").split(",")
+        if network.strip()
+    ]
+
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "False").lower() == "true"
+    PROFILING_TRIGGER_TOKEN: str = os.getenv("PROFILING_TRIGGER_TOKEN", "")
+    PROFILING_SAMPLE_RATE: float = float(os.getenv("PROFILING_SAMPLE_RATE", 0.0))
+    PROFILING_SAMPLE_INTERVAL_MS: float = float(os.getenv("PROFILING_SAMPLE_INTERVAL_MS", 5))
+    PROFILING_WATCH_AFTER_MS: float = float(os.getenv("PROFILING_WATCH_AFTER_MS", 250))
+    PROFILING_SLOW_REQUEST_MS: float = float(os.getenv("PROFILING_SLOW_REQUEST_MS", 1000))
+    PROFILING_SKIP_PATHS: list = [
+        path.strip() for path in os.getenv("PROFILING_SKIP_PATHS", "/api/live,/api/export").split(",") if path.strip()
+    ]
+    PROFILING_MAX_QUERIES: int = int(os.getenv("PROFILING_MAX_QUERIES", 500))
+    PROFILING_DUMP_DIR: str = os.getenv("PROFILING_DUMP_DIR", "./profiles")
+    PROFILING_MAX_DUMPS: int = int(os.getenv("PROFILING_MAX_DUMPS", 200))
+
+    LIVE_FEED_INTERVAL_SECONDS: float = float(os.getenv("LIVE_FEED_INTERVAL_SECONDS", 1.0))
+    LIVE_FEED_CLIENT_QUEUE_SIZE: int = int(os.getenv("LIVE_FEED_CLIENT_QUEUE_SIZE", 32))
+    LIVE_FEED_MAX_CLIENTS: int = int(os.getenv("LIVE_FEED_MAX_CLIENTS", 5000))
+    LIVE_FEED_BATCH_ROWS: int = int(os.getenv("LIVE_FEED_BATCH_ROWS", 200))
+    LIVE_FEED_STREAM_SECONDS: float = float(os.getenv("LIVE_FEED_STREAM_SECONDS", 300))
+
+    # Фоновая архивация удаляет строки из базы, поэтому включается только явно
+    RETENTION_ENABLED: bool = os.getenv("RETENTION_ENABLED", "False").lower() == "true"
+    RETENTION_SYSTEM_LOG_DAYS: int = int(os.getenv("RETENTION_SYSTEM_LOG_DAYS", 30))
+    RETENTION_REGISTRATION_ATTEMPT_DAYS: int = int(os.getenv("RETENTION_REGISTRATION_ATTEMPT_DAYS", 90))
+    RETENTION_ARCHIVE_DIR: str = os.getenv("RETENTION_ARCHIVE_DIR", "./archive")
+    RETENTION_BATCH_SIZE: int = int(os.getenv("RETENTION_BATCH_SIZE", 2000))
+    RETENTION_BATCH_PAUSE_SECONDS: float = float(os.getenv("RETENTION_BATCH_PAUSE_SECONDS", 0.05))
+    RETENTION_INTERVAL_SECONDS: float = float(os.getenv("RETENTION_INTERVAL_SECONDS", 3600))
+    RETENTION_VACUUM_PAGES: int = int(os.getenv("RETENTION_VACUUM_PAGES", 2000))
+
+    GZIP_MINIMUM_SIZE: int = int(os.getenv("GZIP_MINIMUM_SIZE", 1000))
 
     APP_NAME: str = "LoL Stats Service"
     APP_VERSION: str = "2025.1"
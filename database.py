@@ -1,17 +1,119 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Text
+from sqlalchemy import create_engine, event, select, Column, Integer, String, DateTime, Boolean, Text, Index
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from datetime import datetime
-import os
 
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./lol_stats.db")
+from config import settings
+from metrics import instrument_engine
+from profiling import profile_engine
+
+DATABASE_URL = settings.DATABASE_URL
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+
+def get_async_database_url(database_url: str) -> str:
+    """Получить URL с асинхронным драйвером (aiosqlite / asyncpg)"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Нет асинхронного драйвера для базы данных '{backend}'")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+IS_SQLITE = make_url(DATABASE_URL).get_backend_name() == "sqlite"
+SQLITE_PRODUCTION = IS_SQLITE and settings.SQLITE_PRODUCTION_MODE
+
+
+def apply_sqlite_pragmas(dbapi_connection, read_only: bool = False):
+    """Настроить соединение SQLite для производственного профиля"""
+    cursor = dbapi_connection.cursor()
+    try:
+        if not read_only:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE_BYTES}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+    finally:
+        cursor.close()
+
+
+def _install_sqlite_pragmas(sync_engine, read_only: bool = False):
+    event.listen(
+        sync_engine,
+        "connect",
+        lambda dbapi_connection, connection_record: apply_sqlite_pragmas(dbapi_connection, read_only)
+    )
+
 
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+    connect_args={"check_same_thread": False} if IS_SQLITE else {}
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# В производственном режиме SQLite записи из обработчиков запросов идут через
+# одно асинхронное соединение-писатель на процесс, а GET-эндпоинты читают через
+# отдельный пул с query_only. Писатель не единственный: синхронный engine пишет
+# из потока log_writer, из архивации и миграций, и у каждого воркера свои
+# соединения. Их порядок держит сама SQLite - одна запись за раз в WAL,
+# остальные ждут не дольше busy_timeout.
+async_engine = create_async_engine(
+    get_async_database_url(DATABASE_URL),
+    **({"poolclass": AsyncAdaptedQueuePool, "pool_size": 1, "max_overflow": 0} if SQLITE_PRODUCTION else {})
+)
+
+if SQLITE_PRODUCTION:
+    async_read_engine = create_async_engine(
+        get_async_database_url(DATABASE_URL),
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.SQLITE_READ_POOL_SIZE,
+        max_overflow=0
+    )
+    _install_sqlite_pragmas(engine)
+    _install_sqlite_pragmas(async_engine.sync_engine)
+    _install_sqlite_pragmas(async_read_engine.sync_engine, read_only=True)
+else:
+    async_read_engine = async_engine
+
+if settings.METRICS_ENABLED:
+    instrument_engine(engine, "sync")
+    instrument_engine(async_engine.sync_engine, "async")
+    if async_read_engine is not async_engine:
+        instrument_engine(async_read_engine.sync_engine, "async_read")
+
+if settings.PROFILING_ENABLED:
+    for profiled_engine in {engine, async_engine.sync_engine, async_read_engine.sync_engine}:
+        profile_engine(profiled_engine)
+
+# expire_on_commit=False: после commit объекты остаются читаемыми без
+# ленивой подгрузки, которая в асинхронной сессии невозможна
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+AsyncReadSessionLocal = async_sessionmaker(
+    async_read_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
 class User(Base):
@@ -27,6 +129,7 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     failed_attempts = Column(Integer, default=0)
     last_login = Column(DateTime, nullable=True)
+    locked_until = Column(DateTime, nullable=True)
 
     def __repr__(self):
         return f"<User(username='{self.username}', race_class='{self.race_class}')>"
@@ -34,6 +137,11 @@ class User(Base):
 class RegistrationAttempt(Base):
     """Модель для отслеживания попыток регистрации"""
     __tablename__ = "registration_attempts"
+    __table_args__ = (
+        # Покрывающий индекс: последние попытки и агрегаты по IP за окно времени
+        Index("ix_registration_attempts_date_ip_success", "attempt_date", "ip_address", "success"),
+        Index("ix_registration_attempts_ip_date", "ip_address", "attempt_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     username_attempt = Column(String(50), nullable=False)
@@ -43,20 +151,54 @@ class RegistrationAttempt(Base):
     success = Column(Boolean, default=False)
     error_message = Column(Text, nullable=True)
 
+class RegistrationAttemptCounter(Base):
+    """Поминутные счетчики попыток регистрации для быстрых агрегатов"""
+    __tablename__ = "registration_attempt_counters"
+
+    bucket_start = Column(DateTime, primary_key=True)
+    successful = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+
+class RegistrationAttemptTotal(Base):
+    """Итог попыток регистрации за все время: одна строка, растет вместе с поминутными счетчиками"""
+    __tablename__ = "registration_attempt_totals"
+
+    id = Column(Integer, primary_key=True)
+    successful = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+
 class SystemLog(Base):
     """Модель для логирования системных событий"""
     __tablename__ = "system_logs"
+    __table_args__ = (
+        Index("ix_system_logs_event_type_timestamp", "event_type", "timestamp"),
+        Index("ix_system_logs_user_id_timestamp", "user_id", "timestamp"),
+        Index("ix_system_logs_ip_address_timestamp", "ip_address", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     event_type = Column(String(50), nullable=False)
     user_id = Column(Integer, nullable=True)
     description = Column(Text, nullable=False)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     ip_address = Column(String(45), nullable=True)
 
+class RevokedToken(Base):
+    """Отозванные токены сессий; строка нужна только до истечения самого токена"""
+    __tablename__ = "revoked_tokens"
+    # Воркеры подтягивают отзывы по id > последнего виденного, поэтому id не должен
+    # переиспользоваться после удаления истекших строк
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    jti = Column(String(32), unique=True, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
 def create_tables():
-    """Создает все таблицы в базе данных"""
-    Base.metadata.create_all(bind=engine)
+    """Создает таблицы и применяет недостающие миграции схемы"""
+    from migrations import upgrade
+
+    return upgrade(engine)
 
 def get_db():
     """Зависимость для получения сессии базы данных"""
@@ -66,22 +208,39 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """Зависимость для получения асинхронной сессии базы данных"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    """Зависимость для получения сессии только для чтения"""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
 def get_user_by_username(db, username: str):
     """Получить пользователя по имени"""
     return db.query(User).filter(User.username == username).first()
 
 def create_user(db, user_data: dict):
     """Создать нового пользователя"""
+    from username_index import username_index
+
     user = User(**user_data)
     db.add(user)
     db.commit()
     db.refresh(user)
+    username_index.add(user.username)
     return user
 
 def log_registration_attempt(db, attempt_data: dict):
     """Записать попытку регистрации"""
+    from registration_stats import increment_counters
+
     attempt = RegistrationAttempt(**attempt_data)
     db.add(attempt)
+    db.flush()
+    increment_counters(db.connection(), [{"attempt_date": attempt.attempt_date, "success": attempt.success}])
     db.commit()
     return attempt
 
@@ -92,14 +251,47 @@ def log_system_event(db, event_data: dict):
     db.commit()
     return log
 
+async def get_user_by_username_async(db: AsyncSession, username: str):
+    """Получить пользователя по имени (асинхронно)"""
+    result = await db.execute(select(User).where(User.username == username).limit(1))
+    return result.scalars().first()
+
+async def create_user_async(db: AsyncSession, user_data: dict):
+    """Создать нового пользователя (асинхронно)"""
+    from username_index import username_index
+
+    user = User(**user_data)
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    username_index.add(user.username)
+    return user
+
+async def log_registration_attempt_async(db: AsyncSession, attempt_data: dict):
+    """Записать попытку регистрации (асинхронно)"""
+    from registration_stats import increment_counters
+
+    attempt = RegistrationAttempt(**attempt_data)
+    db.add(attempt)
+    await db.flush()
+    row = {"attempt_date": attempt.attempt_date, "success": attempt.success}
+    await db.run_sync(lambda sync_db: increment_counters(sync_db.connection(), [row]))
+    await db.commit()
+    return attempt
+
+async def log_system_event_async(db: AsyncSession, event_data: dict):
+    """Записать системное событие (асинхронно)"""
+    log = SystemLog(**event_data)
+    db.add(log)
+    await db.commit()
+    return log
+
 if __name__ == "__main__":
 
     create_tables()
     print("База данных инициализирована!")
 
-    from passlib.context import CryptContext
-
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    from hashing import get_password_hash
 
     db = SessionLocal()
     try:
@@ -108,7 +300,7 @@ if __name__ == "__main__":
             test_user_data = {
                 "username": "test_user",
                 "phone_number": "+71234567890",
-                "password_hash": pwd_context.hash("test_password"),
+                "password_hash": get_password_hash("test_password"),
                 "race_class": "Эльф-программист"
             }
             create_user(db, test_user_data)
@@ -0,0 +1,310 @@
+"""
+Полная выгрузка users, registration_attempts и system_logs для аналитики.
+
+Таблица читается кусками по первичному ключу (id > последний выгруженный,
+EXPORT_CHUNK_SIZE строк), каждый кусок - отдельный короткий запрос. Память
+процесса не зависит от размера таблицы, а долгая выгрузка не держит
+транзакцию чтения: в SQLite она не блокирует писателей и не мешает
+контрольной точке WAL. Плата за это - выгрузка не является снимком на
+один момент: строки, добавленные во время выгрузки, в нее попадают.
+
+Форматы: csv, jsonl и parquet (колоночный, если установлен pyarrow;
+по группе строк на кусок). csv и jsonl можно сжимать gzip на лету.
+Для инкрементальной выгрузки - since_id (id больше) и since (время не раньше).
+Хеши паролей и номера телефонов не выгружаются: аналитике они не нужны,
+а выгрузка - самый удобный способ их унести. HTTP-выгрузка только для
+администраторов.
+
+Запуск:
+    python export.py system_logs --format jsonl --gzip --output logs.jsonl.gz
+    python export.py users --format parquet --output users.parquet
+    python export.py registration_attempts --since-id 125000 > attempts.csv
+"""
+
+import argparse
+import csv
+import io
+import sys
+import time
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Iterator, List, NamedTuple, Optional
+
+from sqlalchemy import Boolean, DateTime, Integer, select
+
+from config import settings
+from database import AsyncReadSessionLocal, engine, RegistrationAttempt, SystemLog, User
+from fast_json import dumps_lines
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class ExportError(ValueError):
+    """Неизвестная таблица или неподходящее сочетание параметров"""
+
+
+class ExportSource(NamedTuple):
+    columns: tuple
+    time_column: object
+
+
+EXCLUDED_COLUMNS = frozenset({"password_hash", "phone_number", "phone_attempt"})
+
+
+def _exported_columns(table) -> tuple:
+    return tuple(column for column in table.c if column.name not in EXCLUDED_COLUMNS)
+
+
+EXPORT_SOURCES = {
+    User.__tablename__: ExportSource(_exported_columns(User.__table__), User.__table__.c.registration_date),
+    RegistrationAttempt.__tablename__: ExportSource(
+        _exported_columns(RegistrationAttempt.__table__), RegistrationAttempt.__table__.c.attempt_date
+    ),
+    SystemLog.__tablename__: ExportSource(tuple(SystemLog.__table__.c), SystemLog.__table__.c.timestamp),
+}
+
+FORMATS = ("csv", "jsonl", "parquet")
+
+
+def _text_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class CsvFormat:
+    extension = "csv"
+    media_type = "text/csv"
+
+    def __init__(self, columns):
+        self.names = [column.name for column in columns]
+
+    def begin(self) -> bytes:
+        return self.rows([self.names])
+
+    def rows(self, rows) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(
+            [_text_value(value) for value in row] for row in rows
+        )
+        return buffer.getvalue().encode("utf-8")
+
+    def end(self) -> bytes:
+        return b""
+
+
+class JsonlFormat:
+    extension = "jsonl"
+    media_type = "application/x-ndjson"
+
+    def __init__(self, columns):
+        self.names = [column.name for column in columns]
+
+    def begin(self) -> bytes:
+        return b""
+
+    def rows(self, rows) -> bytes:
+        return dumps_lines(dict(zip(self.names, row)) for row in rows)
+
+    def end(self) -> bytes:
+        return b""
+
+
+class _DrainableSink:
+    """Файл для ParquetWriter, из которого записанное забирается по кускам; tell() считает все байты"""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+class ParquetFormat:
+    extension = "parquet"
+    media_type = "application/vnd.apache.parquet"
+
+    def __init__(self, columns):
+        if pyarrow is None:
+            raise ExportError("Для parquet нужен pyarrow: pip install pyarrow")
+        self.names = [column.name for column in columns]
+        self.schema = pyarrow.schema([(column.name, self._arrow_type(column.type)) for column in columns])
+        self.sink = _DrainableSink()
+        self.writer = pyarrow.parquet.ParquetWriter(pyarrow.PythonFile(self.sink, mode="w"), self.schema,
+                                                    compression="zstd")
+
+    @staticmethod
+    def _arrow_type(column_type):
+        if isinstance(column_type, Integer):
+            return pyarrow.int64()
+        if isinstance(column_type, Boolean):
+            return pyarrow.bool_()
+        if isinstance(column_type, DateTime):
+            return pyarrow.timestamp("us")
+        return pyarrow.string()
+
+    def begin(self) -> bytes:
+        return self.sink.drain()
+
+    def rows(self, rows) -> bytes:
+        data = {name: [row[index] for row in rows] for index, name in enumerate(self.names)}
+        self.writer.write_table(pyarrow.Table.from_pydict(data, schema=self.schema))
+        return self.sink.drain()
+
+    def end(self) -> bytes:
+        self.writer.close()
+        return self.sink.drain()
+
+
+FORMAT_CLASSES = {"csv": CsvFormat, "jsonl": JsonlFormat, "parquet": ParquetFormat}
+
+
+class Export:
+    """Параметры одной выгрузки и ее состояние: курсор и счетчик строк"""
+
+    def __init__(self, table_name: str, fmt: str = "csv", compress: bool = False,
+                 since_id: Optional[int] = None, since: Optional[datetime] = None, chunk_size: int = None):
+        if table_name not in EXPORT_SOURCES:
+            raise ExportError(f"Таблица {table_name} не выгружается. Есть: {', '.join(EXPORT_SOURCES)}")
+        if fmt not in FORMAT_CLASSES:
+            raise ExportError(f"Формат {fmt} не поддерживается. Есть: {', '.join(FORMATS)}")
+        if compress and fmt == "parquet":
+            raise ExportError("parquet уже сжат внутри, gzip поверх него не нужен")
+
+        self.table_name = table_name
+        self.source = EXPORT_SOURCES[table_name]
+        self.format = FORMAT_CLASSES[fmt](self.source.columns)
+        self.compress = compress
+        self.since = since
+        self.chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+        self.last_id = since_id or 0
+        self.rows_written = 0
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    @property
+    def media_type(self) -> str:
+        return "application/gzip" if self.compress else self.format.media_type
+
+    @property
+    def filename(self) -> str:
+        return f"{self.table_name}.{self.format.extension}" + (".gz" if self.compress else "")
+
+    def next_chunk_query(self):
+        id_column = self.source.columns[0]
+        query = select(*self.source.columns).where(id_column > self.last_id).order_by(id_column).limit(self.chunk_size)
+        if self.since is not None:
+            query = query.where(self.source.time_column >= self.since)
+        return query
+
+    def _output(self, data: bytes, final: bool = False) -> bytes:
+        if self._compressor is None:
+            return data
+        data = self._compressor.compress(data)
+        return data + self._compressor.flush() if final else data
+
+    def begin(self) -> bytes:
+        return self._output(self.format.begin())
+
+    def encode_chunk(self, rows) -> bytes:
+        self.last_id = rows[-1][0]
+        self.rows_written += len(rows)
+        return self._output(self.format.rows(rows))
+
+    def end(self) -> bytes:
+        return self._output(self.format.end(), final=True)
+
+
+def iter_export(export: Export, bind=engine) -> Iterator[bytes]:
+    """Синхронная выгрузка (CLI): каждый кусок - отдельное соединение из пула"""
+    yield export.begin()
+    while True:
+        with bind.connect() as connection:
+            rows = connection.execute(export.next_chunk_query()).all()
+        if not rows:
+            break
+        yield export.encode_chunk(rows)
+        if len(rows) < export.chunk_size:
+            break
+    yield export.end()
+
+
+async def aiter_export(export: Export) -> AsyncIterator[bytes]:
+    """
+    Асинхронная выгрузка (HTTP). Сериализация куска уходит в пул потоков,
+    чтобы большой кусок не задерживал остальные запросы воркера.
+    """
+    from fastapi.concurrency import run_in_threadpool
+
+    yield export.begin()
+    while True:
+        async with AsyncReadSessionLocal() as db:
+            rows = (await db.execute(export.next_chunk_query())).all()
+        if not rows:
+            break
+        yield await run_in_threadpool(export.encode_chunk, rows)
+        if len(rows) < export.chunk_size:
+            break
+    yield export.end()
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="export.py", description="Выгрузка таблиц для аналитики")
+    parser.add_argument("table", choices=sorted(EXPORT_SOURCES))
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--gzip", action="store_true", help="Сжать csv/jsonl на лету")
+    parser.add_argument("--since-id", type=int, help="Только строки с id больше этого")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="Только строки не раньше этого времени (UTC)")
+    parser.add_argument("--chunk-size", type=int, default=settings.EXPORT_CHUNK_SIZE)
+    parser.add_argument("--output", default="-", help="Файл; по умолчанию stdout")
+    args = parser.parse_args(argv[1:])
+
+    try:
+        export = Export(args.table, args.format, args.gzip, args.since_id, args.since, args.chunk_size)
+    except ExportError as exc:
+        print(f"❌ {exc}", file=sys.stderr)
+        return 2
+
+    output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    started = time.monotonic()
+    try:
+        for data in iter_export(export):
+            output.write(data)
+            if export.rows_written and export.rows_written % (export.chunk_size * 100) == 0:
+                print(f"   {export.rows_written} строк...", file=sys.stderr)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+
+    print(f"✅ {args.table}: {export.rows_written} строк за {time.monotonic() - started:.1f} с; "
+          f"для следующей выгрузки: --since-id {export.last_id}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,128 @@
+"""
+Хеширование паролей bcrypt в отдельном пуле, чтобы не блокировать event loop
+"""
+
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from config import settings
+from metrics import HASHING_DURATION, HASHING_REJECTED, HASHING_WAIT, Gauge
+
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """
+    CryptContext создается при первом хешировании, чтобы passlib/bcrypt
+    не загружались при старте процесса.
+
+    min/max_desired_rounds совпадают с default_rounds: любой хеш с другой
+    стоимостью считается устаревшим и пересчитывается при успешном входе.
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__min_desired_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__max_desired_rounds=settings.BCRYPT_ROUNDS,
+    )
+
+
+class HashingOverloadedError(Exception):
+    """Очередь на хеширование переполнена"""
+
+
+def get_password_hash(password: str) -> str:
+    """Получить bcrypt-хеш пароля (синхронно)"""
+    return get_pwd_context().hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Проверить пароль по хешу (синхронно)"""
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Проверить пароль и вернуть новый хеш, если параметры bcrypt изменились"""
+    return get_pwd_context().verify_and_update(plain_password, hashed_password)
+
+
+def _timed_call(func, *args):
+    """Выполняется в воркере пула; время возвращается вместе с результатом, чтобы учесть и процессы"""
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+class PasswordHasher:
+    """Пул для хеширования с ограничением длины очереди"""
+
+    def __init__(self, workers: int, max_queue: int, use_processes: bool = False):
+        self.workers = max(1, workers)
+        self.max_pending = self.workers + max(0, max_queue)
+        self.use_processes = use_processes
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="bcrypt"
+                )
+        return self._executor
+
+    async def _run(self, func, *args):
+        # Счетчик меняется только из event loop, поэтому блокировка не нужна
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            HASHING_REJECTED.inc()
+            raise HashingOverloadedError()
+
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, elapsed = await loop.run_in_executor(self._get_executor(), _timed_call, func, *args)
+        finally:
+            self.pending -= 1
+
+        HASHING_DURATION.observe(elapsed, func.__name__)
+        HASHING_WAIT.observe(time.perf_counter() - started, func.__name__)
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Получить хеш пароля в пуле"""
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Проверить пароль в пуле"""
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Проверить пароль в пуле и при необходимости получить новый хеш"""
+        return await self._run(verify_and_update_password, plain_password, hashed_password)
+
+    def shutdown(self):
+        """Остановить пул"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.HASHING_WORKERS,
+    max_queue=settings.HASHING_MAX_QUEUE,
+    use_processes=settings.HASHING_USE_PROCESSES,
+)
+
+Gauge("password_hashing_pending", "Задачи хеширования в пуле и в очереди",
+      collect=lambda: {(): password_hasher.pending})
@@ -0,0 +1,358 @@
+"""
+Массовый импорт пользователей из CSV или JSON Lines.
+
+Пароли хешируются в пуле процессов (bcrypt упирается в CPU), а готовые
+хеши из колонки password_hash берутся как есть. Пользователи вставляются
+пачками через executemany, по транзакции на пачку; дубликаты имен
+пропускаются (INSERT OR IGNORE / ON CONFLICT DO NOTHING).
+
+После каждой пачки в файл контрольной точки пишется смещение в исходном
+файле, поэтому прерванный импорт продолжается с места остановки.
+
+Формат записи (по одной на строку; CSV - с заголовком):
+    username, phone_number, race_class, password | password_hash[, registration_date]
+
+Запуск:
+    python import_users.py users.csv
+    python import_users.py users.jsonl --batch-size 20000 --workers 8 --rounds 10
+    python import_users.py users.csv --restart      - начать заново, игнорируя контрольную точку
+"""
+
+import argparse
+import csv
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from config import settings
+
+CHECKPOINT_SUFFIX = ".checkpoint.json"
+
+
+class ImportRecord(NamedTuple):
+    username: str
+    phone_number: str
+    race_class: str
+    password: Optional[str]
+    password_hash: Optional[str]
+    registration_date: Optional[datetime]
+
+
+class ImportStats:
+    def __init__(self, records: int = 0, inserted: int = 0, duplicates: int = 0, invalid: int = 0):
+        self.records = records
+        self.inserted = inserted
+        self.duplicates = duplicates
+        self.invalid = invalid
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+
+def _parse_date(value) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+def to_record(data: dict) -> Optional[ImportRecord]:
+    """Проверить поля; None - запись не подходит под ограничения таблицы users"""
+    username = str(data.get("username") or "").strip()
+    phone_number = str(data.get("phone_number") or "").strip()
+    race_class = str(data.get("race_class") or "").strip()
+    password = data.get("password") or None
+    password_hash = data.get("password_hash") or None
+
+    if not 3 <= len(username) <= 50 or not phone_number or len(phone_number) > 15:
+        return None
+    if not race_class or len(race_class) > 100:
+        return None
+    if password_hash and not str(password_hash).startswith("$2"):
+        return None
+    if not password and not password_hash:
+        return None
+
+    try:
+        registration_date = _parse_date(data.get("registration_date"))
+    except ValueError:
+        return None
+    return ImportRecord(username, phone_number, race_class, password, password_hash, registration_date)
+
+
+def read_records(path: str, offset: int = 0, header: Optional[List[str]] = None
+                 ) -> Iterator[Tuple[int, Optional[List[str]], Optional[ImportRecord]]]:
+    """
+    Записи файла начиная с байтового смещения offset.
+    Отдает (смещение после записи, заголовок CSV, запись или None для битой строки).
+    """
+    is_csv = path.endswith(".csv")
+    with open(path, "rb") as file:
+        file.seek(offset)
+        for raw in file:
+            # BOM возможен только в самом начале файла
+            line = raw.decode("utf-8-sig" if offset == 0 else "utf-8").strip()
+            offset += len(raw)
+            if not line:
+                continue
+            if is_csv and header is None:
+                header = next(csv.reader([line]))
+                continue
+            try:
+                data = dict(zip(header, next(csv.reader([line])))) if is_csv else json.loads(line)
+                record = to_record(data) if isinstance(data, dict) else None
+            except (ValueError, StopIteration):
+                record = None
+            yield offset, header, record
+
+
+def hash_passwords(passwords: List[str], rounds: int) -> List[str]:
+    """Выполняется в процессе пула"""
+    from passlib.hash import bcrypt
+
+    hasher = bcrypt.using(rounds=rounds)
+    return [hasher.hash(password) for password in passwords]
+
+
+def _insert_statement(table, dialect_name: str):
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert(table).on_conflict_do_nothing(index_elements=["username"])
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(table).on_conflict_do_nothing(index_elements=["username"])
+    return table.insert().prefix_with("IGNORE")
+
+
+class Checkpoint:
+    """Позиция в исходном файле и счетчики; привязана к размеру и mtime файла"""
+
+    def __init__(self, path: str, source: str):
+        self.path = path
+        stat = os.stat(source)
+        self.source = {"path": os.path.abspath(source), "size": stat.st_size, "mtime": stat.st_mtime}
+        self.offset = 0
+        self.header: Optional[List[str]] = None
+        self.completed = False
+        self.stats = ImportStats()
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, encoding="utf-8") as file:
+            data = json.load(file)
+        if data["source"] != self.source:
+            raise RuntimeError(
+                f"Контрольная точка {self.path} относится к другой версии файла. "
+                "Запустите с --restart, чтобы начать заново."
+            )
+        self.offset = data["offset"]
+        self.header = data["header"]
+        self.completed = data["completed"]
+        self.stats = ImportStats(**data["stats"])
+        return True
+
+    def save(self):
+        temporary = self.path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump({
+                "source": self.source,
+                "offset": self.offset,
+                "header": self.header,
+                "completed": self.completed,
+                "stats": self.stats.as_dict(),
+                "saved_at": datetime.utcnow().isoformat(),
+            }, file, ensure_ascii=False, indent=2)
+        os.replace(temporary, self.path)
+
+
+class PendingBatch(NamedTuple):
+    records: List[ImportRecord]
+    # (индексы записей без готового хеша, future со списком хешей)
+    hashing: List[Tuple[List[int], Future]]
+    offset: int
+    header: Optional[List[str]]
+    invalid: int
+    consumed: int
+
+
+class UserImporter:
+    """
+    Конвейер: пока пачка N вставляется в базу, пачка N+1 уже хешируется в пуле.
+    В памяти одновременно не больше двух пачек.
+    """
+
+    def __init__(self, source: str, batch_size: int, workers: int, rounds: int,
+                 checkpoint: Checkpoint, bind=None, progress=sys.stderr):
+        self.source = source
+        self.batch_size = batch_size
+        self.workers = max(1, workers)
+        self.rounds = rounds
+        self.checkpoint = checkpoint
+        self.progress = progress
+        if bind is None:
+            from database import engine as bind
+        self.bind = bind
+        self.started = time.monotonic()
+        self.resumed_records = checkpoint.stats.records
+        self.start_offset = checkpoint.offset
+
+    def _batches(self) -> Iterator[Tuple[List[ImportRecord], int, Optional[List[str]], int, int]]:
+        records, invalid, consumed = [], 0, 0
+        for offset, header, record in read_records(self.source, self.checkpoint.offset, self.checkpoint.header):
+            consumed += 1
+            if record is None:
+                invalid += 1
+            else:
+                records.append(record)
+            if len(records) >= self.batch_size:
+                yield records, offset, header, invalid, consumed
+                records, invalid, consumed = [], 0, 0
+        if records or invalid or consumed:
+            yield records, offset, header, invalid, consumed
+
+    def _submit(self, pool, records, offset, header, invalid, consumed) -> PendingBatch:
+        missing = [i for i, record in enumerate(records) if not record.password_hash]
+        hashing = []
+        if missing:
+            # Несколько задач на воркер, чтобы пул не простаивал на хвосте пачки
+            chunk_size = max(1, -(-len(missing) // (self.workers * 4)))
+            for start in range(0, len(missing), chunk_size):
+                indexes = missing[start:start + chunk_size]
+                future = pool.submit(hash_passwords, [records[i].password for i in indexes], self.rounds)
+                hashing.append((indexes, future))
+        return PendingBatch(records, hashing, offset, header, invalid, consumed)
+
+    def _insert(self, batch: PendingBatch):
+        from database import User
+
+        hashes = [record.password_hash for record in batch.records]
+        for indexes, future in batch.hashing:
+            for index, password_hash in zip(indexes, future.result()):
+                hashes[index] = password_hash
+
+        now = datetime.utcnow()
+        rows = [
+            {
+                "username": record.username,
+                "phone_number": record.phone_number,
+                "password_hash": password_hash,
+                "race_class": record.race_class,
+                "registration_date": record.registration_date or now,
+                "is_active": True,
+                "failed_attempts": 0,
+            }
+            for record, password_hash in zip(batch.records, hashes)
+        ]
+
+        inserted = 0
+        if rows:
+            with self.bind.begin() as connection:
+                result = connection.execute(_insert_statement(User.__table__, connection.dialect.name), rows)
+                inserted = max(0, result.rowcount)
+
+        stats = self.checkpoint.stats
+        stats.records += batch.consumed
+        stats.inserted += inserted
+        stats.duplicates += len(rows) - inserted
+        stats.invalid += batch.invalid
+        self.checkpoint.offset = batch.offset
+        self.checkpoint.header = batch.header
+        self.checkpoint.save()
+        self._report()
+
+    def _report(self, final: bool = False):
+        stats = self.checkpoint.stats
+        size = self.checkpoint.source["size"]
+        offset = self.checkpoint.offset
+        elapsed = time.monotonic() - self.started
+        rate = (stats.records - self.resumed_records) / elapsed if elapsed else 0.0
+        percent = offset / size * 100 if size else 100.0
+        done_bytes = offset - self.start_offset
+        eta = (size - offset) * elapsed / done_bytes if done_bytes > 0 else 0.0
+        line = (f"\r📥 {percent:5.1f}%  записей {stats.records}  вставлено {stats.inserted}  "
+                f"дубликатов {stats.duplicates}  битых {stats.invalid}  {rate:,.0f} зап/с  осталось ~{eta:.0f} с")
+        print(line, end="\n" if final else "", file=self.progress, flush=True)
+
+    def run(self) -> ImportStats:
+        if self.checkpoint.completed:
+            return self.checkpoint.stats
+
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        pool = executor or _InlineExecutor()
+        try:
+            pending: Optional[PendingBatch] = None
+            for records, offset, header, invalid, consumed in self._batches():
+                submitted = self._submit(pool, records, offset, header, invalid, consumed)
+                if pending is not None:
+                    self._insert(pending)
+                pending = submitted
+            if pending is not None:
+                self._insert(pending)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+        self.checkpoint.completed = True
+        self.checkpoint.save()
+        self._report(final=True)
+        return self.checkpoint.stats
+
+
+class _InlineExecutor:
+    """Один воркер - хешируем в текущем процессе, без накладных расходов на пул"""
+
+    def submit(self, func, *args) -> Future:
+        future = Future()
+        future.set_result(func(*args))
+        return future
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Массовый импорт пользователей")
+    parser.add_argument("source", help="файл .csv или .jsonl")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="пользователей в транзакции")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="процессов для bcrypt")
+    parser.add_argument("--rounds", type=int, default=settings.BCRYPT_ROUNDS,
+                        help="стоимость bcrypt; хеши с другой стоимостью пересчитаются при первом входе")
+    parser.add_argument("--checkpoint", help=f"файл контрольной точки (по умолчанию <source>{CHECKPOINT_SUFFIX})")
+    parser.add_argument("--restart", action="store_true", help="игнорировать контрольную точку")
+    return parser
+
+
+def main(argv: List[str]) -> int:
+    args = build_parser().parse_args(argv[1:])
+
+    from database import create_tables
+    create_tables()
+
+    checkpoint = Checkpoint(args.checkpoint or args.source + CHECKPOINT_SUFFIX, args.source)
+    if not args.restart:
+        try:
+            if checkpoint.load():
+                print(f"↩️  Продолжаем с записи {checkpoint.stats.records} (смещение {checkpoint.offset})")
+        except RuntimeError as exc:
+            print(f"❌ {exc}")
+            return 2
+
+    if checkpoint.completed:
+        print("✅ Этот файл уже импортирован полностью")
+        return 0
+
+    # SIGTERM -> SystemExit: пул хеширования закрывается, а не остается сиротой.
+    # Пачка, вставленная после последней контрольной точки, при продолжении
+    # повторится, и ее строки отсеются как дубликаты.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(143))
+
+    started = time.monotonic()
+    stats = UserImporter(args.source, args.batch_size, args.workers, args.rounds, checkpoint).run()
+    print(f"✅ Импорт завершен за {time.monotonic() - started:.1f} с: {stats.as_dict()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,199 @@
+"""
+Живая лента панели: новые системные логи и статус сервера без опроса с клиента.
+
+Один фоновый производитель раз в LIVE_FEED_INTERVAL_SECONDS читает из базы
+строки system_logs с id больше последнего отданного и снимает статус
+процесса. Кадр сериализуется один раз и раскладывается по ограниченным
+очередям подписчиков. Клиент, чья очередь переполнилась, отключается (браузер
+сам переподключится через EventSource), а не копит кадры в памяти.
+
+Пока подписчиков нет, база не читается. При нескольких воркерах у каждого
+свой производитель: один запрос за тик на воркер.
+"""
+
+import asyncio
+import json
+import time
+from typing import NamedTuple, Optional, Set
+
+from sqlalchemy import func, select
+
+from config import settings
+from database import AsyncReadSessionLocal, SystemLog
+from metrics import process_stats
+import log_writer
+
+
+class LiveFeedFullError(Exception):
+    """Подписчиков больше, чем LIVE_FEED_MAX_CLIENTS"""
+
+
+class Frame(NamedTuple):
+    event: str
+    message: str  # JSON для WebSocket: {"event": ..., "data": ...}
+    sse: bytes    # готовый кадр Server-Sent Events
+
+
+def make_frame(event: str, data, event_id: Optional[int] = None) -> Frame:
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {payload}")
+    return Frame(
+        event=event,
+        message=f'{{"event":"{event}","data":{payload}}}',
+        sse=("\n".join(lines) + "\n\n").encode("utf-8"),
+    )
+
+
+class Subscriber:
+    """Очередь одного клиента; None в очереди - сигнал отключиться"""
+
+    def __init__(self, queue_size: int):
+        self.queue: "asyncio.Queue[Optional[Frame]]" = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+    def offer(self, frame: Frame) -> bool:
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def drop(self):
+        self.dropped = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class LiveFeed:
+    def __init__(self, interval: float, queue_size: int, max_clients: int, batch_rows: int):
+        self.interval = interval
+        self.queue_size = queue_size
+        self.max_clients = max_clients
+        self.batch_rows = batch_rows
+
+        self._subscribers: Set[Subscriber] = set()
+        self._last_log_id: Optional[int] = None
+        self.status_frame: Optional[Frame] = None
+
+        self.ticks = 0
+        self.frames = 0
+        self.dropped_clients = 0
+
+    def subscribe(self) -> Subscriber:
+        if len(self._subscribers) >= self.max_clients:
+            raise LiveFeedFullError()
+        subscriber = Subscriber(self.queue_size)
+        if self.status_frame is not None:
+            subscriber.offer(self.status_frame)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+
+    def publish(self, frame: Frame):
+        self.frames += 1
+        for subscriber in list(self._subscribers):
+            if not subscriber.offer(frame):
+                subscriber.drop()
+                self._subscribers.discard(subscriber)
+                self.dropped_clients += 1
+
+    def status_snapshot(self) -> dict:
+        return {
+            "time": time.time(),
+            "process": process_stats(),
+            "log_writer": log_writer.log_writer.stats(),
+            "live_clients": len(self._subscribers),
+        }
+
+    async def tick(self):
+        """Один опрос базы на всех подписчиков"""
+        if not self._subscribers:
+            # Новый первый клиент начнет с текущего конца таблицы, а не со всего, что накопилось
+            self._last_log_id = None
+            return
+
+        self.ticks += 1
+        async with AsyncReadSessionLocal() as db:
+            if self._last_log_id is None:
+                self._last_log_id = (await db.execute(select(func.max(SystemLog.id)))).scalar() or 0
+            logs = (await db.execute(
+                select(SystemLog)
+                .where(SystemLog.id > self._last_log_id)
+                .order_by(SystemLog.id)
+                .limit(self.batch_rows)
+            )).scalars().all()
+
+        if logs:
+            self._last_log_id = logs[-1].id
+            self.publish(make_frame("logs", [
+                {
+                    "id": log.id,
+                    "event_type": log.event_type,
+                    "user_id": log.user_id,
+                    "description": log.description,
+                    "timestamp": log.timestamp.isoformat(),
+                    "ip_address": log.ip_address
+                }
+                for log in logs
+            ], event_id=self._last_log_id))
+
+        self.status_frame = make_frame("status", self.status_snapshot())
+        self.publish(self.status_frame)
+
+    async def run_forever(self):
+        while True:
+            try:
+                await self.tick()
+            except Exception as exc:
+                log_writer.log_system_event({
+                    "event_type": "live_feed_error",
+                    "description": f"Живая лента пропустила тик: {exc}"
+                })
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self._subscribers),
+            "max_clients": self.max_clients,
+            "ticks": self.ticks,
+            "frames": self.frames,
+            "dropped_clients": self.dropped_clients,
+            "last_log_id": self._last_log_id,
+        }
+
+
+live_feed = LiveFeed(
+    interval=settings.LIVE_FEED_INTERVAL_SECONDS,
+    queue_size=settings.LIVE_FEED_CLIENT_QUEUE_SIZE,
+    max_clients=settings.LIVE_FEED_MAX_CLIENTS,
+    batch_rows=settings.LIVE_FEED_BATCH_ROWS,
+)
+
+
+async def sse_events(subscriber: Subscriber):
+    """
+    Поток кадров для одного клиента. Поток закрывается через LIVE_FEED_STREAM_SECONDS:
+    браузер переподключается сам, а мягкая остановка сервера не ждет вечных соединений.
+    """
+    deadline = time.monotonic() + settings.LIVE_FEED_STREAM_SECONDS
+    try:
+        yield f"retry: {int(settings.LIVE_FEED_INTERVAL_SECONDS * 1000)}\n\n".encode("ascii")
+        while True:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                return
+            try:
+                frame = await asyncio.wait_for(subscriber.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return
+            if frame is None:
+                return
+            yield frame.sse
+    finally:
+        live_feed.unsubscribe(subscriber)
@@ -0,0 +1,152 @@
+"""
+Поиск по системным логам: фильтры, курсор по (timestamp, id) и полнотекстовый
+поиск по description.
+
+Полнотекстовый индекс поддерживает сама база, поэтому он не отстает ни от
+буферизованной записи логов, ни от архивации:
+    SQLite   - внешняя FTS5-таблица system_logs_fts и триггеры на system_logs
+    Postgres - вычисляемая колонка description_tsv (tsvector) с GIN-индексом
+
+Строка поиска разбивается на слова, все слова должны встретиться в описании
+(регистр и диакритика не важны). Слово с * на конце ищется как префикс.
+Синтаксис запросов FTS5 и tsquery наружу не выставляется.
+"""
+
+import re
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import literal_column, select, text, tuple_
+
+from database import SystemLog
+
+FTS_TABLE = "system_logs_fts"
+
+SQLITE_FULLTEXT_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "description, content='system_logs', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON system_logs BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, description) VALUES (new.id, new.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON system_logs BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description) VALUES ('delete', old.id, old.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF description ON system_logs BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description) VALUES ('delete', old.id, old.description); "
+    f"INSERT INTO {FTS_TABLE}(rowid, description) VALUES (new.id, new.description); END",
+    # Проиндексировать строки, записанные до миграции
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+
+POSTGRES_FULLTEXT_DDL = (
+    "ALTER TABLE system_logs ADD COLUMN IF NOT EXISTS description_tsv tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('simple', description)) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_system_logs_description_tsv ON system_logs USING GIN (description_tsv)",
+)
+
+WORD = re.compile(r"\w+\*?")
+
+# Колонки ответа: строки выборки вместо ORM-объектов
+SYSTEM_LOG_COLUMNS = tuple(SystemLog.__table__.c)
+
+
+class InvalidCursorError(ValueError):
+    """Курсор не похож на выданный в X-Next-Before"""
+
+
+class LogCursor(NamedTuple):
+    timestamp: datetime
+    id: int
+
+    def encode(self) -> str:
+        return f"{self.timestamp.isoformat()},{self.id}"
+
+    @classmethod
+    def decode(cls, value: str) -> "LogCursor":
+        try:
+            timestamp, log_id = value.rsplit(",", 1)
+            return cls(datetime.fromisoformat(timestamp), int(log_id))
+        except ValueError:
+            raise InvalidCursorError(value)
+
+
+def create_fulltext_index(connection):
+    """DDL полнотекстового индекса для текущей базы (идемпотентно)"""
+    statements = {
+        "sqlite": SQLITE_FULLTEXT_DDL,
+        "postgresql": POSTGRES_FULLTEXT_DDL,
+    }.get(connection.dialect.name, ())
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+def search_words(query: str) -> List[str]:
+    return WORD.findall(query.lower())
+
+
+def fulltext_condition(query: str, dialect_name: str):
+    """Условие "описание содержит все слова"; None, если слов в строке нет"""
+    words = search_words(query)
+    if not words:
+        return None
+
+    if dialect_name == "postgresql":
+        tsquery = " & ".join(
+            f"{word[:-1]}:*" if word.endswith("*") else word
+            for word in words
+        )
+        return text("system_logs.description_tsv @@ to_tsquery('simple', :log_tsquery)").bindparams(
+            log_tsquery=tsquery
+        )
+
+    if dialect_name == "sqlite":
+        # Каждое слово в кавычках: операторы FTS5 (NOT, NEAR, -, :) из ввода не интерпретируются
+        match = " ".join(
+            f'"{word[:-1]}"*' if word.endswith("*") else f'"{word}"'
+            for word in words
+        )
+        matching_ids = (
+            select(literal_column("rowid"))
+            .select_from(text(FTS_TABLE))
+            .where(text(f"{FTS_TABLE} MATCH :log_match").bindparams(log_match=match))
+        )
+        return SystemLog.id.in_(matching_ids)
+
+    # Прочие базы - без индекса
+    condition = None
+    for word in words:
+        like = SystemLog.description.ilike(f"%{word.rstrip('*')}%")
+        condition = like if condition is None else condition & like
+    return condition
+
+
+def system_logs_query(
+        dialect_name: str,
+        limit: int,
+        event_type: Optional[str] = None,
+        user_id: Optional[int] = None,
+        ip_address: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        search: Optional[str] = None,
+        before: Optional[LogCursor] = None,
+):
+    """Логи от новых к старым; следующая страница - before=(timestamp, id) последней строки"""
+    query = select(*SYSTEM_LOG_COLUMNS).order_by(SystemLog.timestamp.desc(), SystemLog.id.desc()).limit(limit)
+
+    if event_type is not None:
+        query = query.where(SystemLog.event_type == event_type)
+    if user_id is not None:
+        query = query.where(SystemLog.user_id == user_id)
+    if ip_address is not None:
+        query = query.where(SystemLog.ip_address == ip_address)
+    if since is not None:
+        query = query.where(SystemLog.timestamp >= since)
+    if until is not None:
+        query = query.where(SystemLog.timestamp < until)
+    if before is not None:
+        query = query.where(tuple_(SystemLog.timestamp, SystemLog.id) < tuple_(before.timestamp, before.id))
+    if search:
+        condition = fulltext_condition(search, dialect_name)
+        if condition is not None:
+            query = query.where(condition)
+
+    return query
@@ -0,0 +1,193 @@
+"""
+Буферизованная запись логов: события копятся в очереди и пишутся в БД пачками
+
+Политика переполнения "block" действует только для синхронных вызывающих
+(потоки пула, to_thread, CLI). Из потока с работающим event loop запись
+всегда идет как "drop": ожидание места в очереди остановило бы все запросы
+воркера, а не один.
+"""
+
+import asyncio
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert
+
+from config import settings
+from database import engine, RegistrationAttempt, SystemLog
+from registration_stats import increment_counters
+
+_STOP = object()
+
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class BufferedLogWriter:
+    """
+    Фоновый поток, который сбрасывает накопленные строки одной транзакцией,
+    как только набралось batch_size записей или прошло flush_interval секунд.
+    """
+
+    def __init__(
+            self,
+            bind,
+            batch_size: int = 500,
+            flush_interval: float = 1.0,
+            max_queue: int = 10000,
+            policy: str = "drop",
+            block_timeout: float = 0.05
+    ):
+        if policy not in ("drop", "block"):
+            raise ValueError(f"Неизвестная политика переполнения очереди: {policy}")
+
+        self.bind = bind
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.errors = 0
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Запустить фоновый поток записи (повторный вызов ничего не делает)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+
+    def write(self, table, row: dict) -> bool:
+        """
+        Поставить строку в очередь. Возвращает False, если очередь переполнена
+        и запись отброшена. Политика "block" ждет не дольше block_timeout,
+        но только вне event loop.
+        """
+        if self._thread is None:
+            self.start()
+
+        try:
+            if self.policy == "block" and not _in_event_loop():
+                self._queue.put((table, row), timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait((table, row))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def stop(self):
+        """Остановить поток, предварительно записав все, что осталось в очереди"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _run(self):
+        batch: List[tuple] = []
+        deadline = time.monotonic() + self.flush_interval
+
+        while True:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._drain(batch)
+                self._flush(batch)
+                return
+
+            if item is not None:
+                batch.append(item)
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _drain(self, batch: List[tuple]):
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP:
+                batch.append(item)
+
+    def _flush(self, batch: List[tuple]):
+        if not batch:
+            return
+
+        rows_by_table: Dict[object, List[dict]] = {}
+        for table, row in batch:
+            rows_by_table.setdefault(table, []).append(row)
+
+        try:
+            with self.bind.begin() as connection:
+                for table, rows in rows_by_table.items():
+                    connection.execute(insert(table), rows)
+                    if table is RegistrationAttempt.__table__:
+                        increment_counters(connection, rows)
+        except Exception as e:
+            self.errors += 1
+            print(f"❌ Не удалось записать {len(batch)} строк лога: {e}")
+            return
+
+        self.written += len(batch)
+        self.flushes += 1
+
+    def stats(self) -> dict:
+        """Счетчики для мониторинга"""
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "errors": self.errors,
+        }
+
+
+log_writer = BufferedLogWriter(
+    engine,
+    batch_size=settings.LOG_BATCH_SIZE,
+    flush_interval=settings.LOG_FLUSH_INTERVAL_SECONDS,
+    max_queue=settings.LOG_QUEUE_SIZE,
+    policy=settings.LOG_QUEUE_POLICY,
+    block_timeout=settings.LOG_QUEUE_BLOCK_TIMEOUT_SECONDS,
+)
+
+atexit.register(log_writer.stop)
+
+
+def log_system_event(event_data: dict) -> bool:
+    """Поставить системное событие в очередь на запись"""
+    row = {"user_id": None, "ip_address": None, **event_data}
+    row.setdefault("timestamp", datetime.utcnow())
+    return log_writer.write(SystemLog.__table__, row)
+
+
+def log_registration_attempt(attempt_data: dict) -> bool:
+    """Поставить попытку регистрации в очередь на запись"""
+    row = {"ip_address": None, "success": False, "error_message": None, **attempt_data}
+    row.setdefault("attempt_date", datetime.utcnow())
+    return log_writer.write(RegistrationAttempt.__table__, row)
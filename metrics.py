@@ -0,0 +1,309 @@
+"""
+Метрики в текстовом формате Prometheus без внешних зависимостей.
+
+Источники:
+    MetricsMiddleware     - задержки по маршрутам, запросы в работе, коды ответов
+    instrument_engine     - число и длительность SQL-запросов, состояние пулов
+    hashing.PasswordHasher - длительность bcrypt и ожидание в очереди пула
+    process_stats         - CPU, RSS и время работы процесса
+
+Метрики живут в памяти процесса: при нескольких воркерах каждый отдает свои.
+/metrics отвечает только адресам из METRICS_ALLOWED_NETWORKS (по умолчанию
+loopback), остальным - 404.
+"""
+
+import bisect
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+HASHING_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+REGISTRY: List["Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Базовая метрика: значения по кортежам меток, общая блокировка на метрику"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items()) or ([((), 0)] if not self.labelnames else [])
+        for labels, value in sorted(items):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge(Metric):
+    """Гауж; вместо set/inc можно задать функцию, которая считает значения при сборе"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 collect: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def samples(self):
+        if self.collect is not None:
+            items = list(self.collect().items())
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        for labels, value in sorted(items):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    """Гистограмма: по каждой метке - счетчики корзин (не накопительные), сумма и число"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, (list(counts), total, count)) for labels, (counts, total, count) in self._values.items()]
+        for labels, (counts, total, count) in sorted(items):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}"
+
+
+def render() -> str:
+    """Все метрики процесса в текстовом формате Prometheus"""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# --- Процесс -----------------------------------------------------------------
+
+PROCESS_START_TIME = time.time()
+
+_last_cpu_sample = [time.monotonic(), time.process_time()]
+
+
+def _resident_memory_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+
+        # Без /proc доступен только пиковый RSS (в Linux - в килобайтах)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def process_stats() -> dict:
+    """CPU, память и время работы текущего процесса"""
+    now, cpu = time.monotonic(), time.process_time()
+    last_now, last_cpu = _last_cpu_sample
+    _last_cpu_sample[:] = [now, cpu]
+    uptime = time.time() - PROCESS_START_TIME
+    return {
+        "pid": os.getpid(),
+        "uptime_seconds": round(uptime, 3),
+        "cpu_seconds": round(cpu, 3),
+        "cpu_percent_average": round(cpu / uptime * 100, 2) if uptime > 0 else 0.0,
+        "cpu_percent_recent": round((cpu - last_cpu) / (now - last_now) * 100, 2) if now > last_now else 0.0,
+        "rss_bytes": _resident_memory_bytes(),
+        "threads": threading.active_count(),
+    }
+
+
+Gauge("process_cpu_seconds_total", "Процессорное время процесса (user + system), секунды",
+      collect=lambda: {(): time.process_time()})
+Gauge("process_resident_memory_bytes", "Резидентная память процесса, байты",
+      collect=lambda: {(): _resident_memory_bytes()})
+Gauge("process_start_time_seconds", "Время запуска процесса, unix time",
+      collect=lambda: {(): PROCESS_START_TIME})
+Gauge("process_uptime_seconds", "Время работы процесса, секунды",
+      collect=lambda: {(): time.time() - PROCESS_START_TIME})
+
+
+# --- HTTP --------------------------------------------------------------------
+
+HTTP_REQUESTS = Counter("http_requests_total", "Обработанные HTTP-запросы", ("method", "route", "status"))
+HTTP_DURATION = Histogram("http_request_duration_seconds", "Длительность HTTP-запросов", ("method", "route"))
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP-запросы в обработке")
+
+
+def route_label(scope) -> str:
+    """Шаблон маршрута вместо сырого пути, чтобы число меток не росло с каждым id"""
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path_format", None) or route.path
+    if "endpoint" in scope and scope.get("root_path"):
+        return scope["root_path"]
+    return "<unmatched>"
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: длительность, коды ответов и число запросов в работе"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec()
+            route = route_label(scope)
+            HTTP_REQUESTS.inc(scope["method"], route, str(status))
+            HTTP_DURATION.observe(elapsed, scope["method"], route)
+
+
+# --- База данных -------------------------------------------------------------
+
+DB_QUERIES = Counter("db_queries_total", "SQL-запросы по типу", ("engine", "statement"))
+DB_QUERY_DURATION = Histogram("db_query_duration_seconds", "Длительность SQL-запросов",
+                              ("engine", "statement"), buckets=QUERY_BUCKETS)
+DB_ERRORS = Counter("db_errors_total", "SQL-запросы, завершившиеся ошибкой", ("engine",))
+
+STATEMENT_TYPES = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "PRAGMA", "BEGIN", "COMMIT", "ROLLBACK",
+                   "CREATE", "ALTER", "DROP", "EXPLAIN", "SAVEPOINT", "RELEASE"}
+
+_pools: Dict[str, object] = {}
+
+
+def statement_type(statement: str) -> str:
+    head = statement.lstrip()[:12].split(None, 1)
+    kind = head[0].upper() if head else ""
+    return kind if kind in STATEMENT_TYPES else "OTHER"
+
+
+def _pool_stats(method: str) -> Dict[Tuple[str, ...], float]:
+    return {
+        (name,): getattr(pool, method)()
+        for name, pool in _pools.items()
+        if hasattr(pool, method)
+    }
+
+
+Gauge("db_pool_size", "Размер пула соединений", ("engine",), collect=lambda: _pool_stats("size"))
+Gauge("db_pool_checked_out", "Соединения, выданные из пула", ("engine",), collect=lambda: _pool_stats("checkedout"))
+Gauge("db_pool_overflow", "Соединения сверх размера пула", ("engine",), collect=lambda: _pool_stats("overflow"))
+
+
+def instrument_engine(sync_engine, name: str):
+    """Повесить счетчики запросов и пула на синхронный Engine (для async - engine.sync_engine)"""
+    _pools[name] = sync_engine.pool
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+        kind = statement_type(statement)
+        DB_QUERIES.inc(name, kind)
+        DB_QUERY_DURATION.observe(elapsed, name, kind)
+
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("metrics_started"):
+            connection.info["metrics_started"].pop()
+        DB_ERRORS.inc(name)
+
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(sync_engine, "handle_error", handle_error)
+
+
+# --- Хеширование паролей -----------------------------------------------------
+
+HASHING_DURATION = Histogram("password_hashing_duration_seconds", "Время работы bcrypt",
+                             ("operation",), buckets=HASHING_BUCKETS)
+HASHING_WAIT = Histogram("password_hashing_total_seconds", "Время от постановки в пул до результата",
+                         ("operation",), buckets=HASHING_BUCKETS)
+HASHING_REJECTED = Counter("password_hashing_rejected_total", "Отказы из-за переполненной очереди пула")
@@ -0,0 +1,312 @@
+"""
+Версионированные миграции схемы базы данных.
+
+Применённые версии хранятся в таблице schema_migrations. Каждая миграция
+выполняется в своей транзакции и должна быть идемпотентной (checkfirst,
+проверка наличия колонок): свежая база создаётся по текущим моделям уже
+первой миграцией, а старые файлы lol_stats.db догоняются остальными.
+
+Запуск:
+    python migrations.py upgrade   - применить недостающие миграции
+    python migrations.py status    - показать применённые версии
+    python migrations.py check     - проверить планы запросов API (SQLite)
+"""
+
+import re
+import sys
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select
+
+from database import (engine, Base, User, RegistrationAttempt, RegistrationAttemptCounter, RegistrationAttemptTotal,
+                      RevokedToken, SystemLog)
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable
+
+
+def _create_base_schema(connection):
+    Base.metadata.create_all(
+        connection,
+        tables=[User.__table__, RegistrationAttempt.__table__, SystemLog.__table__]
+    )
+
+
+def _create_attempt_counters(connection):
+    from registration_stats import rebuild_counters
+
+    RegistrationAttemptCounter.__table__.create(connection, checkfirst=True)
+
+    has_counters = connection.execute(select(RegistrationAttemptCounter.bucket_start).limit(1)).first()
+    if not has_counters:
+        rebuild_counters(connection)
+
+
+def _create_attempt_totals(connection):
+    from registration_stats import rebuild_totals
+
+    RegistrationAttemptTotal.__table__.create(connection, checkfirst=True)
+    rebuild_totals(connection)
+
+
+def _create_table(table):
+    def apply(connection):
+        table.create(connection, checkfirst=True)
+    return apply
+
+
+def _create_indexes(*tables):
+    def apply(connection):
+        for table in tables:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+    return apply
+
+
+def _add_columns(table, *column_names):
+    def apply(connection):
+        existing = {column["name"] for column in inspect(connection).get_columns(table.name)}
+        for name in column_names:
+            if name in existing:
+                continue
+            column = table.c[name]
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {name} {column_type}")
+    return apply
+
+
+def _create_log_search_indexes(connection):
+    from log_search import create_fulltext_index
+
+    _create_indexes(SystemLog.__table__)(connection)
+    create_fulltext_index(connection)
+
+
+def _enable_incremental_vacuum(connection):
+    """
+    Для SQLite режим auto_vacuum меняется только вместе с полным VACUUM,
+    поэтому он выполняется один раз здесь, до первой транзакции с записью.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    if connection.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2:
+        return
+    connection.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+    connection.exec_driver_sql("VACUUM")
+
+
+def _make_revocation_ids_monotonic(connection):
+    """
+    Без AUTOINCREMENT SQLite после удаления истекших строк выдает прежние id,
+    и воркер, уже видевший больший id, новый отзыв не подтягивает. Колонку
+    не переделать через ALTER, поэтому таблица пересоздается; строк в ней
+    немного - только отзывы за время жизни токена.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    table = RevokedToken.__table__
+    schema = connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table.name,)
+    ).scalar()
+    if schema is not None and "AUTOINCREMENT" in schema.upper():
+        return
+    rows = [dict(row) for row in connection.execute(select(table)).mappings()] if schema is not None else []
+    table.drop(connection, checkfirst=True)
+    table.create(connection)
+    if rows:
+        connection.execute(table.insert(), rows)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Базовые таблицы users, registration_attempts, system_logs", _create_base_schema),
+    Migration(2, "Поминутные счетчики попыток регистрации", _create_attempt_counters),
+    Migration(
+        3,
+        "Индексы для сортировки и фильтрации логов и попыток регистрации",
+        _create_indexes(RegistrationAttempt.__table__, SystemLog.__table__)
+    ),
+    Migration(4, "Блокировка аккаунта после неудачных входов", _add_columns(User.__table__, "locked_until")),
+    Migration(5, "Инкрементальный VACUUM для SQLite (место после архивации логов)", _enable_incremental_vacuum),
+    Migration(6, "Список отозванных токенов сессий", _create_table(RevokedToken.__table__)),
+    Migration(
+        7,
+        "Поиск по системным логам: индексы фильтров и полнотекстовый индекс description",
+        _create_log_search_indexes
+    ),
+    Migration(8, "Итог попыток регистрации за все время одной строкой", _create_attempt_totals),
+    Migration(9, "Неповторяющиеся id отозванных токенов (AUTOINCREMENT)", _make_revocation_ids_monotonic),
+]
+
+
+def applied_versions(connection) -> Dict[int, datetime]:
+    """Применённые версии и время их применения"""
+    schema_migrations.create(connection, checkfirst=True)
+    rows = connection.execute(select(schema_migrations.c.version, schema_migrations.c.applied_at))
+    return {row.version: row.applied_at for row in rows}
+
+
+def upgrade(bind=engine) -> List[int]:
+    """Применить недостающие миграции, вернуть список применённых версий"""
+    with bind.begin() as connection:
+        done = applied_versions(connection)
+
+    applied = []
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        if migration.version in done:
+            continue
+
+        with bind.begin() as connection:
+            migration.apply(connection)
+            connection.execute(schema_migrations.insert().values(
+                version=migration.version,
+                description=migration.description,
+                applied_at=datetime.utcnow()
+            ))
+        applied.append(migration.version)
+
+    return applied
+
+
+HOT_TABLES = ("users", "registration_attempts", "system_logs")
+
+# Колонки времени: диапазон по ним - окно запроса (сутки, страница логов), а не вся таблица
+WINDOW_COLUMNS = ("attempt_date", "timestamp", "bucket_start")
+
+PLAN_STEP = re.compile(r"^(SCAN|SEARCH) (?:TABLE )?(\w+)(.*)$")
+RANGE_ONLY = re.compile(r"\((\w+)[<>]=?\?\)$")
+
+
+class HotQuery(NamedTuple):
+    statement: object
+    # Обход индекса по порядку с LIMIT и без сортировки: читается LIMIT строк, а не таблица
+    index_walk: bool = False
+    # Сортировка (TEMP B-TREE) строк окна по времени, а не всей таблицы
+    window_sort: bool = False
+
+
+def hot_queries() -> Dict[str, HotQuery]:
+    """Запросы, которые выполняют эндпоинты /api/*"""
+    from api_routes import users_page_query, recent_attempts_query
+    from log_search import LogCursor, system_logs_query
+    from registration_stats import counters_sum_query, top_ips_query, totals_query
+
+    since = datetime.utcnow() - timedelta(hours=24)
+    return {
+        "users_page": HotQuery(users_page_query(100, after=0)),
+        "recent_attempts": HotQuery(recent_attempts_query(10), index_walk=True),
+        "recent_system_logs": HotQuery(system_logs_query("sqlite", 100), index_walk=True),
+        "system_logs_by_user": HotQuery(system_logs_query("sqlite", 100, user_id=1, before=LogCursor(since, 1))),
+        "system_logs_by_ip": HotQuery(system_logs_query("sqlite", 100, ip_address="127.0.0.1", since=since)),
+        "system_logs_search": HotQuery(system_logs_query("sqlite", 100, event_type="feedback", search="отзыв")),
+        "attempt_counters_window": HotQuery(counters_sum_query(since)),
+        "attempt_totals": HotQuery(totals_query()),
+        "top_ips": HotQuery(top_ips_query(since, 10), window_sort=True),
+    }
+
+
+def explain_query_plan(connection, statement) -> List[str]:
+    """Строки EXPLAIN QUERY PLAN для запроса SQLAlchemy"""
+    sql = statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    return [row[-1] for row in rows]
+
+
+def plan_problems(query: HotQuery, plan: List[str]) -> List[str]:
+    """
+    Шаги плана, читающие горячую таблицу целиком:
+        - любой SCAN горячей таблицы, с индексом или без; исключение - обход
+          индекса в запросе index_walk, если в плане нет сортировки и есть LIMIT;
+        - SEARCH только по открытому диапазону (col>?) по колонке, не являющейся
+          временем окна или первичным ключом;
+        - TEMP B-TREE, кроме сортировки окна в запросе window_sort, где все
+          чтения горячих таблиц ограничены колонкой времени.
+    """
+    sorts = [step for step in plan if "TEMP B-TREE" in step]
+    has_limit = query.statement._limit_clause is not None
+    problems = []
+    window_bounded = True
+
+    for step in plan:
+        match = PLAN_STEP.match(step)
+        if not match or match.group(2) not in HOT_TABLES:
+            continue
+        kind, details = match.group(1), match.group(3)
+        range_only = RANGE_ONLY.search(details)
+
+        if kind == "SCAN":
+            window_bounded = False
+            if not (query.index_walk and "USING" in details and has_limit and not sorts):
+                problems.append(step)
+        elif range_only and range_only.group(1) not in WINDOW_COLUMNS + ("rowid",):
+            window_bounded = False
+            problems.append(step)
+        elif not any(f"{column}>" in details or f"{column}<" in details for column in WINDOW_COLUMNS):
+            window_bounded = False
+
+    if sorts and not (query.window_sort and window_bounded):
+        problems.extend(sorts)
+    return problems
+
+
+def check_query_plans(bind=engine) -> Dict[str, List[str]]:
+    """
+    Найти запросы API, которые читают горячие таблицы целиком (см. plan_problems).
+    Возвращает {имя запроса: [проблемные шаги плана]}; пустой словарь - все хорошо.
+    """
+    if bind.dialect.name != "sqlite":
+        raise RuntimeError("Проверка планов запросов поддерживается только для SQLite")
+
+    problems = {}
+    with bind.connect() as connection:
+        for name, query in hot_queries().items():
+            steps = plan_problems(query, explain_query_plan(connection, query.statement))
+            if steps:
+                problems[name] = steps
+    return problems
+
+
+def main(argv: List[str]) -> int:
+    command = argv[1] if len(argv) > 1 else "upgrade"
+
+    if command == "upgrade":
+        applied = upgrade()
+        print(f"✅ Применены миграции: {applied}" if applied else "✅ Схема уже актуальна")
+        return 0
+
+    if command == "status":
+        with engine.begin() as connection:
+            done = applied_versions(connection)
+        for migration in MIGRATIONS:
+            mark = f"применена {done[migration.version]}" if migration.version in done else "ожидает"
+            print(f"{migration.version:>3}  {mark:<40} {migration.description}")
+        return 0
+
+    if command == "check":
+        upgrade()
+        problems = check_query_plans()
+        for name, steps in problems.items():
+            print(f"❌ {name}: {'; '.join(steps)}")
+        if not problems:
+            print("✅ Все запросы API используют индексы")
+        return 1 if problems else 0
+
+    print(__doc__)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
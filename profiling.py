@@ -0,0 +1,367 @@
+"""
+Профилирование отдельных запросов и сохранение медленных.
+
+Включается PROFILING_ENABLED. Тогда ProfilingMiddleware для каждого HTTP-запроса:
+    - запоминает SQL-запросы, выполненные через движки из database.py, с их
+      длительностью (без параметров: в них бывают пароли и телефоны);
+    - снимает стеки всех потоков процесса раз в PROFILING_SAMPLE_INTERVAL_MS,
+      если запрос профилируется явно (заголовок X-Profile или параметр
+      ?profile= со значением PROFILING_TRIGGER_TOKEN), попал в выборку
+      PROFILING_SAMPLE_RATE или идет дольше PROFILING_WATCH_AFTER_MS;
+    - пишет отчет на диск, если запрос профилировался явно или шел дольше
+      PROFILING_SLOW_REQUEST_MS.
+
+Для непрофилируемых явно запросов длительность - время до первого байта
+ответа: после него наблюдение заканчивается, и долгий поток (SSE, выгрузка,
+NDJSON) не держит фоновый поток снимков и не вытесняет из кольца настоящие
+медленные запросы. Пути из PROFILING_SKIP_PATHS (по умолчанию /api/live и
+/api/export) без явного запроса не наблюдаются вовсе.
+
+Обычный быстрый запрос платит только за пару контекстных переменных и
+запись строк SQL в список. Стеки снимает один фоновый поток, и только пока
+есть наблюдаемые запросы. Снимок стеков - весь процесс, поэтому в отчет
+попадает и работа параллельных запросов того же воркера.
+
+Отчеты - JSON в PROFILING_DUMP_DIR, не больше PROFILING_MAX_DUMPS файлов
+(самые старые удаляются). Стеки в отчете свернуты в формате flamegraph.pl
+("корень;...;лист" и число снимков) и открываются в speedscope.
+"""
+
+import contextvars
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional, Set
+from urllib.parse import parse_qsl, urlencode
+
+import anyio
+from sqlalchemy import event
+
+from config import settings
+from metrics import route_label, statement_type
+
+TRIGGER_HEADER = b"x-profile"
+TRIGGER_PARAM = "profile"
+MAX_STACK_DEPTH = 64
+MAX_STATEMENT_LENGTH = 2000
+REPORTED_STACKS = 200
+
+_request_numbers = itertools.count(1)
+
+# Поток, ждущий в очереди или на условии, простаивает: в профиле он только шум
+IDLE_FILES = ("threading.py", "queue.py")
+IDLE_FUNCTIONS = (("thread.py", "_worker"),)  # пул потоков ждет задачу в SimpleQueue (код на C)
+
+
+class RequestProfile:
+    """Все, что известно об одном запросе: SQL, снимки стеков и причина профилирования"""
+
+    __slots__ = ("number", "method", "path", "query", "reason", "started", "wall_started",
+                 "queries", "queries_dropped", "stacks", "samples", "finished")
+
+    def __init__(self, scope, reason: Optional[str]):
+        self.number = next(_request_numbers)
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.query = scope.get("query_string", b"")
+        self.reason = reason
+        self.started = time.perf_counter()
+        self.wall_started = time.time()
+        self.queries: List[tuple] = []
+        self.queries_dropped = 0
+        self.stacks: Optional[Counter] = None  # заводится при первом снимке
+        self.samples = 0
+        self.finished = False
+
+    @property
+    def id(self) -> str:
+        # Время в начале имени - порядок файлов в каталоге совпадает с порядком запросов
+        return f"{datetime.utcfromtimestamp(self.wall_started):%Y%m%dT%H%M%S%f}-{os.getpid()}-{self.number}"
+
+    def sampled(self, now: float, watch_after: float) -> bool:
+        return self.reason is not None or now - self.started >= watch_after
+
+    def record_query(self, statement: str, started: float, elapsed: float):
+        if self.finished:
+            return
+        if len(self.queries) >= settings.PROFILING_MAX_QUERIES:
+            self.queries_dropped += 1
+            return
+        self.queries.append((statement, started, elapsed))
+
+    def report(self, scope, status: int, duration: float, first_byte: Optional[float],
+               stacks: List[tuple]) -> dict:
+        query = urlencode([
+            (key, value) for key, value in parse_qsl(self.query.decode("latin-1"), keep_blank_values=True)
+            if key != TRIGGER_PARAM
+        ])
+        sql_total = sum(elapsed for _, _, elapsed in self.queries)
+        return {
+            "id": self.id,
+            "time": datetime.utcfromtimestamp(self.wall_started).isoformat(),
+            "pid": os.getpid(),
+            "method": self.method,
+            "path": self.path,
+            "route": route_label(scope),
+            "query": query,
+            "status": status,
+            "duration_ms": round(duration * 1000, 3),
+            "first_byte_ms": None if first_byte is None else round(first_byte * 1000, 3),
+            "reason": self.reason or "slow",
+            "sql": {
+                "count": len(self.queries) + self.queries_dropped,
+                "dropped": self.queries_dropped,
+                "total_ms": round(sql_total * 1000, 3),
+                "statements": [
+                    {
+                        "type": statement_type(statement),
+                        "offset_ms": round((started - self.started) * 1000, 3),
+                        "duration_ms": round(elapsed * 1000, 3),
+                        "statement": statement[:MAX_STATEMENT_LENGTH],
+                    }
+                    for statement, started, elapsed in self.queries
+                ],
+            },
+            "profile": {
+                "interval_ms": settings.PROFILING_SAMPLE_INTERVAL_MS,
+                "samples": self.samples,
+                "stacks": [{"stack": stack, "samples": count} for stack, count in stacks],
+            },
+        }
+
+
+_current_profile: "contextvars.ContextVar[Optional[RequestProfile]]" = contextvars.ContextVar(
+    "current_profile", default=None
+)
+
+
+# --- SQL ---------------------------------------------------------------------
+
+def profile_engine(sync_engine):
+    """Записывать SQL-запросы движка в профиль текущего запроса (для async - engine.sync_engine)"""
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_profile.get() is not None:
+            conn.info.setdefault("profiling_started", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = _current_profile.get()
+        if profile is not None and conn.info.get("profiling_started"):
+            started = conn.info["profiling_started"].pop()
+            profile.record_query(statement, started, time.perf_counter() - started)
+
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("profiling_started"):
+            connection.info["profiling_started"].pop()
+
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(sync_engine, "handle_error", handle_error)
+
+
+# --- Снимки стеков -----------------------------------------------------------
+
+def _folded_stack(frame) -> Optional[str]:
+    leaf_file = os.path.basename(frame.f_code.co_filename)
+    if leaf_file in IDLE_FILES or (leaf_file, frame.f_code.co_name) in IDLE_FUNCTIONS:
+        return None
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """
+    Один поток на процесс: пока есть наблюдаемые запросы, раз в interval
+    снимает стеки всех потоков и добавляет их в профили этих запросов.
+    """
+
+    def __init__(self, interval: float, watch_after: float):
+        self.interval = interval
+        self.watch_after = watch_after
+        self._active: Set[RequestProfile] = set()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+            self._thread.start()
+
+    def add(self, profile: RequestProfile):
+        self._active.add(profile)
+        if not self._wake.is_set():
+            self._wake.set()
+
+    def remove(self, profile: RequestProfile):
+        self._active.discard(profile)
+
+    def top_stacks(self, profile: RequestProfile, limit: int) -> List[tuple]:
+        """Самые частые стеки профиля; блокировка - чтобы не читать профиль посреди снимка"""
+        with self._lock:
+            return profile.stacks.most_common(limit) if profile.stacks else []
+
+    def sample(self, profiles: List[RequestProfile]):
+        own_thread = threading.get_ident()
+        stacks = [
+            stack
+            for thread_id, frame in sys._current_frames().items()
+            if thread_id != own_thread
+            for stack in (_folded_stack(frame),)
+            if stack is not None
+        ]
+        for profile in profiles:
+            if profile.stacks is None:
+                profile.stacks = Counter()
+            profile.samples += 1
+            profile.stacks.update(stacks)
+
+    def _run(self):
+        while True:
+            if not self._active:
+                self._wake.clear()
+                if not self._active:
+                    self._wake.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                now = time.perf_counter()
+                profiles = [profile for profile in list(self._active) if profile.sampled(now, self.watch_after)]
+                if profiles:
+                    self.sample(profiles)
+
+
+# --- Кольцо отчетов на диске -------------------------------------------------
+
+class DumpRing:
+    """Каталог с не более чем max_dumps отчетами; имя файла начинается со времени, старые удаляются"""
+
+    def __init__(self, directory: str, max_dumps: int):
+        self.directory = directory
+        self.max_dumps = max_dumps
+        self._lock = threading.Lock()
+
+    def _path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.json")
+
+    def write(self, report: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(report["id"])
+        with open(path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+        with self._lock:
+            names = self._names()
+            for name in names[:max(0, len(names) - self.max_dumps)]:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def _names(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(".json"))
+
+    def summaries(self) -> List[dict]:
+        """Краткие сведения об отчетах, новые первыми"""
+        summaries = []
+        for name in reversed(self._names()):
+            report = self.read(name[:-len(".json")])
+            if report is None:
+                continue
+            summaries.append({
+                key: report.get(key)
+                for key in ("id", "time", "method", "path", "route", "status", "duration_ms", "reason")
+            } | {"sql_count": report["sql"]["count"], "samples": report["profile"]["samples"]})
+        return summaries
+
+    def read(self, profile_id: str) -> Optional[dict]:
+        if not profile_id or os.path.basename(profile_id) != profile_id or profile_id.startswith("."):
+            return None
+        try:
+            with open(self._path(profile_id), encoding="utf-8") as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+
+dump_ring = DumpRing(settings.PROFILING_DUMP_DIR, settings.PROFILING_MAX_DUMPS)
+sampler = StackSampler(settings.PROFILING_SAMPLE_INTERVAL_MS / 1000, settings.PROFILING_WATCH_AFTER_MS / 1000)
+
+
+def trigger_reason(scope) -> Optional[str]:
+    """Почему запрос профилируется с самого начала; None - только если окажется медленным"""
+    token = settings.PROFILING_TRIGGER_TOKEN
+    if token:
+        for name, value in scope["headers"]:
+            if name == TRIGGER_HEADER and value.decode("latin-1") == token:
+                return "triggered"
+        query = scope.get("query_string", b"")
+        if TRIGGER_PARAM.encode() in query and (TRIGGER_PARAM, token) in parse_qsl(query.decode("latin-1")):
+            return "triggered"
+    if settings.PROFILING_SAMPLE_RATE and random.random() < settings.PROFILING_SAMPLE_RATE:
+        return "sampled"
+    return None
+
+
+class ProfilingMiddleware:
+    """ASGI-middleware: профиль запроса и отчет для явно профилируемых и медленных запросов"""
+
+    def __init__(self, app):
+        self.app = app
+        self.slow_threshold = settings.PROFILING_SLOW_REQUEST_MS / 1000
+        self.skip_paths = tuple(settings.PROFILING_SKIP_PATHS)
+        sampler.start()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        reason = trigger_reason(scope)
+        if reason is None and scope["path"].startswith(self.skip_paths):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope, reason)
+        status = 500
+        first_byte = None
+
+        async def send_with_profile_id(message):
+            nonlocal status, first_byte
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                first_byte = time.perf_counter() - profile.started
+                if reason == "triggered":
+                    message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]
+                elif reason is None:
+                    # Дальше идет только тело ответа: наблюдение за запросом закончено
+                    sampler.remove(profile)
+                    profile.finished = True
+            await send(message)
+
+        token = _current_profile.set(profile)
+        sampler.add(profile)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            duration = time.perf_counter() - profile.started
+            sampler.remove(profile)
+            _current_profile.reset(token)
+            profile.finished = True
+            latency = duration if reason is not None or first_byte is None else first_byte
+            if reason is not None or latency >= self.slow_threshold:
+                report = profile.report(scope, status, duration, first_byte,
+                                        sampler.top_stacks(profile, REPORTED_STACKS))
+                await anyio.to_thread.run_sync(dump_ring.write, report)
@@ -0,0 +1,130 @@
+"""
+Ограничение частоты запросов к тяжелым POST-маршрутам (bcrypt) по IP и имени пользователя
+
+Корзины живут в памяти процесса. При RATE_LIMIT_WORKERS воркерах каждый
+получает свою долю скорости и запаса: соединения ядро раскладывает по
+воркерам примерно поровну, так что в сумме клиент упирается примерно в
+заданный лимит, а не в лимит, умноженный на число процессов.
+"""
+
+import asyncio
+import time
+from typing import List, Optional
+
+from config import settings
+
+
+class RateLimitExceededError(Exception):
+    """Клиент исчерпал свой лимит запросов"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket на каждый ключ. Ключи разложены по шардам-словарям, чтобы
+    очистка и вытеснение работали с небольшими словарями, а общий объем
+    памяти был ограничен max_keys.
+
+    Все операции выполняются в потоке event loop, поэтому блокировки не нужны.
+    Ключ, который простоял дольше времени полного восполнения корзины,
+    ничем не отличается от нового - его можно удалить без потери точности.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, max_keys: int = 1_000_000, shards: int = 64):
+        self.rate = rate_per_minute / 60.0
+        self.burst = float(burst)
+        self.idle_after = self.burst / self.rate if self.rate > 0 else float("inf")
+        self.max_keys_per_shard = max(1, max_keys // shards)
+        self._shards: List[dict] = [{} for _ in range(shards)]
+        self._next_shard = 0
+        self.rejected = 0
+
+    def _shard(self, key: str) -> dict:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def hit(self, key: str) -> float:
+        """Списать токен. Возвращает 0, если запрос разрешен, иначе секунды до следующего токена"""
+        now = time.monotonic()
+        shard = self._shard(key)
+        state = shard.get(key)
+
+        if state is None:
+            if len(shard) >= self.max_keys_per_shard:
+                self._evict(shard, now)
+            shard[key] = [self.burst - 1.0, now]
+            return 0.0
+
+        tokens = min(self.burst, state[0] + (now - state[1]) * self.rate)
+        state[1] = now
+        if tokens >= 1.0:
+            state[0] = tokens - 1.0
+            return 0.0
+
+        state[0] = tokens
+        self.rejected += 1
+        return (1.0 - tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def _evict(self, shard: dict, now: float):
+        threshold = now - self.idle_after
+        idle = [key for key, (_, last_seen) in shard.items() if last_seen <= threshold]
+        for key in idle:
+            del shard[key]
+
+        # Если все ключи активны, вытесняем самые старые по вставке
+        while len(shard) >= self.max_keys_per_shard:
+            del shard[next(iter(shard))]
+
+    def sweep(self, shards: Optional[int] = None):
+        """Удалить простаивающие ключи в следующих shards шардах (по умолчанию - во всех)"""
+        now = time.monotonic()
+        for _ in range(shards or len(self._shards)):
+            shard = self._shards[self._next_shard]
+            self._next_shard = (self._next_shard + 1) % len(self._shards)
+            threshold = now - self.idle_after
+            for key in [key for key, (_, last_seen) in shard.items() if last_seen <= threshold]:
+                del shard[key]
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
+
+
+def _worker_share(value: float) -> float:
+    return value / max(1, settings.RATE_LIMIT_WORKERS)
+
+
+ip_limiter = TokenBucketLimiter(
+    _worker_share(settings.RATE_LIMIT_IP_PER_MINUTE),
+    max(1, round(_worker_share(settings.RATE_LIMIT_IP_BURST))),
+    max_keys=settings.RATE_LIMIT_MAX_KEYS,
+    shards=settings.RATE_LIMIT_SHARDS,
+)
+
+username_limiter = TokenBucketLimiter(
+    _worker_share(settings.RATE_LIMIT_USERNAME_PER_MINUTE),
+    max(1, round(_worker_share(settings.RATE_LIMIT_USERNAME_BURST))),
+    max_keys=settings.RATE_LIMIT_MAX_KEYS,
+    shards=settings.RATE_LIMIT_SHARDS,
+)
+
+
+def enforce_rate_limits(scope: str, ip_address: Optional[str], username: str):
+    """Проверить лимиты по IP и по имени; при превышении - RateLimitExceededError"""
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+
+    retry_after = ip_limiter.hit(f"{scope}:{ip_address}")
+    if not retry_after:
+        retry_after = username_limiter.hit(f"{scope}:{username.lower()}")
+    if retry_after:
+        raise RateLimitExceededError(retry_after)
+
+
+async def sweep_idle_keys_forever(interval_seconds: float = 1.0):
+    """Фоновая очистка: за один проход - по одному шарду каждого лимитера"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        ip_limiter.sweep(1)
+        username_limiter.sweep(1)
@@ -0,0 +1,189 @@
+"""
+Статистика попыток регистрации по скользящим окнам.
+
+Счетчики ведутся в таблице registration_attempt_counters с поминутными корзинами,
+итог за все время - одной строкой в registration_attempt_totals; то и другое
+обновляется в той же транзакции, что и вставка самих попыток. Самые активные
+IP считаются только по строкам окна (индекс по attempt_date). Поэтому
+запросы к статистике не зависят от размера registration_attempts и от
+длины истории счетчиков.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import RegistrationAttempt, RegistrationAttemptCounter, RegistrationAttemptTotal
+
+WINDOWS = {
+    "1m": timedelta(minutes=1),
+    "1h": timedelta(hours=1),
+    "24h": timedelta(hours=24),
+}
+
+TOP_IPS_WINDOW = timedelta(hours=24)
+
+TOTALS_ROW_ID = 1
+
+
+def bucket_start(moment: datetime) -> datetime:
+    """Начало минутной корзины"""
+    return moment.replace(second=0, microsecond=0)
+
+
+def aggregate_by_bucket(rows: Iterable[dict]) -> Dict[datetime, Tuple[int, int]]:
+    """Свернуть строки попыток в {корзина: (успешные, неуспешные)}"""
+    buckets = defaultdict(lambda: [0, 0])
+    for row in rows:
+        counts = buckets[bucket_start(row["attempt_date"])]
+        if row["success"]:
+            counts[0] += 1
+        else:
+            counts[1] += 1
+    return {key: (value[0], value[1]) for key, value in buckets.items()}
+
+
+def _upsert_statement(dialect_name: str, model):
+    if dialect_name == "postgresql":
+        return postgresql.insert(model)
+    if dialect_name == "sqlite":
+        return sqlite.insert(model)
+    raise ValueError(f"Upsert счетчиков не поддерживается для '{dialect_name}'")
+
+
+def _add_on_conflict(statement, model, index_elements):
+    return statement.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={
+            "successful": model.successful + statement.excluded.successful,
+            "failed": model.failed + statement.excluded.failed,
+        }
+    )
+
+
+def increment_counters(connection, rows: Iterable[dict]):
+    """Прибавить попытки к поминутным счетчикам и к итогу (вызывается внутри транзакции записи)"""
+    buckets = aggregate_by_bucket(rows)
+    if not buckets:
+        return
+
+    dialect_name = connection.dialect.name
+    statement = _upsert_statement(dialect_name, RegistrationAttemptCounter)
+    connection.execute(
+        _add_on_conflict(statement, RegistrationAttemptCounter, [RegistrationAttemptCounter.bucket_start]),
+        [
+            {"bucket_start": key, "successful": successful, "failed": failed}
+            for key, (successful, failed) in buckets.items()
+        ]
+    )
+
+    statement = _upsert_statement(dialect_name, RegistrationAttemptTotal).values(
+        id=TOTALS_ROW_ID,
+        successful=sum(successful for successful, _ in buckets.values()),
+        failed=sum(failed for _, failed in buckets.values()),
+    )
+    connection.execute(_add_on_conflict(statement, RegistrationAttemptTotal, [RegistrationAttemptTotal.id]))
+
+
+def rebuild_counters(connection, chunk_size: int = 10000):
+    """Пересчитать счетчики с нуля по таблице registration_attempts"""
+    connection.execute(RegistrationAttemptCounter.__table__.delete())
+
+    result = connection.execution_options(yield_per=chunk_size).execute(
+        select(RegistrationAttempt.attempt_date, RegistrationAttempt.success)
+        .where(RegistrationAttempt.attempt_date.is_not(None))
+    )
+
+    totals: Dict[datetime, list] = defaultdict(lambda: [0, 0])
+    for partition in result.partitions():
+        for key, (successful, failed) in aggregate_by_bucket(row._mapping for row in partition).items():
+            totals[key][0] += successful
+            totals[key][1] += failed
+
+    if totals:
+        connection.execute(RegistrationAttemptCounter.__table__.insert(), [
+            {"bucket_start": key, "successful": successful, "failed": failed}
+            for key, (successful, failed) in totals.items()
+        ])
+
+
+def rebuild_totals(connection):
+    """Пересчитать итог за все время по поминутным счетчикам"""
+    successful, failed = connection.execute(select(
+        func.coalesce(func.sum(RegistrationAttemptCounter.successful), 0),
+        func.coalesce(func.sum(RegistrationAttemptCounter.failed), 0),
+    )).one()
+    connection.execute(RegistrationAttemptTotal.__table__.delete())
+    connection.execute(RegistrationAttemptTotal.__table__.insert().values(
+        id=TOTALS_ROW_ID, successful=successful, failed=failed
+    ))
+
+
+def counters_sum_query(since: datetime):
+    """Сумма счетчиков начиная с корзины, содержащей since"""
+    return select(
+        func.coalesce(func.sum(RegistrationAttemptCounter.successful), 0),
+        func.coalesce(func.sum(RegistrationAttemptCounter.failed), 0),
+    ).where(RegistrationAttemptCounter.bucket_start >= bucket_start(since))
+
+
+def totals_query():
+    """Итог за все время - одна строка, а не сумма всех корзин"""
+    return select(
+        func.coalesce(func.sum(RegistrationAttemptTotal.successful), 0),
+        func.coalesce(func.sum(RegistrationAttemptTotal.failed), 0),
+    ).where(RegistrationAttemptTotal.id == TOTALS_ROW_ID)
+
+
+def top_ips_query(since: datetime, top_n: int):
+    """
+    Самые активные IP начиная с since. Окно выбирается отдельно (MATERIALIZED)
+    по индексу attempt_date: иначе SQLite предпочитает индекс по ip_address
+    ради GROUP BY и обходит всю таблицу. Сортируются только строки окна.
+    """
+    window = (
+        select(RegistrationAttempt.ip_address, RegistrationAttempt.success)
+        .where(RegistrationAttempt.attempt_date >= since)
+        .cte("attempts_window")
+        .prefix_with("MATERIALIZED")
+    )
+    return (
+        select(
+            window.c.ip_address,
+            func.count().label("attempts"),
+            func.sum(case((window.c.success.is_(False), 1), else_=0)).label("failed"),
+        )
+        .where(window.c.ip_address.is_not(None))
+        .group_by(window.c.ip_address)
+        .order_by(func.count().desc())
+        .limit(top_n)
+    )
+
+
+async def _sum_counters(db: AsyncSession, since: datetime = None) -> Dict[str, int]:
+    query = totals_query() if since is None else counters_sum_query(since)
+    successful, failed = (await db.execute(query)).one()
+    return {"total": successful + failed, "successful": successful, "failed": failed}
+
+
+async def get_registration_summary(db: AsyncSession, top_n: int = 10) -> dict:
+    """Итоги, окна 1 мин / 1 ч / 24 ч и самые активные IP за сутки"""
+    now = datetime.utcnow()
+
+    totals = await _sum_counters(db)
+    windows = {name: await _sum_counters(db, now - delta) for name, delta in WINDOWS.items()}
+
+    top_ips = await db.execute(top_ips_query(now - TOP_IPS_WINDOW, top_n))
+
+    return {
+        "totals": totals,
+        "windows": windows,
+        "top_ips": [
+            {"ip_address": row.ip_address, "attempts": row.attempts, "failed": row.failed or 0}
+            for row in top_ips
+        ],
+    }
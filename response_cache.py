@@ -0,0 +1,208 @@
+"""
+Кэш готовых JSON-ответов для дешевых эндпоинтов без состояния.
+
+Ответ сериализуется один раз и хранится в виде байтов вместе с ETag.
+Повторные запросы в пределах TTL отдаются из кэша, а запросы с
+совпадающим If-None-Match получают 304 без тела.
+"""
+
+import functools
+import hashlib
+import inspect
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from config import settings
+from fast_json import dumps
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    media_type: str
+    expires_at: float
+
+
+class MemoryCacheBackend:
+    """LRU в памяти процесса с ограничением числа записей"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: CachedResponse):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SqliteCacheBackend:
+    """
+    Общий кэш для всех воркеров на одной машине - локальная замена Redis.
+    Записи лежат в отдельном файле SQLite, а не в основной базе.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                " key TEXT PRIMARY KEY, body BLOB NOT NULL, etag TEXT NOT NULL,"
+                " media_type TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        row = self._connection().execute(
+            "SELECT body, etag, media_type, expires_at FROM response_cache WHERE key = ? AND expires_at > ?",
+            (key, time.time())
+        ).fetchone()
+        return CachedResponse(*row) if row else None
+
+    def set(self, key: str, entry: CachedResponse):
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO response_cache (key, body, etag, media_type, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (key, entry.body, entry.etag, entry.media_type, entry.expires_at)
+        )
+        connection.execute("DELETE FROM response_cache WHERE expires_at <= ?", (time.time(),))
+        connection.execute(
+            "DELETE FROM response_cache WHERE key NOT IN "
+            "(SELECT key FROM response_cache ORDER BY expires_at DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+
+    def clear(self):
+        self._connection().execute("DELETE FROM response_cache")
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class ResponseCache:
+    """Кэш ответов со счетчиками попаданий по каждому маршруту"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.counters: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, route: str, kind: str):
+        counters = self.counters.setdefault(route, {"hits": 0, "misses": 0, "not_modified": 0})
+        counters[kind] += 1
+
+    @staticmethod
+    def _response(entry: CachedResponse, if_none_match: Optional[str], public: bool) -> Response:
+        max_age = max(0, int(entry.expires_at - time.time()))
+        if public:
+            headers = {"ETag": entry.etag, "Cache-Control": f"public, max-age={max_age}"}
+        else:
+            headers = {"ETag": entry.etag, "Cache-Control": f"private, max-age={max_age}",
+                       "Vary": "Cookie, Authorization"}
+        if _etag_matches(if_none_match, entry.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+    def cached(self, ttl: float, public: bool = False):
+        """
+        Декоратор эндпоинта: результат сериализуется в JSON один раз на ttl секунд.
+        Ключ кэша - путь и строка запроса. По умолчанию ответ помечается private
+        с Vary: Cookie, Authorization: маршруты за сессией общий прокси хранить
+        не должен. public=True - только для маршрутов, открытых без входа.
+        """
+
+        def decorator(func):
+            route = func.__name__
+
+            @functools.wraps(func)
+            async def wrapper(*args, cache_request: Request, **kwargs):
+                key = f"{cache_request.url.path}?{cache_request.url.query}"
+                if_none_match = cache_request.headers.get("if-none-match")
+
+                entry = self.backend.get(key)
+                if entry is not None:
+                    self._count(route, "not_modified" if _etag_matches(if_none_match, entry.etag) else "hits")
+                    return self._response(entry, if_none_match, public)
+
+                self._count(route, "misses")
+                result = await func(*args, **kwargs)
+                if isinstance(result, Response):
+                    return result
+
+                body = dumps(jsonable_encoder(result))
+                entry = CachedResponse(body, make_etag(body), "application/json", time.time() + ttl)
+                self.backend.set(key, entry)
+                return self._response(entry, if_none_match, public)
+
+            signature = inspect.signature(func)
+            wrapper.__signature__ = signature.replace(parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter("cache_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+            ])
+            return wrapper
+
+        return decorator
+
+    def stats(self) -> dict:
+        """Попадания и промахи по маршрутам"""
+        hits = sum(c["hits"] + c["not_modified"] for c in self.counters.values())
+        misses = sum(c["misses"] for c in self.counters.values())
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+            "routes": self.counters,
+        }
+
+
+def create_backend():
+    """Выбрать хранилище кэша по настройкам"""
+    if settings.RESPONSE_CACHE_BACKEND == "sqlite":
+        return SqliteCacheBackend(settings.RESPONSE_CACHE_SQLITE_PATH, settings.RESPONSE_CACHE_MAX_ENTRIES)
+    return MemoryCacheBackend(settings.RESPONSE_CACHE_MAX_ENTRIES)
+
+
+response_cache = ResponseCache(create_backend())
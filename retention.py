@@ -0,0 +1,245 @@
+"""
+Хранение логов: старые строки system_logs и registration_attempts уезжают в архив.
+
+Строки старше срока хранения читаются пачками по индексу времени,
+дописываются в архив archive/<таблица>/<ГГГГ-ММ-ДД>.jsonl.gz (по дню
+события) и только после записи на диск удаляются из базы - каждая пачка
+в своей короткой транзакции. После удаления SQLite возвращает место через
+PRAGMA incremental_vacuum.
+
+Если процесс упадет между записью архива и удалением, пачка попадет в архив
+повторно; чтение архива отбрасывает дубликаты по id.
+
+В приложении архивация работает фоном только при RETENTION_ENABLED=True:
+по умолчанию строки из базы никуда не деваются.
+
+Запуск:
+    python retention.py            - один проход архивации
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from sqlalchemy import select
+
+from config import settings
+from database import engine, RegistrationAttempt, SystemLog
+import log_writer
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class RetentionPolicy(NamedTuple):
+    table: object
+    time_column: object
+    days: int
+
+
+def retention_policies() -> Dict[str, RetentionPolicy]:
+    return {
+        SystemLog.__tablename__: RetentionPolicy(
+            SystemLog.__table__, SystemLog.__table__.c.timestamp, settings.RETENTION_SYSTEM_LOG_DAYS
+        ),
+        RegistrationAttempt.__tablename__: RetentionPolicy(
+            RegistrationAttempt.__table__, RegistrationAttempt.__table__.c.attempt_date,
+            settings.RETENTION_REGISTRATION_ATTEMPT_DAYS
+        ),
+    }
+
+
+ARCHIVED_TABLES = tuple(retention_policies())
+
+
+def archive_path(table_name: str, day: date, archive_dir: str = None) -> str:
+    return os.path.join(archive_dir or settings.RETENTION_ARCHIVE_DIR, table_name, f"{day.isoformat()}.jsonl.gz")
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} не сериализуется в JSON")
+
+
+def append_archive(table_name: str, day: date, rows: List[dict], archive_dir: str = None):
+    """Дописать строки в файл дня отдельным gzip-членом и сбросить на диск"""
+    path = archive_path(table_name, day, archive_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    payload = "".join(
+        json.dumps(row, ensure_ascii=False, default=_json_default, separators=(",", ":")) + "\n"
+        for row in rows
+    ).encode("utf-8")
+    with open(path, "ab") as file:
+        file.write(gzip.compress(payload, compresslevel=6))
+        file.flush()
+        os.fsync(file.fileno())
+
+
+@contextmanager
+def _exclusive_run(archive_dir: str):
+    """
+    Межпроцессная блокировка: при нескольких воркерах архивирует только один,
+    остальные пропускают проход. Без fcntl (Windows) блокировка не ставится.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    if fcntl is None:
+        yield True
+        return
+    with open(os.path.join(archive_dir, ".lock"), "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def archive_batch(connection, policy: RetentionPolicy, cutoff: datetime, batch_size: int,
+                  archive_dir: str = None) -> int:
+    """Перенести в архив одну пачку строк старше cutoff; возвращает их число"""
+    table, column = policy.table, policy.time_column
+    rows = connection.execute(
+        select(table).where(column < cutoff).order_by(column, table.c.id).limit(batch_size)
+    ).mappings().all()
+    if not rows:
+        return 0
+
+    by_day = defaultdict(list)
+    for row in rows:
+        by_day[row[column.name].date()].append(dict(row))
+    for day, day_rows in by_day.items():
+        append_archive(table.name, day, day_rows, archive_dir)
+
+    connection.execute(table.delete().where(table.c.id.in_([row["id"] for row in rows])))
+    return len(rows)
+
+
+def incremental_vacuum(bind=engine, pages: int = None) -> int:
+    """Вернуть файлу SQLite свободные страницы; возвращает число свободных страниц до вызова"""
+    if bind.dialect.name != "sqlite":
+        return 0
+    with bind.connect() as connection:
+        free_pages = connection.exec_driver_sql("PRAGMA freelist_count").scalar()
+        if free_pages:
+            # Прагма освобождает по странице за шаг, а execute в sqlite3 делает один шаг;
+            # executescript выполняет ее до конца
+            connection.connection.driver_connection.executescript(
+                f"PRAGMA incremental_vacuum({int(pages or settings.RETENTION_VACUUM_PAGES)});"
+            )
+    return free_pages or 0
+
+
+def run_retention(bind=engine, now: Optional[datetime] = None, archive_dir: str = None) -> Dict[str, int]:
+    """
+    Один проход архивации по всем таблицам. Пачки идут отдельными транзакциями
+    с паузой между ними, чтобы запись из обработчиков не ждала долго.
+    """
+    archive_dir = archive_dir or settings.RETENTION_ARCHIVE_DIR
+    now = now or datetime.utcnow()
+    moved = {}
+
+    with _exclusive_run(archive_dir) as acquired:
+        if not acquired:
+            return moved
+
+        for name, policy in retention_policies().items():
+            if policy.days <= 0:
+                continue
+            cutoff = now - timedelta(days=policy.days)
+            moved[name] = 0
+            while True:
+                with bind.begin() as connection:
+                    count = archive_batch(connection, policy, cutoff, settings.RETENTION_BATCH_SIZE, archive_dir)
+                moved[name] += count
+                if count < settings.RETENTION_BATCH_SIZE:
+                    break
+                time.sleep(settings.RETENTION_BATCH_PAUSE_SECONDS)
+
+        if any(moved.values()):
+            incremental_vacuum(bind)
+
+    return moved
+
+
+async def run_retention_forever(interval_seconds: float):
+    """Фоновая задача: проход архивации раз в interval_seconds"""
+    while True:
+        try:
+            moved = await asyncio.to_thread(run_retention)
+            if any(moved.values()):
+                log_writer.log_system_event({
+                    "event_type": "retention",
+                    "description": f"Отправлено в архив: {moved}"
+                })
+        except Exception as exc:
+            log_writer.log_system_event({
+                "event_type": "retention_error",
+                "description": f"Архивация не удалась: {exc}"
+            })
+        await asyncio.sleep(interval_seconds)
+
+
+# --- Чтение архива -----------------------------------------------------------
+
+def archive_days(table_name: str, archive_dir: str = None) -> List[dict]:
+    """Файлы архива таблицы: день и размер"""
+    directory = os.path.join(archive_dir or settings.RETENTION_ARCHIVE_DIR, table_name)
+    if not os.path.isdir(directory):
+        return []
+    days = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".jsonl.gz"):
+            days.append({
+                "day": name[:-len(".jsonl.gz")],
+                "bytes": os.path.getsize(os.path.join(directory, name)),
+            })
+    return days
+
+
+def read_archive(table_name: str, since: date, until: date, filters: Optional[Dict[str, str]] = None,
+                 limit: int = 1000, archive_dir: str = None) -> Iterator[dict]:
+    """Строки архива за дни since..until включительно, по равенству полей filters"""
+    if table_name not in ARCHIVED_TABLES:
+        raise ValueError(f"Таблица {table_name} не архивируется")
+
+    filters = {key: value for key, value in (filters or {}).items() if value is not None}
+    # Повтор строки совпадает с ней целиком, значит и с фильтром: помнить нужно
+    # только отданные id - их не больше limit, сколько бы строк ни было в архиве
+    yielded_ids = set()
+    day = since
+    while day <= until and limit > 0:
+        path = archive_path(table_name, day, archive_dir)
+        day += timedelta(days=1)
+        if not os.path.exists(path):
+            continue
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            for line in file:
+                row = json.loads(line)
+                if row["id"] in yielded_ids:
+                    continue
+                if all(str(row.get(key)) == value for key, value in filters.items()):
+                    yielded_ids.add(row["id"])
+                    yield row
+                    limit -= 1
+                    if limit <= 0:
+                        return
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    result = run_retention()
+    print(f"✅ Архивация за {time.perf_counter() - started:.1f} с: {result or 'пропущена (идет в другом процессе)'}")
+    sys.exit(0)
@@ -1,11 +1,61 @@
 """
 Скрипт для запуска сервера LoL Stats Service
+
+Режимы:
+    DEBUG=False (по умолчанию) - боевой: WEB_WORKERS процессов на общем сокете,
+                                 uvloop и httptools, если установлены
+    DEBUG=True                 - один процесс, перезапуск при изменении файлов
+
+Вне DEBUG нужен свой SECRET_KEY, общий для всех воркеров: с ключом из примера
+сервер не стартует.
+
+Остановка по SIGTERM/Ctrl+C мягкая: сокет перестает принимать соединения,
+начатые запросы дорабатывают (не дольше WEB_GRACEFUL_TIMEOUT_SECONDS),
+затем каждый воркер дописывает очередь логов в базу.
 """
 
+import importlib.util
 import uvicorn
 import os
 import sys
-from database import create_tables
+from assets import build_assets
+from config import settings
+from database import create_tables, engine
+from sessions import check_secret_key
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def production_options(workers: int) -> dict:
+    """Параметры uvicorn для боевого режима"""
+    return {
+        "workers": workers,
+        "loop": "uvloop" if _installed("uvloop") else "asyncio",
+        "http": "httptools" if _installed("httptools") else "h11",
+        "backlog": settings.WEB_BACKLOG,
+        # Дольше простоя балансировщика (обычно 60 с), чтобы он не слал запрос в закрытое соединение
+        "timeout_keep_alive": settings.WEB_KEEPALIVE_SECONDS,
+        # На воркер; сверх лимита - сразу 503, а не растущая очередь
+        "limit_concurrency": settings.WEB_LIMIT_CONCURRENCY or None,
+        "timeout_graceful_shutdown": settings.WEB_GRACEFUL_TIMEOUT_SECONDS,
+        "log_level": "warning",
+    }
+
+
+def prepare_workers(workers: int):
+    """
+    Окружение для воркеров: база уже инициализирована здесь, один раз,
+    пул хеширования делит ядра между воркерами, если HASHING_WORKERS
+    не задан явно, а лимиты частоты - между воркерами.
+    """
+    os.environ["SKIP_DB_INIT"] = "True"
+    os.environ.setdefault("HASHING_WORKERS", str(max(1, (os.cpu_count() or 1) // workers)))
+    os.environ.setdefault("RATE_LIMIT_WORKERS", str(workers))
+    # Соединения, открытые при миграциях, воркерам не достаются
+    engine.dispose()
+
 
 def main():
     """Основная функция для запуска сервера"""
@@ -13,6 +63,12 @@ def main():
     print("🎮 Запуск LoL Stats Service...")
     print("=" * 50)
 
+    try:
+        check_secret_key()
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
     try:
         create_tables()
         print("✅ База данных инициализирована")
@@ -20,12 +76,32 @@ def main():
         print(f"❌ Ошибка инициализации БД: {e}")
         sys.exit(1)
 
-    host = os.getenv("HOST", "127.0.0.1")
-    port = int(os.getenv("PORT", 8000))
-    debug = os.getenv("DEBUG", "True").lower() == "true"
+    try:
+        build_assets()
+        print("✅ Статические файлы собраны")
+    except Exception as e:
+        print(f"⚠️  Статические файлы не собраны, будут отдаваться исходники: {e}")
+
+    host = settings.HOST
+    port = settings.PORT
+    debug = settings.DEBUG
+    workers = 1 if debug else max(1, settings.WEB_WORKERS)
+
+    if debug:
+        options = {"reload": True, "log_level": "info",
+                   "timeout_graceful_shutdown": settings.WEB_GRACEFUL_TIMEOUT_SECONDS}
+    else:
+        options = production_options(workers)
+        prepare_workers(workers)
 
     print(f"🌐 Сервер будет доступен по адресу: http://{host}:{port}")
     print(f"🔧 Режим отладки: {'Включен' if debug else 'Выключен'}")
+    if not debug:
+        print(f"🏭 Воркеров: {workers}, цикл: {options['loop']}, HTTP: {options['http']}")
+        if workers > 1:
+            print(f"⚠️  Состояние в памяти у каждого воркера свое: лимиты частоты поделены на "
+                  f"{os.environ['RATE_LIMIT_WORKERS']}, фильтр имен догоняет другие воркеры раз в "
+                  f"{settings.USERNAME_INDEX_SYNC_SECONDS:g} с, кэши расходятся")
     print("=" * 50)
     print("📋 Доступные страницы:")
     print(f"   • Главная: http://{host}:{port}/")
@@ -39,14 +115,8 @@ def main():
     print("=" * 50)
 
     try:
-
-        uvicorn.run(
-            "main:app",
-            host=host,
-            port=port,
-            reload=debug,
-            log_level="info" if debug else "warning"
-        )
+        uvicorn.run("main:app", host=host, port=port, **options)
+        print("\n🛑 Сервер остановлен")
     except KeyboardInterrupt:
         print("\n🛑 Сервер остановлен пользователем")
     except Exception as e:
@@ -0,0 +1,244 @@
+"""
+Сессии на подписанных токенах: проверка входа без запроса к базе.
+
+При входе выдается JWT (HS256, подпись SECRET_KEY) и кладется в HttpOnly-cookie;
+API принимает его и в заголовке Authorization: Bearer. Проверка на каждом
+запросе - LRU-кэш уже разобранных токенов, сравнение срока и поиск jti
+в списке отзыва, все в памяти процесса.
+
+Выход записывает jti в revoked_tokens. Каждый воркер подтягивает новые
+записи раз в SESSION_REVOCATION_SYNC_SECONDS, так что выход, выполненный
+в одном процессе, в остальных вступает в силу с этой задержкой. Записи
+и кэш живут не дольше самих токенов.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional
+
+from fastapi import Depends, HTTPException, Request
+from starlette.requests import HTTPConnection
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+
+from config import DEFAULT_SECRET_KEY, settings
+from database import AsyncReadSessionLocal, AsyncSessionLocal, RevokedToken
+
+
+class SessionRequiredError(Exception):
+    """Нет действующей сессии: токена нет, он подделан, истек или отозван"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class SessionClaims(NamedTuple):
+    user_id: int
+    username: str
+    jti: str
+    expires_at: int
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _json(value: dict) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+if settings.ALGORITHM != "HS256":
+    raise RuntimeError(f"Поддерживается только HS256, а в настройках {settings.ALGORITHM}")
+
+def check_secret_key():
+    """
+    Вне DEBUG отказаться работать с ключом из примера: им любой подпишет
+    токен на чужое имя, в том числе администратора. Случайный ключ на процесс
+    не годится - токен, выданный одним воркером, должны принимать все.
+    """
+    if not settings.DEBUG and settings.SECRET_KEY in ("", DEFAULT_SECRET_KEY):
+        raise RuntimeError("SECRET_KEY не задан или взят из примера; задайте свой или включите DEBUG=True")
+
+
+# Заголовок у всех наших токенов один и тот же; чужой заголовок (в том числе alg=none) не принимается
+_HEADER = _b64encode(_json({"alg": "HS256", "typ": "JWT"}))
+
+
+def _signature(signing_input: bytes) -> str:
+    return _b64encode(hmac.new(settings.SECRET_KEY.encode("utf-8"), signing_input, hashlib.sha256).digest())
+
+
+def encode_token(user_id: int, username: str, now: Optional[float] = None) -> str:
+    """Подписанный токен сессии на ACCESS_TOKEN_EXPIRE_MINUTES"""
+    issued_at = int(now if now is not None else time.time())
+    payload = _b64encode(_json({
+        "sub": str(user_id),
+        "name": username,
+        "iat": issued_at,
+        "exp": issued_at + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        "jti": secrets.token_urlsafe(12),
+    }))
+    signing_input = f"{_HEADER}.{payload}"
+    return f"{signing_input}.{_signature(signing_input.encode('ascii'))}"
+
+
+def decode_token(token: str) -> SessionClaims:
+    """Проверить подпись и разобрать токен; срок и отзыв проверяет вызывающий"""
+    try:
+        header, payload, signature = token.split(".")
+    except ValueError:
+        raise SessionRequiredError("malformed")
+    if header != _HEADER:
+        raise SessionRequiredError("malformed")
+    if not hmac.compare_digest(signature, _signature(f"{header}.{payload}".encode("ascii", "replace"))):
+        raise SessionRequiredError("bad_signature")
+    try:
+        claims = json.loads(_b64decode(payload))
+        return SessionClaims(int(claims["sub"]), claims["name"], claims["jti"], int(claims["exp"]))
+    except (ValueError, KeyError, TypeError):
+        raise SessionRequiredError("malformed")
+
+
+class SessionManager:
+    """Выдача и проверка токенов: кэш разобранных токенов и список отзыва с TTL"""
+
+    def __init__(self, cache_size: int):
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, SessionClaims]" = OrderedDict()
+        self._revoked: Dict[str, int] = {}
+        self._last_revocation_id = 0
+        self._purged = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def issue(self, user_id: int, username: str) -> str:
+        return encode_token(user_id, username)
+
+    def verify(self, token: str) -> SessionClaims:
+        with self._lock:
+            claims = self._cache.get(token)
+            if claims is not None:
+                self._cache.move_to_end(token)
+                self.hits += 1
+
+        if claims is None:
+            claims = decode_token(token)
+            with self._lock:
+                self.misses += 1
+                self._cache[token] = claims
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        if claims.expires_at <= time.time():
+            with self._lock:
+                self._cache.pop(token, None)
+            raise SessionRequiredError("expired")
+        if claims.jti in self._revoked:
+            raise SessionRequiredError("revoked")
+        return claims
+
+    async def revoke(self, claims: SessionClaims):
+        """Отозвать токен: сразу в этом процессе, в остальных - после синхронизации"""
+        self._revoked[claims.jti] = claims.expires_at
+        async with AsyncSessionLocal() as db:
+            db.add(RevokedToken(jti=claims.jti, expires_at=datetime.utcfromtimestamp(claims.expires_at)))
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Повторный выход тем же токеном
+                await db.rollback()
+
+    async def sync_revocations(self):
+        """
+        Подтянуть новые отзывы из базы и забыть истекшие. Чтение идет через пул
+        читателей; истекшие строки удаляются только при первом проходе и когда
+        что-то истекло в памяти, а не каждые несколько секунд в каждом воркере.
+        """
+        now = datetime.utcnow()
+        async with AsyncReadSessionLocal() as db:
+            rows = (await db.execute(
+                select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at)
+                .where(RevokedToken.id > self._last_revocation_id, RevokedToken.expires_at > now)
+                .order_by(RevokedToken.id)
+            )).all()
+
+        for row in rows:
+            self._revoked[row.jti] = int((row.expires_at - datetime(1970, 1, 1)).total_seconds())
+            self._last_revocation_id = row.id
+
+        deadline = time.time()
+        expired = [jti for jti, expires_at in self._revoked.items() if expires_at <= deadline]
+        for jti in expired:
+            del self._revoked[jti]
+
+        if expired or not self._purged:
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+                await db.commit()
+            self._purged = True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "cached_tokens": len(self._cache),
+                "cache_size": self.cache_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "revoked": len(self._revoked),
+            }
+
+
+session_manager = SessionManager(settings.SESSION_TOKEN_CACHE_SIZE)
+
+
+async def sync_revocations_forever(interval_seconds: float):
+    """Фоновая задача: синхронизация списка отзыва между воркерами"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await session_manager.sync_revocations()
+        except Exception:
+            # База недоступна - остаемся со старым списком до следующей попытки
+            pass
+
+
+def token_from_request(request: HTTPConnection) -> Optional[str]:
+    """Явный заголовок Authorization важнее cookie, которую браузер шлет сам"""
+    authorization = request.headers.get("authorization")
+    if authorization and authorization[:7].lower() == "bearer ":
+        return authorization[7:].strip()
+    return request.cookies.get(settings.SESSION_COOKIE_NAME)
+
+
+async def require_session(request: Request) -> SessionClaims:
+    """
+    Зависимость для защищенных маршрутов. Асинхронная намеренно: синхронную
+    FastAPI отправил бы в пул потоков, а это дороже самой проверки.
+    """
+    token = token_from_request(request)
+    if not token:
+        raise SessionRequiredError("missing")
+    claims = session_manager.verify(token)
+    request.state.session = claims
+    return claims
+
+
+async def require_admin(session: SessionClaims = Depends(require_session)) -> SessionClaims:
+    """Зависимость для служебных маршрутов: пользователь из ADMIN_USERNAMES"""
+    if session.username not in settings.ADMIN_USERNAMES:
+        raise HTTPException(status_code=403, detail="Это для администраторов. Вы пока только подозреваемый.")
+    return session
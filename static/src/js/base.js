@@ -0,0 +1,12 @@
+setInterval(function() {
+    if (Math.random() < 0.1) {
+        alert("Вы все еще здесь? Это подозрительно...");
+    }
+}, 10000);
+
+setInterval(function() {
+    if (Math.random() < 0.05) {
+        document.querySelector('.container').style.transform =
+            'rotate(' + (Math.random() * 10 - 5) + 'deg)';
+    }
+}, 3000);
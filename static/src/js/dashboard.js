@@ -0,0 +1,91 @@
+function showError(feature) {
+    document.getElementById('fake-loading').style.display = 'block';
+
+    setTimeout(function() {
+        document.getElementById('fake-loading').style.display = 'none';
+
+        const messages = [
+            'Ошибка 404: Функционал не найден в этой реальности',
+            'Ошибка 500: Сервер решил взять отпуск',
+            'Ошибка 418: Я чайник, а не сервер статистики',
+            'Ошибка 999: Слишком много успеха, система не выдержала',
+            'Функция работает, но только по вторникам в полнолуние',
+            'Данные находятся в другом замке',
+            'Статистика временно эмигрировала в параллельную вселенную'
+        ];
+
+        alert(messages[Math.floor(Math.random() * messages.length)]);
+    }, 2000);
+}
+
+function showRandomMessage() {
+    const messages = [
+        'Вы успешно ничего не сделали!',
+        'Поздравляем! Вы потратили еще несколько секунд своей жизни.',
+        'Эта кнопка работает лучше всего остального функционала.',
+        'Вы нашли единственную работающую функцию в системе!',
+        'Статистика показывает, что вы нажали на кнопку.',
+        'В параллельной вселенной эта кнопка запускает ракету.',
+        'Вы только что внесли свой вклад в статистику бесполезных действий.'
+    ];
+
+    const messageDiv = document.getElementById('random-message');
+    messageDiv.textContent = messages[Math.floor(Math.random() * messages.length)];
+    messageDiv.style.display = 'block';
+
+    setTimeout(function() {
+        messageDiv.style.display = 'none';
+    }, 5000);
+}
+
+function connectLiveFeed() {
+    if (!window.EventSource || !document.getElementById('live-feed')) {
+        return;
+    }
+
+    const status = document.getElementById('live-status');
+    const logs = document.getElementById('live-logs');
+    const source = new EventSource('/api/live');
+
+    source.addEventListener('status', function(event) {
+        const data = JSON.parse(event.data);
+        status.textContent = 'CPU ' + data.process.cpu_percent_recent + '%, память ' +
+            Math.round(data.process.rss_bytes / 1048576) + ' МБ, зрителей: ' + data.live_clients +
+            ' (все страдают синхронно)';
+    });
+
+    source.addEventListener('logs', function(event) {
+        JSON.parse(event.data).forEach(function(log) {
+            const item = document.createElement('li');
+            item.textContent = log.timestamp.slice(11, 19) + ' [' + log.event_type + '] ' + log.description;
+            logs.insertBefore(item, logs.firstChild);
+        });
+        while (logs.children.length > 20) {
+            logs.removeChild(logs.lastChild);
+        }
+    });
+}
+
+connectLiveFeed();
+
+setInterval(function() {
+    if (Math.random() < 0.1) {
+        document.body.style.transform = 'rotate(' + (Math.random() * 4 - 2) + 'deg)';
+        setTimeout(function() {
+            document.body.style.transform = 'none';
+        }, 1000);
+    }
+}, 10000);
+
+setInterval(function() {
+    if (Math.random() < 0.05) {
+        const notifications = [
+            'Новое обновление: Добавлена функция, которая не работает',
+            'Внимание: Обнаружена работающая функция, исправляем',
+            'Статистика обновлена: 0 из 0 функций работают корректно',
+            'Техническое обслуживание: Ломаем то, что еще работало'
+        ];
+
+        alert(notifications[Math.floor(Math.random() * notifications.length)]);
+    }
+}, 30000);
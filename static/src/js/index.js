@@ -0,0 +1,8 @@
+setInterval(function() {
+    if (Math.random() < 0.3) {
+        document.body.style.filter = 'hue-rotate(' + Math.random() * 360 + 'deg)';
+        setTimeout(function() {
+            document.body.style.filter = 'none';
+        }, 1000);
+    }
+}, 5000);
@@ -0,0 +1,720 @@
+let phoneDigits = [];
+let passwordGenerated = false;
+let annoyanceLevel = 0;
+let popupInterval;
+let colorInterval;
+let shakeInterval;
+let soundInterval;
+let flipInterval;
+let currentDragElement = null;
+let dragStarted = false;
+
+let ticTacToeBoard = ['', '', '', '', '', '', '', '', ''];
+let currentPlayer = 'X';
+let gameActive = true;
+let gameWon = false;
+
+const annoyingPopups = [
+    "🎉 ПОЗДРАВЛЯЕМ! ВЫ ВЫИГРАЛИ МИЛЛИОН ДОЛЛАРОВ! (это ложь)",
+    "⚠️ ВНИМАНИЕ! ВАШ КОМПЬЮТЕР ЗАРАЖЕН! (нет, не заражен)",
+    "🔥 ГОРЯЧИЕ ДЕВОЧКИ В ВАШЕМ РАЙОНЕ! (их там нет)",
+    "💊 УВЕЛИЧЬТЕ РАЗМЕР СВОЕГО... ТЕРПЕНИЯ!",
+    "🎯 ВЫ 1000000-й ПОСЕТИТЕЛЬ! ЗАБЕРИТЕ ПРИЗ! (приза нет)",
+    "🚨 СРОЧНО! ОБНОВИТЕ БРАУЗЕР! (не обновляйте)",
+    "💰 ЗАРАБОТАЙТЕ 100000$ В ДЕНЬ! (невозможно)",
+    "🎪 ЦИРК УЕХАЛ, А КЛОУНЫ ОСТАЛИСЬ!",
+    "🦄 ЕДИНОРОГИ СУЩЕСТВУЮТ! МЫ ИХ ВИДЕЛИ!",
+    "🍕 БЕСПЛАТНАЯ ПИЦЦА! (пиццы нет)",
+    "👻 БУ! ИСПУГАЛИСЬ? НЕТ? А ЗРЯ!",
+    "🎭 ВЫ УЧАСТВУЕТЕ В СКРЫТОЙ КАМЕРЕ!",
+    "🌈 НАЙДИТЕ КОНЕЦ РАДУГИ! (его нет)",
+    "🎲 УДАЧА УЛЫБАЕТСЯ ВАМ! (она хмурится)",
+    "🎸 ВЫ РОКЗВЕЗДА! (нет, не рокзвезда)",
+    "🚀 ПОЛЕТЕЛИ НА МАРС! (билетов нет)",
+    "🎨 ВЫ ХУДОЖНИК! (кисточки в другом замке)",
+    "🏆 ВЫ ЧЕМПИОН! (по терпению)",
+    "🎪 ДОБРО ПОЖАЛОВАТЬ В ЦИРК УЖАСОВ!",
+    "🤡 КЛОУН ХОЧЕТ ДРУЖИТЬ! (не хочет)"
+];
+
+const crazyColors = ['#ff0000', '#00ff00', '#0000ff', '#ffff00', '#ff00ff', '#00ffff', '#ffa500', '#800080'];
+
+function checkAbsurdAnswer() {
+    const answer = document.getElementById('absurd-input').value;
+    if (answer.length > 0) {
+        document.getElementById('registration-form').style.display = 'block';
+        document.querySelector('.absurd-task').style.display = 'none';
+        alert('Поздравляем! Вы разблокировали форму регистрации. Теперь настоящие испытания!');
+        startAnnoyanceMode();
+    } else {
+        alert('Введите хоть что-нибудь!');
+    }
+}
+
+function startAnnoyanceMode() {
+
+    popupInterval = setInterval(showAnnoyingPopup, 8000);
+
+    colorInterval = setInterval(changeColors, 1000);
+
+    shakeInterval = setInterval(shakeScreen, 5000);
+
+    startRandomSounds();
+
+    startRandomFlips();
+
+    createFloatingElements();
+
+    initTicTacToeGame();
+}
+
+function startRandomSounds() {
+    const playRandomSound = () => {
+        const audioElements = ['audio1'];
+        const randomAudio = document.getElementById(audioElements[Math.floor(Math.random() * audioElements.length)]);
+
+        if (randomAudio) {
+            randomAudio.volume = 0.8;
+            randomAudio.play().catch(e => console.log('Звук не воспроизведен:', e));
+            showMiniPopup('🔊 ЗВУКОВАЯ АТАКА! 🔊');
+        }
+
+        const nextSoundDelay = (60 + Math.random() * 120) * 1000;
+        setTimeout(playRandomSound, nextSoundDelay);
+    };
+
+    setTimeout(playRandomSound, 30000);
+}
+
+function startRandomFlips() {
+    const flipSite = () => {
+        document.body.classList.add('site-flipped');
+        showMiniPopup('🌪️ ПЕРЕВОРОТ! 🌪️');
+
+        setTimeout(() => {
+            document.body.classList.remove('site-flipped');
+            document.body.classList.add('site-flip-back');
+            showMiniPopup('🔄 НАЗАД! 🔄');
+
+            setTimeout(() => {
+                document.body.classList.remove('site-flip-back');
+            }, 2000);
+        }, 10000);
+
+        const nextFlipDelay = (120 + Math.random() * 180) * 1000;
+        setTimeout(flipSite, nextFlipDelay);
+    };
+
+    setTimeout(flipSite, 60000);
+}
+
+function initTicTacToeGame() {
+    console.log('🎮 Инициализация крестиков-ноликов...');
+
+    ticTacToeBoard = ['', '', '', '', '', '', '', '', ''];
+    currentPlayer = 'X';
+    gameActive = true;
+    gameWon = false;
+
+    const gameCells = document.querySelectorAll('.tic-tac-cell');
+    console.log('🎯 Найдено ячеек:', gameCells.length);
+
+    gameCells.forEach((cell, index) => {
+        cell.textContent = '';
+        cell.className = 'tic-tac-cell';
+        cell.dataset.cellIndex = index;
+
+        cell.removeEventListener('click', handleTicTacCellClick);
+        cell.addEventListener('click', handleTicTacCellClick);
+
+        console.log(`✅ Ячейка ${index} настроена`);
+    });
+
+    updateGameStatus('Ваш ход! Вы играете X');
+    console.log('🎮 Крестики-нолики готовы к игре!');
+}
+
+function handleTicTacCellClick(event) {
+    event.preventDefault();
+    event.stopPropagation();
+
+    const cell = event.target;
+    const index = parseInt(cell.dataset.cellIndex);
+
+    console.log(`🎯 Клик по ячейке ${index}, содержимое доски:`, ticTacToeBoard);
+    console.log(`🎮 Игра активна: ${gameActive}, текущий игрок: ${currentPlayer}`);
+
+    if (ticTacToeBoard[index] !== '' || !gameActive || currentPlayer !== 'X') {
+        console.log('❌ Ход невозможен');
+        showMiniPopup('❌ НЕЛЬЗЯ СЮДА! ❌');
+        return;
+    }
+
+    console.log(`✅ Делаем ход игрока в ячейку ${index}`);
+
+    makeGameMove(index, 'X');
+
+    if (checkGameWin('X')) {
+        updateGameStatus('🎉 ВЫ ВЫИГРАЛИ! 🎉');
+        gameActive = false;
+        gameWon = true;
+        unlockRaceSelection();
+        showAnnoyingPopup();
+        return;
+    }
+
+    if (checkGameDraw()) {
+        updateGameStatus('🤝 НИЧЬЯ! Попробуйте еще раз!');
+        gameActive = false;
+        return;
+    }
+
+    currentPlayer = 'O';
+    updateGameStatus('Ход компьютера...');
+
+    setTimeout(() => {
+        makeComputerGameMove();
+
+        if (checkGameWin('O')) {
+            updateGameStatus('😈 КОМПЬЮТЕР ВЫИГРАЛ! Попробуйте еще раз!');
+            gameActive = false;
+            showAnnoyingPopup();
+            return;
+        }
+
+        if (checkGameDraw()) {
+            updateGameStatus('🤝 НИЧЬЯ! Попробуйте еще раз!');
+            gameActive = false;
+            return;
+        }
+
+        currentPlayer = 'X';
+        updateGameStatus('Ваш ход!');
+    }, 800);
+}
+
+function makeGameMove(index, player) {
+    ticTacToeBoard[index] = player;
+    const cell = document.querySelector(`[data-cell-index="${index}"]`);
+
+    if (cell) {
+        cell.textContent = player;
+        cell.classList.add('taken');
+
+        if (player === 'X') {
+            cell.classList.add('player-x');
+            cell.style.color = '#e74c3c';
+        } else {
+            cell.classList.add('player-o');
+            cell.style.color = '#3498db';
+        }
+
+        cell.style.transform = 'scale(1.2)';
+        setTimeout(() => {
+            cell.style.transform = 'scale(1)';
+        }, 200);
+
+        showMiniPopup(player === 'X' ? '❌ ВАШ ХОД!' : '⭕ ХОД ИИ!');
+    }
+
+    console.log(`🎯 Ход сделан: ${player} в ячейку ${index}`);
+}
+
+function makeComputerGameMove() {
+
+    let move = findGameWinningMove('O');
+    if (move === -1) move = findGameWinningMove('X');
+    if (move === -1) move = getRandomGameMove();
+
+    if (move !== -1) {
+        console.log(`🤖 Компьютер делает ход в ячейку ${move}`);
+        makeGameMove(move, 'O');
+    }
+}
+
+function findGameWinningMove(player) {
+    const winPatterns = [
+        [0, 1, 2], [3, 4, 5], [6, 7, 8],
+        [0, 3, 6], [1, 4, 7], [2, 5, 8],
+        [0, 4, 8], [2, 4, 6]
+    ];
+
+    for (let pattern of winPatterns) {
+        const [a, b, c] = pattern;
+        const line = [ticTacToeBoard[a], ticTacToeBoard[b], ticTacToeBoard[c]];
+
+        if (line.filter(cell => cell === player).length === 2 && line.filter(cell => cell === '').length === 1) {
+            return pattern[line.indexOf('')];
+        }
+    }
+
+    return -1;
+}
+
+function getRandomGameMove() {
+    const emptyCells = ticTacToeBoard.map((cell, index) => cell === '' ? index : null).filter(val => val !== null);
+    return emptyCells.length > 0 ? emptyCells[Math.floor(Math.random() * emptyCells.length)] : -1;
+}
+
+function checkGameWin(player) {
+    const winPatterns = [
+        [0, 1, 2], [3, 4, 5], [6, 7, 8],
+        [0, 3, 6], [1, 4, 7], [2, 5, 8],
+        [0, 4, 8], [2, 4, 6]
+    ];
+
+    for (let pattern of winPatterns) {
+        const [a, b, c] = pattern;
+        if (ticTacToeBoard[a] === player && ticTacToeBoard[b] === player && ticTacToeBoard[c] === player) {
+
+            pattern.forEach(index => {
+                const cell = document.querySelector(`[data-cell-index="${index}"]`);
+                if (cell) {
+                    cell.classList.add('winning');
+                }
+            });
+            return true;
+        }
+    }
+
+    return false;
+}
+
+function checkGameDraw() {
+    return ticTacToeBoard.every(cell => cell !== '');
+}
+
+function updateGameStatus(message) {
+    const statusElement = document.getElementById('game-status');
+    if (statusElement) {
+        statusElement.textContent = message;
+    }
+}
+
+function resetTicTacToe() {
+    console.log('🔄 Сброс игры крестики-нолики');
+    initTicTacToeGame();
+    showMiniPopup('🔄 НОВАЯ ИГРА! 🔄');
+}
+
+function unlockRaceSelection() {
+    const raceSelect = document.getElementById('race_class');
+    for (let option of raceSelect.options) {
+        option.disabled = false;
+    }
+    showMiniPopup('🎯 РАСА РАЗБЛОКИРОВАНА! 🎯');
+    alert('🎮 ПОБЕДА! Вы разблокировали выбор расы! 🎮');
+}
+
+function showAnnoyingPopup() {
+    const popup = document.createElement('div');
+    popup.className = 'annoying-popup';
+    popup.innerHTML = `
+        <div class="popup-content">
+            <span class="popup-close" onclick="closePopup(this)">&times;</span>
+            <h3>${annoyingPopups[Math.floor(Math.random() * annoyingPopups.length)]}</h3>
+            <button onclick="closePopup(this)" style="background: ${crazyColors[Math.floor(Math.random() * crazyColors.length)]}; color: white; border: none; padding: 10px; margin: 5px; border-radius: 5px; cursor: pointer;">ЗАКРЫТЬ</button>
+            <button onclick="multiplyPopups()" style="background: ${crazyColors[Math.floor(Math.random() * crazyColors.length)]}; color: white; border: none; padding: 10px; margin: 5px; border-radius: 5px; cursor: pointer;">НЕ НАЖИМАТЬ!</button>
+        </div>
+    `;
+
+    popup.style.position = 'fixed';
+    popup.style.left = Math.random() * (window.innerWidth - 300) + 'px';
+    popup.style.top = Math.random() * (window.innerHeight - 200) + 'px';
+    popup.style.zIndex = '9999';
+    popup.style.background = crazyColors[Math.floor(Math.random() * crazyColors.length)];
+    popup.style.border = '3px solid #000';
+    popup.style.borderRadius = '10px';
+    popup.style.padding = '20px';
+    popup.style.boxShadow = '0 0 20px rgba(0,0,0,0.5)';
+    popup.style.animation = 'bounce 0.5s infinite alternate, rotate 2s infinite linear';
+
+    document.body.appendChild(popup);
+
+    setTimeout(() => {
+        if (popup.parentNode) {
+            popup.parentNode.removeChild(popup);
+        }
+    }, Math.random() * 10000 + 5000);
+}
+
+function closePopup(element) {
+    const popup = element.closest('.annoying-popup');
+    if (popup && popup.parentNode) {
+        popup.parentNode.removeChild(popup);
+    }
+
+    if (Math.random() < 0.3) {
+        setTimeout(showAnnoyingPopup, 500);
+        setTimeout(showAnnoyingPopup, 1000);
+    }
+}
+
+function multiplyPopups() {
+    for (let i = 0; i < 5; i++) {
+        setTimeout(showAnnoyingPopup, i * 200);
+    }
+    alert('Мы же говорили не нажимать! 😈');
+}
+
+function changeColors() {
+    document.body.style.filter = `hue-rotate(${Math.random() * 360}deg) saturate(${100 + Math.random() * 200}%)`;
+
+    const elements = document.querySelectorAll('input, button, select');
+    elements.forEach(el => {
+        if (Math.random() < 0.3) {
+            el.style.background = crazyColors[Math.floor(Math.random() * crazyColors.length)];
+            el.style.color = crazyColors[Math.floor(Math.random() * crazyColors.length)];
+        }
+    });
+}
+
+function shakeScreen() {
+    document.body.style.animation = 'shake 1s';
+    setTimeout(() => {
+        document.body.style.animation = '';
+    }, 1000);
+}
+
+function createFloatingElements() {
+    const emojis = ['🎪', '🤡', '🎭', '🎨', '🎯', '🎲', '🎸', '🚀', '🦄', '👻', '🔥', '💥', '⭐', '🌈', '🔊', '🌪️', '❌', '⭕'];
+
+    for (let i = 0; i < 25; i++) {
+        setTimeout(() => {
+            const floater = document.createElement('div');
+            floater.textContent = emojis[Math.floor(Math.random() * emojis.length)];
+            floater.style.position = 'fixed';
+            floater.style.left = Math.random() * window.innerWidth + 'px';
+            floater.style.top = window.innerHeight + 'px';
+            floater.style.fontSize = (20 + Math.random() * 30) + 'px';
+            floater.style.zIndex = '1000';
+            floater.style.pointerEvents = 'none';
+            floater.style.animation = `float-up ${5 + Math.random() * 5}s linear infinite`;
+
+            document.body.appendChild(floater);
+
+            setTimeout(() => {
+                if (floater.parentNode) {
+                    floater.parentNode.removeChild(floater);
+                }
+            }, 10000);
+        }, i * 800);
+    }
+}
+
+function validateUsername() {
+    const username = document.getElementById('username').value;
+    const errorDiv = document.getElementById('username-error');
+
+    if (username.length < 3) {
+        errorDiv.textContent = 'Имя слишком короткое! В нашем мире имена должны быть длиннее.';
+        errorDiv.style.display = 'block';
+        showAnnoyingPopup();
+    } else {
+        errorDiv.style.display = 'none';
+    }
+}
+
+document.getElementById('phone-canvas').addEventListener('click', function(e) {
+    const rect = e.target.getBoundingClientRect();
+    const x = e.clientX - rect.left;
+    const digit = Math.floor(x / (rect.width / 10));
+
+    if (phoneDigits.length < 10) {
+        phoneDigits.push(digit);
+        document.getElementById('phone_number').value = '+7' + phoneDigits.join('');
+
+        const dot = document.createElement('div');
+        dot.style.position = 'absolute';
+        dot.style.left = x + 'px';
+        dot.style.top = (e.clientY - rect.top) + 'px';
+        dot.style.width = '15px';
+        dot.style.height = '15px';
+        dot.style.background = crazyColors[Math.floor(Math.random() * crazyColors.length)];
+        dot.style.borderRadius = '50%';
+        dot.textContent = digit;
+        dot.style.color = 'white';
+        dot.style.fontSize = '10px';
+        dot.style.textAlign = 'center';
+        dot.style.lineHeight = '15px';
+        dot.style.fontWeight = 'bold';
+        dot.style.animation = 'pulse 1s infinite';
+        e.target.appendChild(dot);
+
+        showMiniPopup('КЛИК! 📱');
+    }
+});
+
+function showMiniPopup(text) {
+    const mini = document.createElement('div');
+    mini.textContent = text;
+    mini.style.position = 'fixed';
+    mini.style.left = Math.random() * window.innerWidth + 'px';
+    mini.style.top = Math.random() * window.innerHeight + 'px';
+    mini.style.background = crazyColors[Math.floor(Math.random() * crazyColors.length)];
+    mini.style.color = 'white';
+    mini.style.padding = '5px 10px';
+    mini.style.borderRadius = '15px';
+    mini.style.fontSize = '12px';
+    mini.style.zIndex = '10000';
+    mini.style.animation = 'mini-bounce 1s';
+
+    document.body.appendChild(mini);
+
+    setTimeout(() => {
+        if (mini.parentNode) {
+            mini.parentNode.removeChild(mini);
+        }
+    }, 1000);
+}
+
+function generatePassword() {
+    const chars = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789!@#$%^&*';
+    let password = '';
+    for (let i = 0; i < 12; i++) {
+        password += chars.charAt(Math.floor(Math.random() * chars.length));
+    }
+    document.getElementById('password').value = password;
+    passwordGenerated = true;
+    createPasswordPuzzle(password);
+
+    showAnnoyingPopup();
+    alert('Пароль сгенерирован! Теперь перетащите буквы в правильном порядке! Удачи! 😈');
+}
+
+function createPasswordPuzzle(password) {
+    const letterBank = document.getElementById('letter-bank');
+    const passwordSlots = document.getElementById('password-slots');
+
+    letterBank.innerHTML = '<p style="color: red; font-weight: bold; animation: blink 1s infinite;">⚡ ПЕРЕТАЩИТЕ БУКВЫ В ПРАВИЛЬНОМ ПОРЯДКЕ! ⚡</p>';
+    passwordSlots.innerHTML = '';
+
+    for (let i = 0; i < password.length; i++) {
+        const slot = document.createElement('div');
+        slot.className = 'slot-element';
+        slot.dataset.slotIndex = i;
+
+        slot.addEventListener('drop', handlePasswordDrop);
+        slot.addEventListener('dragover', handlePasswordDragOver);
+        slot.addEventListener('dragenter', handlePasswordDragEnter);
+        slot.addEventListener('dragleave', handlePasswordDragLeave);
+
+        passwordSlots.appendChild(slot);
+    }
+
+    const letters = password.split('').sort(() => Math.random() - 0.5);
+    letters.forEach((letter, index) => {
+        const letterDiv = document.createElement('div');
+        letterDiv.textContent = letter;
+        letterDiv.draggable = true;
+        letterDiv.className = 'letter-element';
+        letterDiv.style.display = 'inline-block';
+        letterDiv.style.margin = '5px';
+        letterDiv.style.padding = '12px';
+        letterDiv.style.background = crazyColors[Math.floor(Math.random() * crazyColors.length)];
+        letterDiv.style.color = 'white';
+        letterDiv.style.borderRadius = '8px';
+        letterDiv.style.cursor = 'move';
+        letterDiv.style.fontWeight = 'bold';
+        letterDiv.style.fontSize = '14px';
+        letterDiv.style.border = '2px solid #000';
+        letterDiv.style.animation = 'wiggle 2s infinite';
+        letterDiv.dataset.letter = letter;
+        letterDiv.dataset.originalIndex = index;
+
+        letterDiv.addEventListener('dragstart', handlePasswordDragStart);
+        letterDiv.addEventListener('dragend', handlePasswordDragEnd);
+        letterDiv.addEventListener('mouseenter', handlePasswordMouseEnter);
+        letterDiv.addEventListener('mouseleave', handlePasswordMouseLeave);
+
+        letterBank.appendChild(letterDiv);
+    });
+}
+
+function handlePasswordDragStart(ev) {
+    try {
+        currentDragElement = ev.target;
+        dragStarted = true;
+
+        ev.dataTransfer.setData("text/plain", ev.target.dataset.letter);
+        ev.dataTransfer.setData("text/html", ev.target.outerHTML);
+        ev.dataTransfer.effectAllowed = "move";
+
+        ev.target.classList.add('dragging');
+        showMiniPopup('ТАЩИМ БУКВУ! 🔤');
+    } catch (error) {
+        console.error('Ошибка dragstart:', error);
+        resetDragState();
+    }
+}
+
+function handlePasswordDragEnd(ev) {
+    try {
+        resetDragState();
+        ev.target.classList.remove('dragging');
+        document.body.style.cursor = 'default';
+        ev.target.style.cursor = 'move';
+
+        const slots = document.querySelectorAll('.slot-element');
+        slots.forEach(slot => {
+            slot.classList.remove('drag-over');
+            if (!slot.textContent) {
+                slot.style.background = 'white';
+                slot.style.border = '3px dashed #e74c3c';
+                slot.style.transform = 'scale(1)';
+            }
+        });
+
+    } catch (error) {
+        console.error('Ошибка dragend:', error);
+        resetDragState();
+    }
+}
+
+function handlePasswordDragOver(ev) {
+    try {
+        ev.preventDefault();
+        ev.dataTransfer.dropEffect = "move";
+    } catch (error) {
+        console.error('Ошибка dragover:', error);
+    }
+}
+
+function handlePasswordDragEnter(ev) {
+    try {
+        ev.preventDefault();
+        if (dragStarted && !ev.target.textContent && ev.target.classList.contains('slot-element')) {
+            ev.target.classList.add('drag-over');
+        }
+    } catch (error) {
+        console.error('Ошибка dragenter:', error);
+    }
+}
+
+function handlePasswordDragLeave(ev) {
+    try {
+        if (ev.target.classList.contains('slot-element')) {
+            ev.target.classList.remove('drag-over');
+        }
+    } catch (error) {
+        console.error('Ошибка dragleave:', error);
+    }
+}
+
+function handlePasswordDrop(ev) {
+    try {
+        ev.preventDefault();
+
+        const letter = ev.dataTransfer.getData("text/plain");
+
+        if (letter && !ev.target.textContent && dragStarted && ev.target.classList.contains('slot-element')) {
+            ev.target.textContent = letter;
+            ev.target.style.background = '#27ae60';
+            ev.target.style.color = 'white';
+            ev.target.style.border = '3px solid #2ecc71';
+            ev.target.style.animation = 'success-pulse 0.5s';
+            ev.target.classList.remove('drag-over');
+
+            if (currentDragElement && currentDragElement.parentNode) {
+                currentDragElement.parentNode.removeChild(currentDragElement);
+            }
+
+            showMiniPopup('БУКВА НА МЕСТЕ! 🎯');
+            checkPasswordCompletion();
+        }
+
+        resetDragState();
+
+    } catch (error) {
+        console.error('Ошибка drop:', error);
+        resetDragState();
+    }
+}
+
+function handlePasswordMouseEnter() {
+    if (!dragStarted) {
+        this.style.transform = 'scale(1.2) rotate(10deg)';
+        showMiniPopup('СХВАТИЛИ БУКВУ! 🔤');
+    }
+}
+
+function handlePasswordMouseLeave() {
+    if (!dragStarted) {
+        this.style.transform = 'scale(1) rotate(0deg)';
+    }
+}
+
+function resetDragState() {
+    currentDragElement = null;
+    dragStarted = false;
+    document.body.style.cursor = 'default';
+
+    const draggingElements = document.querySelectorAll('.dragging');
+    draggingElements.forEach(el => el.classList.remove('dragging'));
+
+    const dragOverElements = document.querySelectorAll('.drag-over');
+    dragOverElements.forEach(el => el.classList.remove('drag-over'));
+}
+
+document.addEventListener('dragend', function() {
+    setTimeout(resetDragState, 100);
+});
+
+document.addEventListener('keydown', function(ev) {
+    if (ev.key === 'Escape' && dragStarted) {
+        resetDragState();
+    }
+});
+
+function checkPasswordCompletion() {
+    const slots = document.querySelectorAll('.slot-element');
+    let confirmedPassword = '';
+
+    slots.forEach(slot => {
+        confirmedPassword += slot.textContent;
+    });
+
+    if (confirmedPassword.length === document.getElementById('password').value.length) {
+        document.getElementById('confirm_password').value = confirmedPassword;
+        showAnnoyingPopup();
+        alert('ПАРОЛЬ СОБРАН! ВЫ МОЛОДЕЦ! 🎉');
+    }
+}
+
+setInterval(function() {
+    if (Math.random() < 0.2) {
+        const submitBtn = document.getElementById('submit-btn');
+        if (submitBtn) {
+            const messages = [
+                '🚀 НЕ НАЖИМАЙТЕ! 🚀',
+                '🚀 ЗАВЕРШИТЬ МУЧЕНИЯ 🚀',
+                '🚀 КНОПКА-ЛОВУШКА! 🚀',
+                '🚀 ЭТО НЕ ТА КНОПКА! 🚀',
+                '🚀 ПОДУМАЙТЕ ЕЩЕ РАЗ! 🚀',
+                '🚀 ПОБЕГ ИЗ АДА! 🚀'
+            ];
+            submitBtn.textContent = messages[Math.floor(Math.random() * messages.length)];
+            submitBtn.style.background = crazyColors[Math.floor(Math.random() * crazyColors.length)];
+        }
+    }
+}, 2000);
+
+let timeLeft = 15 * 60;
+const timerInterval = setInterval(() => {
+    timeLeft--;
+
+    if (timeLeft % 60 === 0 && timeLeft > 0) {
+        const minutes = Math.floor(timeLeft / 60);
+        showAnnoyingPopup();
+        alert(`⏰ ОСТАЛОСЬ ${minutes} МИНУТ! ТОРОПИТЕСЬ! ⏰`);
+    }
+
+    if (timeLeft <= 0) {
+        clearInterval(timerInterval);
+        clearInterval(popupInterval);
+        clearInterval(colorInterval);
+        clearInterval(shakeInterval);
+        alert('⏰ ВРЕМЯ ВЫШЛО! Вы не достойны быть частью этого мира. 💀');
+        window.location.href = '/';
+    }
+}, 1000);
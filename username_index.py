@@ -0,0 +1,182 @@
+"""
+Индекс имен пользователей в памяти для быстрой проверки занятости имени.
+
+Фильтр Блума отвечает "точно свободно" без запроса к БД, небольшой LRU
+помнит недавно подтвержденные занятые имена. Во всех остальных случаях
+проверку делает база, а уникальный индекс users.username остается
+окончательным арбитром при вставке.
+
+Имена, созданные другими воркерами или import_users.py, этот процесс
+узнает из базы: раз в USERNAME_INDEX_SYNC_SECONDS в фильтр добавляются
+пользователи с id больше последнего виденного. До ближайшей синхронизации
+такое имя может показаться свободным; регистрацию в этом случае все равно
+остановит уникальный индекс.
+"""
+
+import asyncio
+import hashlib
+import math
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import AsyncReadSessionLocal, User, get_user_by_username_async
+
+
+class BloomFilter:
+    """Фильтр Блума на bytearray с двойным хешированием blake2b"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class UsernameIndex:
+    """Фильтр Блума всех имен и LRU недавно занятых"""
+
+    def __init__(self, capacity: int, error_rate: float, taken_cache_size: int):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.taken_cache_size = taken_cache_size
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.taken: "OrderedDict[str, None]" = OrderedDict()
+        self.ready = False
+        self.last_user_id = 0
+        self.counters = {"bloom_negative": 0, "cache_hit": 0, "database": 0}
+
+    def new_filter(self, expected: int = 0) -> BloomFilter:
+        """Пустой фильтр на expected имен с запасом вдвое под новые регистрации"""
+        return BloomFilter(max(self.capacity, expected * 2), self.error_rate)
+
+    def install(self, bloom: BloomFilter, last_user_id: int = 0):
+        """Подменить фильтр заполненным (по id last_user_id включительно) и начать отвечать по нему"""
+        self.bloom = bloom
+        self.last_user_id = last_user_id
+        self.taken.clear()
+        self.ready = True
+
+    def rebuild(self, usernames: Iterable[str], expected: int = 0):
+        """Перестроить фильтр по полному списку имен"""
+        bloom = self.new_filter(expected)
+        for username in usernames:
+            bloom.add(username)
+        self.install(bloom)
+
+    def remember_taken(self, username: str):
+        self.taken[username] = None
+        self.taken.move_to_end(username)
+        while len(self.taken) > self.taken_cache_size:
+            self.taken.popitem(last=False)
+
+    def add(self, username: str):
+        """Учесть только что созданного пользователя"""
+        self.bloom.add(username)
+        self.remember_taken(username)
+
+    def lookup(self, username: str) -> Optional[bool]:
+        """False - точно свободно, True - точно занято, None - нужно спросить БД"""
+        if not self.ready:
+            return None
+        if username in self.taken:
+            self.taken.move_to_end(username)
+            self.counters["cache_hit"] += 1
+            return True
+        if username not in self.bloom:
+            self.counters["bloom_negative"] += 1
+            return False
+        return None
+
+    async def is_taken(self, db: AsyncSession, username: str) -> Tuple[bool, str]:
+        """Проверить имя; возвращает (занято ли, источник ответа)"""
+        known = self.lookup(username)
+        if known is not None:
+            return known, "cache" if known else "bloom"
+
+        self.counters["database"] += 1
+        taken = await get_user_by_username_async(db, username) is not None
+        if taken:
+            self.remember_taken(username)
+        return taken, "database"
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "bloom_items": self.bloom.count,
+            "bloom_bytes": len(self.bloom.bits),
+            "last_user_id": self.last_user_id,
+            "taken_cache": len(self.taken),
+            **self.counters,
+        }
+
+
+username_index = UsernameIndex(
+    capacity=settings.USERNAME_BLOOM_CAPACITY,
+    error_rate=settings.USERNAME_BLOOM_ERROR_RATE,
+    taken_cache_size=settings.USERNAME_TAKEN_CACHE_SIZE,
+)
+
+
+async def warm_username_index():
+    """
+    Заполнить индекс именами из таблицы users: сначала COUNT для размера
+    фильтра, затем имена потоком через серверный курсор прямо в фильтр,
+    без списка всех имен в памяти
+    """
+    last_user_id = 0
+    async with AsyncReadSessionLocal() as db:
+        expected = (await db.execute(select(func.count()).select_from(User))).scalar_one()
+        bloom = username_index.new_filter(expected)
+        result = await db.stream(
+            select(User.id, User.username).execution_options(yield_per=settings.STREAM_CHUNK_SIZE)
+        )
+        async for partition in result.partitions():
+            for row in partition:
+                bloom.add(row.username)
+                last_user_id = max(last_user_id, row.id)
+    username_index.install(bloom, last_user_id)
+
+
+async def sync_username_index() -> int:
+    """Добавить в фильтр пользователей, созданных после последней синхронизации"""
+    if not username_index.ready:
+        return 0
+    async with AsyncReadSessionLocal() as db:
+        rows = (await db.execute(
+            select(User.id, User.username).where(User.id > username_index.last_user_id).order_by(User.id)
+        )).all()
+    for row in rows:
+        username_index.bloom.add(row.username)
+        username_index.last_user_id = row.id
+    return len(rows)
+
+
+async def sync_username_index_forever(interval_seconds: float):
+    """Фоновая задача: подтягивать имена, занятые в других процессах"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await sync_username_index()
+        except Exception:
+            # База недоступна - догоним на следующем проходе
+            pass